@@ -0,0 +1 @@
+"""Benchmarks for the worker and LLM pipeline. See bench/run.py."""
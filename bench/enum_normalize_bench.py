@@ -0,0 +1,69 @@
+"""
+Enum Normalization Micro-benchmark.
+Compares the compiled per-class normalizer in llm.utils with the previous
+implementation (table rebuilt and rapidfuzz run on every call) on the kinds
+of values the Brain returns: exact values, case/spacing variants, aliases and
+repeated misspellings.
+
+Usage:
+    python -m bench.enum_normalize_bench --iterations 20000
+"""
+import argparse
+import timeit
+
+from rapidfuzz import fuzz, process
+
+from llm.metrics import metrics
+from llm.utils import ENUM_ALIASES, normalize_enum
+from server.enums import ConversationStage, DecisionAction
+
+SAMPLES = {
+    "exact": ("qualification", ConversationStage),
+    "case_variant": ("Send Now", DecisionAction),
+    "alias": ("qualifying", ConversationStage),
+    "misspelling": ("qualificaton", ConversationStage),
+    "unknown": ("query_resolution", ConversationStage),
+}
+
+
+def _legacy_normalize(value, enum_class, default=None):
+    """The pre-compilation normalize_enum, without logging."""
+    if value is None or value == "null" or value == "":
+        return default
+    normalized = value.strip().lower().replace("-", "_").replace(" ", "_")
+    if normalized in ENUM_ALIASES:
+        normalized = ENUM_ALIASES[normalized]
+    valid_values = {e.value.lower(): e for e in enum_class}
+    if normalized in valid_values:
+        return valid_values[normalized]
+    match = process.extractOne(normalized, valid_values.keys(), scorer=fuzz.WRatio, score_cutoff=60)
+    if match:
+        return valid_values[match[0]]
+    return default
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Enum normalization micro-benchmark")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'sample':<16} {'legacy':>10} {'compiled':>10}  result")
+    for name, (value, enum_class) in SAMPLES.items():
+        legacy = timeit.timeit(lambda: _legacy_normalize(value, enum_class), number=args.iterations)
+        compiled = timeit.timeit(
+            lambda: normalize_enum(value, enum_class, log_corrections=False), number=args.iterations
+        )
+        result = normalize_enum(value, enum_class, log_corrections=False)
+        print(
+            f"{name:<16} {legacy / args.iterations * 1e6:8.2f}us {compiled / args.iterations * 1e6:8.2f}us"
+            f"  {value!r} -> {result.value if result else None}"
+        )
+
+    print("\nCorrections counted:")
+    for key, count in sorted(metrics.snapshot()["counters"].items()):
+        if key.startswith("llm.enum_correction"):
+            print(f"  {key}: {int(count)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+JSON Repair Micro-benchmark.
+Measures extract_json + coerce_to_schema against plain json.loads on
+representative LLM responses, to keep the repair path's overhead negligible
+next to an LLM call.
+
+Usage:
+    python -m bench.json_repair_bench --iterations 20000
+"""
+import argparse
+import json
+import timeit
+
+from llm.json_repair import coerce_to_schema, extract_json
+from llm.steps.eyes import EYES_SCHEMA
+
+_EYES = {
+    "observation": "Lead asked about the price of 2 BHK units {and parking}.",
+    "thought_process": "Pricing question; qualify budget next.",
+    "situation_summary": "Lead is comparing projects.",
+    "intent_level": "medium",
+    "user_sentiment": "neutral",
+    "risk_flags": {"spam_risk": "low", "policy_risk": "low", "hallucination_risk": "low"},
+    "confidence": 0.82,
+}
+_CLEAN = json.dumps(_EYES)
+
+SAMPLES = {
+    "clean": _CLEAN,
+    "prose_wrapped": f"Let me analyze this conversation first.\n\n{_CLEAN}\n\nThat is my answer.",
+    "markdown_fence": f"```json\n{json.dumps(_EYES, indent=2)}\n```",
+    "trailing_commas": _CLEAN.replace('"low"}', '"low",}').replace("0.82}", "0.82,}"),
+    "truncated": _CLEAN[: int(len(_CLEAN) * 0.8)],
+    "loose_types": _CLEAN.replace('"medium"', '"Medium"').replace("0.82", '"0.82"'),
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="JSON repair micro-benchmark")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    schema = EYES_SCHEMA["schema"]
+    baseline = timeit.timeit(lambda: json.loads(_CLEAN), number=args.iterations)
+    print(f"{'json.loads (clean baseline)':<32} {baseline / args.iterations * 1e6:8.2f} us")
+
+    for name, text in SAMPLES.items():
+        data, outcome = extract_json(text)
+        fields = len(data) if data else 0
+
+        def run(text=text):
+            parsed, _ = extract_json(text)
+            if parsed is not None:
+                coerce_to_schema(parsed, schema)
+
+        elapsed = timeit.timeit(run, number=args.iterations)
+        print(f"{name:<32} {elapsed / args.iterations * 1e6:8.2f} us  outcome={outcome} fields={fields}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,499 @@
+"""
+Local Mock Backend for Benchmarks.
+One stdlib HTTP server that stands in for everything the worker talks to:
+
+    POST /v1/chat/completions              OpenAI-compatible LLM (canned JSON per step schema)
+    /internals/...  and  /messages/send_bot   Internal server API (in-memory state)
+    POST /{version}/{phone_number_id}/messages  WhatsApp Graph API
+
+Latency is configurable per target with a small spec language:
+    fixed:50            always 50 ms
+    uniform:20,80       uniformly between 20 and 80 ms
+    lognormal:300,0.5   median 300 ms, sigma 0.5 (long right tail, like real LLMs)
+
+Every request is counted per target ("llm", "internal", "graph") and per route.
+
+Run standalone:
+    python -m bench.mock_server --port 8765 --llm-latency lognormal:300,0.5
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+# ============================================================
+# Latency Distributions
+# ============================================================
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Parse a latency spec into a sampler returning seconds."""
+    kind, _, args = (spec or "fixed:0").partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    if kind == "fixed":
+        ms = values[0] if values else 0.0
+        return lambda rng: ms / 1000
+    if kind == "uniform":
+        low, high = values
+        return lambda rng: rng.uniform(low, high) / 1000
+    if kind == "lognormal":
+        median, sigma = values
+        mu = math.log(median)
+        return lambda rng: rng.lognormvariate(mu, sigma) / 1000
+    raise ValueError(f"Unknown latency spec {spec!r} (use fixed:, uniform: or lognormal:)")
+
+
+# ============================================================
+# Canned LLM Responses (keyed by json_schema name)
+# ============================================================
+
+CANNED_LLM_OUTPUTS: Dict[str, Dict[str, Any]] = {
+    "eyes_output": {
+        "observation": "Lead is asking about the project.",
+        "thought_process": "Interested lead, answer the question and qualify.",
+        "situation_summary": "Lead wants details about pricing and location.",
+        "intent_level": "medium",
+        "user_sentiment": "neutral",
+        "risk_flags": {"spam_risk": "low", "policy_risk": "low", "hallucination_risk": "low"},
+        "confidence": 0.85,
+    },
+    "brain_output": {
+        "implementation_plan": "Answer briefly and ask about their budget.",
+        "action": "send_now",
+        "new_stage": "qualification",
+        "should_respond": True,
+        "selected_cta_id": None,
+        "cta_scheduled_at": None,
+        "followup_in_minutes": 0,
+        "followup_reason": "",
+        "confidence": 0.8,
+        "needs_human_attention": False,
+    },
+    "mouth_output": {
+        "message_text": "Our 2 and 3 BHK homes start at 85 lakh. What budget do you have in mind?",
+        "message_language": "en",
+        "self_check_passed": True,
+        "violations": [],
+    },
+    "memory_output": {
+        "updated_rolling_summary": "Lead asked about pricing; bot shared the starting price.",
+        "needs_recursive_summary": False,
+    },
+    "memory_segment_output": {
+        "segment_summary": "Lead asked about pricing; bot shared the starting price.",
+        "needs_recursive_summary": False,
+    },
+    "memory_compaction_output": {
+        "compacted_summary": "Lead is exploring pricing for 2-3 BHK homes.",
+    },
+}
+# Degraded profile: Eyes and Brain answered in one call
+CANNED_LLM_OUTPUTS["fused_output"] = {
+    "eyes": CANNED_LLM_OUTPUTS["eyes_output"],
+    "brain": CANNED_LLM_OUTPUTS["brain_output"],
+}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# ============================================================
+# In-memory Internal API State
+# ============================================================
+
+class MockState:
+    """Just enough server state for process_message / followups to run."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.organization_id = str(uuid.uuid4())
+        self.leads: Dict[str, Dict] = {}          # lead_id -> lead
+        self.leads_by_phone: Dict[str, str] = {}  # phone -> lead_id
+        self.conversations: Dict[str, Dict] = {}  # conversation_id -> conversation
+        self.conv_by_lead: Dict[str, str] = {}
+        self.messages: Dict[str, List[Dict]] = defaultdict(list)
+
+    def integration(self, phone_number_id: str) -> Dict:
+        return {
+            "integration_id": str(uuid.uuid5(uuid.NAMESPACE_URL, phone_number_id)),
+            "access_token": "bench-token",
+            "version": "v18.0",
+            "app_secret": "bench-secret",
+            "phone_number_id": phone_number_id,
+            "is_connected": True,
+            "organization_id": self.organization_id,
+            "organization_name": "Bench Realty",
+            "is_active": True,
+            "business_name": "Bench Realty",
+            "business_description": "Premium 2 and 3 BHK apartments in Pune.",
+            "flow_prompt": "Qualify budget, location and timeline, then offer a site visit.",
+            "llm_settings": None,
+        }
+
+    def create_lead(self, phone: str, name: Optional[str]) -> Dict:
+        with self.lock:
+            lead_id = self.leads_by_phone.get(phone)
+            if lead_id:
+                return self.leads[lead_id]
+            lead_id = str(uuid.uuid4())
+            lead = {
+                "id": lead_id,
+                "organization_id": self.organization_id,
+                "phone": phone,
+                "name": name,
+                "email": None,
+                "company": None,
+                "conversation_stage": "greeting",
+                "intent_level": "unknown",
+                "user_sentiment": "neutral",
+                "created_at": _now(),
+                "updated_at": None,
+            }
+            self.leads[lead_id] = lead
+            self.leads_by_phone[phone] = lead_id
+            return lead
+
+    def create_conversation(self, lead_id: str) -> Dict:
+        with self.lock:
+            conv_id = self.conv_by_lead.get(lead_id)
+            if conv_id:
+                return self.conversations[conv_id]
+            conv_id = str(uuid.uuid4())
+            conv = {
+                "id": conv_id,
+                "organization_id": self.organization_id,
+                "lead_id": lead_id,
+                "cta_id": None,
+                "cta_scheduled_at": None,
+                "stage": "greeting",
+                "intent_level": "unknown",
+                "mode": "bot",
+                "user_sentiment": "neutral",
+                "needs_human_attention": False,
+                "rolling_summary": "",
+                "memory_segments": None,
+                "last_message": None,
+                "last_message_at": None,
+                "last_user_message_at": None,
+                "last_bot_message_at": None,
+                "followup_count_24h": 0,
+                "total_nudges": 0,
+                "scheduled_followup_at": None,
+                "next_followup_at": None,
+                "next_followup_stage": None,
+                "followup_draft": None,
+                "created_at": _now(),
+                "updated_at": None,
+            }
+            self.conversations[conv_id] = conv
+            self.conv_by_lead[lead_id] = conv_id
+            return conv
+
+    def add_message(self, conversation_id: str, sender: str, text: str) -> Dict:
+        ts = _now()
+        with self.lock:
+            self.messages[conversation_id].append({"sender": sender, "text": text, "timestamp": ts})
+            conv = self.conversations.get(conversation_id)
+            if conv:
+                conv["last_message"] = text
+                conv["last_message_at"] = ts
+                conv["last_user_message_at" if sender == "lead" else "last_bot_message_at"] = ts
+                # Like the server's schedule: a bot reply makes the next follow-up due (now, for
+                # the bench), a lead message cancels it and its draft
+                if sender == "lead":
+                    conv.update(next_followup_at=None, next_followup_stage=None, followup_draft=None)
+                else:
+                    conv.update(next_followup_at=ts, next_followup_stage="followup_10m")
+        return {"id": str(uuid.uuid4()), "conversation_id": conversation_id, "content": text, "created_at": ts}
+
+    def due_followups(self) -> List[Dict]:
+        """Every conversation the bot has replied to is treated as due (one org group)."""
+        with self.lock:
+            followups = []
+            for conv in self.conversations.values():
+                if not conv.get("last_bot_message_at"):
+                    continue
+                followups.append({
+                    "followup_type": "followup_10m",
+                    "conversation": dict(conv),
+                    "lead": dict(self.leads[conv["lead_id"]]),
+                })
+            if not followups:
+                return []
+            integration = self.integration("bench-phone-id")
+            return [{
+                "organization_id": self.organization_id,
+                "organization_name": integration["organization_name"],
+                "access_token": integration["access_token"],
+                "phone_number_id": integration["phone_number_id"],
+                "version": integration["version"],
+                "business_name": integration["business_name"],
+                "business_description": integration["business_description"],
+                "flow_prompt": integration["flow_prompt"],
+                "llm_settings": None,
+                "followups": followups,
+            }]
+
+
+# ============================================================
+# Server
+# ============================================================
+
+_UUID = r"[0-9a-fA-F-]{36}"
+
+
+class MockBackend:
+    """Owns the HTTP server, latency samplers, state and request counters."""
+
+    def __init__(
+        self,
+        port: int = 0,
+        llm_latency: str = "lognormal:300,0.5",
+        api_latency: str = "fixed:5",
+        graph_latency: str = "lognormal:150,0.3",
+        seed: int = 42,
+    ) -> None:
+        self.samplers = {
+            "llm": parse_latency(llm_latency),
+            "internal": parse_latency(api_latency),
+            "graph": parse_latency(graph_latency),
+        }
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.state = MockState()
+        self._counts_lock = threading.Lock()
+        self.counts: Dict[str, int] = defaultdict(int)
+        self.route_counts: Dict[str, int] = defaultdict(int)
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockBackend":
+        self._thread = threading.Thread(target=self.server.serve_forever, name="mock-backend", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset_counts(self) -> None:
+        with self._counts_lock:
+            self.counts.clear()
+            self.route_counts.clear()
+
+    def count_snapshot(self) -> Tuple[Dict[str, int], Dict[str, int]]:
+        with self._counts_lock:
+            return dict(self.counts), dict(self.route_counts)
+
+    # ---------- internals ----------
+
+    def _delay(self, target: str) -> None:
+        with self._rng_lock:
+            seconds = self.samplers[target](self._rng)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def _count(self, target: str, route: str) -> None:
+        with self._counts_lock:
+            self.counts[target] += 1
+            self.route_counts[route] += 1
+
+    def _llm_completion(self, body: Dict) -> Dict:
+        schema_name = (body.get("response_format") or {}).get("json_schema", {}).get("name", "")
+        output = CANNED_LLM_OUTPUTS.get(schema_name, {})
+        content = json.dumps(output)
+        prompt_chars = sum(len(m.get("content") or "") for m in body.get("messages", []))
+        prompt_tokens = prompt_chars // 4
+        completion_tokens = len(content) // 4
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "bench-model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def _route(self, method: str, path: str, query: Dict[str, str], body: Dict) -> Tuple[str, str, int, Any]:
+        """Returns (target, route_name, status, payload)."""
+        state = self.state
+
+        if method == "POST" and path.endswith("/chat/completions"):
+            return "llm", "llm.chat_completions", 200, self._llm_completion(body)
+
+        if method == "POST" and re.fullmatch(r"/v[\d.]+/[^/]+/messages", path):
+            return "graph", "graph.messages", 200, {
+                "messaging_product": "whatsapp",
+                "messages": [{"id": f"wamid.{uuid.uuid4().hex}"}],
+            }
+
+        if method == "POST" and path == "/messages/send_bot":
+            # The real server queues the Graph API call and answers right away
+            self._count("graph", "graph.messages")
+            msg = state.add_message(body["conversation_id"], "bot", body.get("content", ""))
+            return "internal", "send_bot", 200, {**msg, "status": "sending"}
+
+        m = re.fullmatch(r"/internals/whatsapp/by-phone-number-id/([^/]+)/with-org", path)
+        if m:
+            return "internal", "integration_with_org", 200, state.integration(m.group(1))
+
+        if re.fullmatch(rf"/internals/organizations/{_UUID}/ctas", path):
+            return "internal", "org_ctas", 200, []
+
+        if path == "/internals/leads/by-phone":
+            lead_id = state.leads_by_phone.get(query.get("phone", ""))
+            return "internal", "lead_by_phone", 200, state.leads.get(lead_id) if lead_id else None
+
+        if method == "POST" and path == "/internals/leads":
+            return "internal", "create_lead", 201, state.create_lead(body["phone"], body.get("name"))
+
+        m = re.fullmatch(rf"/internals/leads/({_UUID})", path)
+        if m and method == "PATCH":
+            lead = state.leads.get(m.group(1), {})
+            lead.update({k: v for k, v in query.items()})
+            return "internal", "update_lead", 200, lead
+
+        if path == "/internals/conversations/by-lead":
+            conv_id = state.conv_by_lead.get(query.get("lead_id", ""))
+            return "internal", "conversation_by_lead", 200, state.conversations.get(conv_id) if conv_id else None
+
+        if method == "POST" and path == "/internals/conversations":
+            return "internal", "create_conversation", 201, state.create_conversation(body["lead_id"])
+
+        if path == "/internals/conversations/due-followups":
+            return "internal", "due_followups", 200, state.due_followups()
+
+        m = re.fullmatch(rf"/internals/conversations/({_UUID})/followup-draft", path)
+        if m and method == "PUT":
+            conv = state.conversations.get(m.group(1))
+            with state.lock:
+                if conv is None or conv.get("next_followup_at") != body.get("next_followup_at"):
+                    return "internal", "followup_draft", 409, {"detail": "Follow-up schedule changed"}
+                conv["followup_draft"] = body["draft"]
+            return "internal", "followup_draft", 200, {"status": "stored"}
+
+        m = re.fullmatch(rf"/internals/conversations/({_UUID})/messages", path)
+        if m:
+            limit = int(query.get("limit", 3))
+            return "internal", "conversation_messages", 200, state.messages.get(m.group(1), [])[-limit:]
+
+        m = re.fullmatch(rf"/internals/conversations/({_UUID})", path)
+        if m:
+            conv = state.conversations.get(m.group(1))
+            if conv is None:
+                return "internal", "conversation", 404, {"detail": "Conversation not found"}
+            if method == "PATCH":
+                with state.lock:
+                    conv.update(body)
+                return "internal", "update_conversation", 200, conv
+            return "internal", "get_conversation", 200, conv
+
+        if method == "POST" and path in ("/internals/messages/incoming", "/internals/messages/outgoing"):
+            sender = "lead" if path.endswith("incoming") else body.get("message_from", "bot")
+            msg = state.add_message(body["conversation_id"], sender, body.get("content", ""))
+            return "internal", path.rsplit("/", 1)[-1] + "_message", 201, msg
+
+        if method == "POST" and path.startswith("/internals/"):
+            # conversation-events, emit-* ... accept and ignore
+            return "internal", path.rsplit("/", 1)[-1], 200, {"status": "ok"}
+
+        return "internal", "not_found", 404, {"detail": f"No mock for {method} {path}"}
+
+    def _handler_class(self):
+        backend = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real servers
+            # Headers and body are separate writes; without this, Nagle + delayed
+            # ACK adds ~40ms to every keep-alive response and swamps the results
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):  # noqa: A002 - silence per-request logs
+                pass
+
+            def _handle(self, method: str) -> None:
+                parsed = urlparse(self.path)
+                query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                try:
+                    body = json.loads(raw) if raw else {}
+                except json.JSONDecodeError:
+                    body = {}
+
+                if parsed.path == "/__stats":
+                    counts, routes = backend.count_snapshot()
+                    target, route, status, payload = None, None, 200, {"counts": counts, "routes": routes}
+                else:
+                    try:
+                        target, route, status, payload = backend._route(method, parsed.path, query, body)
+                    except Exception as e:
+                        target, route, status, payload = "internal", "error", 500, {"detail": str(e)}
+                    backend._count(target, route)
+                    backend._delay(target)
+
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def do_PATCH(self):
+                self._handle("PATCH")
+
+            def do_PUT(self):
+                self._handle("PUT")
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mock LLM / internal API / Graph API backend")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--llm-latency", default="lognormal:300,0.5")
+    parser.add_argument("--api-latency", default="fixed:5")
+    parser.add_argument("--graph-latency", default="lognormal:150,0.3")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    backend = MockBackend(args.port, args.llm_latency, args.api_latency, args.graph_latency, args.seed)
+    print(f"Mock backend listening on {backend.url} (stats: {backend.url}/__stats)")
+    try:
+        backend.server.serve_forever()
+    except KeyboardInterrupt:
+        backend.stop()
+
+
+if __name__ == "__main__":
+    main()
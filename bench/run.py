@@ -0,0 +1,288 @@
+"""
+End-to-end Worker Benchmark.
+Drives process_message and process_realtime_followup against the local mock
+backend (bench/mock_server.py) and reports latency percentiles, throughput
+and HTTP calls per message.
+
+Usage:
+    python -m bench.run --messages 200 --concurrency 16
+    python -m bench.run --messages 500 --concurrency 32 --llm-latency lognormal:600,0.6 --json
+    python -m bench.run --messages 200 --concurrency 16 --degraded   # load-shedding profile
+    python -m bench.run --followups 50 --drafted                    # follow-ups sent from pre-generated drafts
+
+Memory summarization is a deferred Celery task in production, so it is not
+part of the per-message path: enqueues are counted instead of sent to Redis.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from bench.mock_server import MockBackend
+
+
+# Inbound messages, roughly the mix seen in production (questions, chatter, acks)
+MESSAGE_CORPUS = [
+    "Hi, I saw your ad for the new project",
+    "What is the price range for 2 BHK?",
+    "Where exactly is the project located?",
+    "When is possession?",
+    "Do you have 3 BHK options?",
+    "ok",
+    "Thanks",
+    "Is there a home loan tie-up with any bank?",
+    "Can I visit the site this weekend?",
+    "My budget is around 90 lakh",
+    "What amenities are included?",
+    "Price range kya hai?",
+]
+
+
+# Questions that differ only in a number: the answer cache must never serve one for the other
+ANSWER_CACHE_NUMBER_PAIR = ("What is the price range for 2 BHK?", "What is the price range for 3 BHK?")
+
+
+def _configure_environment(backend_url: str) -> None:
+    """Point the worker at the mock backend. Must run before importing the worker."""
+    os.environ.update({
+        "INTERNAL_API_BASE_URL": backend_url,
+        "INTERNAL_API_SECRET": "bench",
+        "LLM_BASE_URL": f"{backend_url}/v1",
+        "LLM_MODEL": "bench-model",
+        "GROQ_API_KEY": "bench",
+        "LLM_TRANSPORT": "live",
+        "AWS_REGION": "us-east-1",
+        "AWS_ACCESS_KEY_ID": "bench",
+        "AWS_SECRET_ACCESS_KEY": "bench",
+        "QUEUE_URL": "http://localhost/bench-queue",
+        "CELERY_BROKER_URL": "memory://",
+        "CELERY_RESULT_BACKEND": "cache+memory://",
+    })
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _run_phase(
+    name: str,
+    jobs: List[Callable[[], bool]],
+    concurrency: int,
+    backend: MockBackend,
+) -> Dict:
+    """Run jobs concurrently; each job returns True on success."""
+    latencies: List[float] = []
+    errors = 0
+
+    def timed(job: Callable[[], bool]):
+        start = time.perf_counter()
+        try:
+            ok = job()
+        except Exception:
+            ok = False
+        return (time.perf_counter() - start) * 1000, ok
+
+    backend.reset_counts()
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for latency_ms, ok in pool.map(timed, jobs):
+            latencies.append(latency_ms)
+            errors += 0 if ok else 1
+    wall_seconds = time.perf_counter() - wall_start
+    counts, routes = backend.count_snapshot()
+
+    n = len(jobs) or 1
+    latencies.sort()
+    return {
+        "phase": name,
+        "count": len(jobs),
+        "errors": errors,
+        "concurrency": concurrency,
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_per_s": round(len(jobs) / wall_seconds, 2) if wall_seconds else 0.0,
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 50), 1),
+            "p95": round(_percentile(latencies, 95), 1),
+            "p99": round(_percentile(latencies, 99), 1),
+            "max": round(latencies[-1], 1) if latencies else 0.0,
+            "mean": round(statistics.fmean(latencies), 1) if latencies else 0.0,
+        },
+        "http_calls_per_message": {
+            target: round(value / n, 2) for target, value in sorted(counts.items())
+        },
+        "http_calls_total": sum(counts.values()),
+        "routes_per_message": {
+            route: round(value / n, 2)
+            for route, value in sorted(routes.items(), key=lambda kv: -kv[1])
+        },
+    }
+
+
+def _check_answer_cache() -> None:
+    """Fail fast if a cached answer would be reused for a question with other numbers."""
+    from llm.answer_cache import AnswerCache
+
+    cache = AnswerCache(ttl_seconds=60, max_entries_per_org=10, max_orgs=1)
+    stored, other = ANSWER_CACHE_NUMBER_PAIR
+    cache.store("bench-org", "v", "en", "greeting", stored, {}, {"message_text": "2 BHK starts at 85L"})
+    if cache.lookup("bench-org", "v", "en", "greeting", stored) is None:
+        raise SystemExit(f"Answer cache check failed: {stored!r} missed its own entry")
+    if cache.lookup("bench-org", "v", "en", "greeting", other) is not None:
+        raise SystemExit(f"Answer cache check failed: {other!r} was answered from {stored!r}")
+
+
+def _print_report(report: Dict) -> None:
+    lat = report["latency_ms"]
+    print(f"\n=== {report['phase']} ===")
+    print(f"  messages     {report['count']} ({report['errors']} errors), concurrency {report['concurrency']}")
+    print(f"  wall         {report['wall_seconds']}s  throughput {report['throughput_per_s']}/s")
+    print(f"  latency ms   p50 {lat['p50']}  p95 {lat['p95']}  p99 {lat['p99']}  max {lat['max']}")
+    calls = ", ".join(f"{k}={v}" for k, v in report["http_calls_per_message"].items())
+    print(f"  HTTP/msg     {calls}  (total {report['http_calls_total']})")
+    for route, value in list(report["routes_per_message"].items())[:12]:
+        print(f"    {route:<28} {value}")
+
+
+def main(argv: Optional[List[str]] = None) -> Dict:
+    parser = argparse.ArgumentParser(description="End-to-end worker benchmark")
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--leads", type=int, default=50, help="Distinct lead phone numbers")
+    parser.add_argument("--followups", type=int, default=50, help="Follow-ups to run after the message phase (0 to skip)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=5, help="Untimed messages sent first (client setup, imports)")
+    parser.add_argument("--llm-latency", default="lognormal:300,0.5")
+    parser.add_argument("--api-latency", default="fixed:5")
+    parser.add_argument("--graph-latency", default="lognormal:150,0.3")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--degraded", action="store_true", help="Force the load-shedding pipeline profile")
+    parser.add_argument(
+        "--drafted", action="store_true", help="Pre-generate follow-up drafts before the follow-up phase"
+    )
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    backend = MockBackend(0, args.llm_latency, args.api_latency, args.graph_latency, args.seed).start()
+    _configure_environment(backend.url)
+
+    # Imported late: these read configuration at import time
+    import logging
+    from llm.config import llm_config
+    from llm.metrics import metrics
+    from whatsapp_worker import main as worker_main
+    from whatsapp_worker import tasks as worker_tasks
+    from whatsapp_worker.load_shedding import MODE_DEGRADED, load_shedder
+    from whatsapp_worker.processors.api_client import api_client
+
+    logging.getLogger().setLevel(logging.WARNING)
+    _check_answer_cache()
+
+    # A local .env.dev may have overridden the environment; force the mock endpoints
+    llm_config.base_url = f"{backend.url}/v1"
+    api_client.base_url = backend.url
+    api_client.close()
+
+    memory_enqueues = {"count": 0}
+    enqueue_lock = threading.Lock()
+
+    def _count_memory_enqueue(conversation_id, llm_settings=None, countdown=None):
+        with enqueue_lock:
+            memory_enqueues["count"] += 1
+
+    worker_main.enqueue_memory_update = _count_memory_enqueue
+    worker_tasks.enqueue_memory_update = _count_memory_enqueue
+    # No broker either: follow-up ETA tasks are not queued (the followup phase calls them directly)
+    worker_main.schedule_followup = lambda *args: None
+    worker_tasks.schedule_followup = lambda *args: None
+
+    # process_message is called directly (no SQS loop), so backlog never moves the mode
+    load_shedder.enabled = False
+    if args.degraded:
+        load_shedder.mode = MODE_DEGRADED
+
+    rng = random.Random(args.seed)
+    phones = [f"91990000{i:04d}" for i in range(args.leads)]
+
+    def message_job(phone: str, text: str) -> Callable[[], bool]:
+        def job() -> bool:
+            _, status = worker_main.process_message(
+                phone_number_id="bench-phone-id",
+                sender_phone=phone,
+                sender_name="Bench Lead",
+                message_text=text,
+            )
+            return status == 200
+        return job
+
+    for i in range(args.warmup):
+        message_job(f"91880000{i:04d}", MESSAGE_CORPUS[0])()
+
+    metrics.reset()
+    memory_enqueues["count"] = 0
+    jobs = [
+        message_job(phones[i % len(phones)], rng.choice(MESSAGE_CORPUS))
+        for i in range(args.messages)
+    ]
+    reports = [_run_phase("process_message", jobs, args.concurrency, backend)]
+    reports[0]["memory_enqueues"] = memory_enqueues["count"]
+    reports[0]["pipeline_metrics"] = metrics.snapshot()["counters"]
+
+    if args.followups:
+        due = api_client.get_due_followups()[: args.followups]
+
+        if args.drafted:
+            def draft_job(context: Dict) -> Callable[[], bool]:
+                def job() -> bool:
+                    worker_tasks.draft_followup.run(
+                        context["conversation"]["id"], worker_tasks.followup_org_config(context), context["lead"]
+                    )
+                    return True
+                return job
+
+            reports.append(_run_phase("draft_followup", [draft_job(c) for c in due], args.concurrency, backend))
+            # Re-read so the contexts carry the stored drafts, as a claim would
+            drafted_ids = {c["conversation"]["id"] for c in due}
+            due = [c for c in api_client.get_due_followups() if c["conversation"]["id"] in drafted_ids]
+
+        def followup_job(context: Dict) -> Callable[[], bool]:
+            def job() -> bool:
+                worker_tasks.process_realtime_followup(context)
+                return True
+            return job
+
+        reports.append(_run_phase(
+            "process_realtime_followup", [followup_job(c) for c in due], args.concurrency, backend
+        ))
+
+    backend.stop()
+
+    result = {
+        "config": {
+            "llm_latency": args.llm_latency,
+            "api_latency": args.api_latency,
+            "graph_latency": args.graph_latency,
+            "seed": args.seed,
+            "profile": load_shedder.mode,
+        },
+        "phases": reports,
+    }
+    if args.json:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+    else:
+        for report in reports:
+            _print_report(report)
+    return result
+
+
+if __name__ == "__main__":
+    main()
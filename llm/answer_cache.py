@@ -0,0 +1,376 @@
+"""
+Per-Organization Answer Cache.
+Reuses Mouth answers for repeated FAQ-style questions (price range, location,
+possession date...) so Eyes, Brain and Mouth don't regenerate them each time.
+
+Questions are fingerprinted with MinHash over token shingles and looked up via
+LSH banding, so near-duplicate phrasings hit the same entry. Numbers in the
+question must match exactly ("2 BHK" never answers "3 BHK"). Entries are scoped
+per org + reply language + conversation stage, expire after a TTL, are evicted
+LRU, and are dropped wholesale when the org's business_description or
+flow_prompt changes. Replies that mention the lead (name, phone) or carry a
+scheduled CTA time are never stored.
+"""
+import hashlib
+import logging
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from llm.config import llm_config
+from llm.metrics import metrics
+from llm.schemas import PipelineInput, BrainOutput, MouthOutput, EyesOutput
+from server.enums import DecisionAction, RiskLevel
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================
+# MinHash Fingerprinting
+# ============================================================
+
+NUM_PERM = 32
+BANDS = 8
+ROWS_PER_BAND = NUM_PERM // BANDS
+SIMILARITY_THRESHOLD = 0.8
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(1729)  # Fixed seed: signatures must be stable across processes
+_PERMUTATIONS = [
+    (_rng.randint(1, _MERSENNE_PRIME - 1), _rng.randint(0, _MERSENNE_PRIME - 1))
+    for _ in range(NUM_PERM)
+]
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+# Words that carry no meaning for FAQ matching (English + common Hinglish)
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "be", "to", "of", "for", "in", "on", "at",
+    "and", "or", "i", "me", "my", "we", "you", "your", "it", "this", "that", "there",
+    "please", "pls", "plz", "sir", "madam", "can", "could", "would", "will", "do",
+    "does", "tell", "know", "want", "let", "about", "hai", "hain", "ka", "ki", "ke",
+    "ko", "kya", "bata", "batao", "dijiye", "mujhe", "hi", "hello", "ok",
+}
+
+QUESTION_WORDS = {
+    "what", "where", "when", "which", "how", "who", "why", "is", "are", "do", "does",
+    "can", "kya", "kitna", "kitne", "kab", "kahan", "kaha", "kaise", "konsa", "kaunsa",
+}
+
+MAX_QUESTION_CHARS = 200
+
+
+def _content_tokens(text: str) -> List[str]:
+    # Question words only shape the sentence; the topic words identify the FAQ
+    tokens = _TOKEN_RE.findall(text.lower())
+    return [
+        t for t in tokens
+        if (len(t) > 1 or t.isdigit()) and t not in STOPWORDS and t not in QUESTION_WORDS
+    ]
+
+
+def question_numbers(text: str) -> FrozenSet[str]:
+    """Numbers in a question (unit counts, budgets, floors); a cached answer must share all of them."""
+    return frozenset(_NUMBER_RE.findall(text))
+
+
+def _shingles(tokens: List[str]) -> Set[str]:
+    """Unigrams + bigrams: robust to word order and small rephrasings."""
+    shingles = set(tokens)
+    shingles.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    return shingles
+
+
+def _token_hash(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "big")
+
+
+def minhash_signature(text: str) -> Optional[Tuple[int, ...]]:
+    """MinHash signature of a question, or None if it has no content tokens."""
+    shingles = _shingles(_content_tokens(text))
+    if not shingles:
+        return None
+    hashes = [_token_hash(s) for s in shingles]
+    return tuple(
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def _similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity between two signatures."""
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_PERM
+
+
+def _band_keys(signature: Tuple[int, ...]) -> List[Tuple[int, Tuple[int, ...]]]:
+    return [
+        (band, signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND])
+        for band in range(BANDS)
+    ]
+
+
+def is_faq_question(text: str) -> bool:
+    """Heuristic: short, question-shaped messages are cacheable."""
+    text = (text or "").strip()
+    if not text or len(text) > MAX_QUESTION_CHARS:
+        return False
+    if "?" in text:
+        return True
+    tokens = _TOKEN_RE.findall(text.lower())
+    return bool(tokens) and (tokens[0] in QUESTION_WORDS or tokens[-1] in QUESTION_WORDS)
+
+
+def mentions_lead(text: str, context: PipelineInput) -> bool:
+    """True if a reply contains the lead's name or phone number (not reusable)."""
+    words = set(_TOKEN_RE.findall(text.lower()))
+    if any(len(part) > 2 and part in words for part in _TOKEN_RE.findall(context.lead_name.lower())):
+        return True
+    phone = re.sub(r"\D", "", context.lead_phone)[-10:]
+    return len(phone) >= 7 and phone in re.sub(r"\D", "", text)
+
+
+def config_version(context: PipelineInput) -> str:
+    """Fingerprint of the org config the answers were generated from."""
+    raw = f"{context.business_description}\x00{context.flow_prompt}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+# ============================================================
+# Cache Storage
+# ============================================================
+
+@dataclass
+class CachedAnswer:
+    signature: Tuple[int, ...]
+    numbers: FrozenSet[str]
+    language: str
+    stage: str
+    brain: dict
+    mouth: dict
+    created_at: float
+
+
+@dataclass
+class _OrgCache:
+    version: str
+    entries: "OrderedDict[int, CachedAnswer]" = field(default_factory=OrderedDict)
+    # (language, stage, band, band_values) -> entry ids
+    buckets: Dict[Tuple, Set[int]] = field(default_factory=dict)
+
+
+class AnswerCache:
+    """Thread-safe, process-local LRU + TTL cache of Mouth answers per org."""
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries_per_org: int,
+        max_orgs: int,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries_per_org = max_entries_per_org
+        self.max_orgs = max_orgs
+        self._orgs: "OrderedDict[str, _OrgCache]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    # ---------- internals (caller holds lock) ----------
+
+    def _get_org(self, org_id: str, version: str, create: bool) -> Optional[_OrgCache]:
+        org = self._orgs.get(org_id)
+        if org is not None and org.version != version:
+            logger.info(f"Answer cache invalidated for org {org_id}: business config changed")
+            metrics.incr("answer_cache.invalidation")
+            del self._orgs[org_id]
+            org = None
+        if org is None and create:
+            org = _OrgCache(version=version)
+            self._orgs[org_id] = org
+            while len(self._orgs) > self.max_orgs:
+                self._orgs.popitem(last=False)
+        if org is not None:
+            self._orgs.move_to_end(org_id)
+        return org
+
+    def _remove(self, org: _OrgCache, entry_id: int) -> None:
+        entry = org.entries.pop(entry_id, None)
+        if entry is None:
+            return
+        for band_key in _band_keys(entry.signature):
+            bucket = org.buckets.get((entry.language, entry.stage, *band_key))
+            if bucket:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del org.buckets[(entry.language, entry.stage, *band_key)]
+
+    # ---------- public API ----------
+
+    def lookup(
+        self, org_id: str, version: str, language: str, stage: str, question: str
+    ) -> Optional[CachedAnswer]:
+        signature = minhash_signature(question)
+        if signature is None:
+            return None
+        numbers = question_numbers(question)
+
+        now = time.time()
+        with self._lock:
+            org = self._get_org(org_id, version, create=False)
+            if org is None:
+                return None
+
+            candidates: Set[int] = set()
+            for band_key in _band_keys(signature):
+                candidates.update(org.buckets.get((language, stage, *band_key), ()))
+
+            best_id, best_score = None, 0.0
+            for entry_id in candidates:
+                entry = org.entries.get(entry_id)
+                if entry is None:
+                    continue
+                if now - entry.created_at > self.ttl_seconds:
+                    self._remove(org, entry_id)
+                    continue
+                if entry.numbers != numbers:
+                    continue
+                score = _similarity(signature, entry.signature)
+                if score > best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None or best_score < SIMILARITY_THRESHOLD:
+                return None
+
+            org.entries.move_to_end(best_id)
+            return org.entries[best_id]
+
+    def store(
+        self, org_id: str, version: str, language: str, stage: str, question: str, brain: dict, mouth: dict
+    ) -> None:
+        signature = minhash_signature(question)
+        if signature is None:
+            return
+
+        with self._lock:
+            org = self._get_org(org_id, version, create=True)
+            entry_id = self._next_id
+            self._next_id += 1
+            entry = CachedAnswer(
+                signature=signature,
+                numbers=question_numbers(question),
+                language=language,
+                stage=stage,
+                brain=brain,
+                mouth=mouth,
+                created_at=time.time(),
+            )
+            org.entries[entry_id] = entry
+            for band_key in _band_keys(signature):
+                org.buckets.setdefault((language, stage, *band_key), set()).add(entry_id)
+
+            while len(org.entries) > self.max_entries_per_org:
+                oldest_id = next(iter(org.entries))
+                self._remove(org, oldest_id)
+
+    def invalidate(self, org_id: str) -> None:
+        with self._lock:
+            self._orgs.pop(org_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._orgs.clear()
+
+
+answer_cache = AnswerCache(
+    ttl_seconds=llm_config.answer_cache_ttl_seconds,
+    max_entries_per_org=llm_config.answer_cache_max_entries,
+    max_orgs=llm_config.answer_cache_max_orgs,
+)
+
+
+# ============================================================
+# Pipeline Integration
+# ============================================================
+
+def get_cached_answer(
+    context: PipelineInput,
+    user_message: str,
+) -> Optional[Tuple[BrainOutput, MouthOutput]]:
+    """Return a cached (Brain, Mouth) pair for this question, if any."""
+    if not llm_config.answer_cache_enabled or not context.organization_id:
+        return None
+    if not is_faq_question(user_message):
+        return None
+
+    entry = answer_cache.lookup(
+        context.organization_id,
+        config_version(context),
+        context.language_pref,
+        context.conversation_stage.value,
+        user_message,
+    )
+    if entry is None:
+        metrics.incr("answer_cache.miss")
+        return None
+
+    mouth_output = MouthOutput.model_validate(entry.mouth)
+
+    # Never repeat an answer the lead has just seen
+    recent_bot_texts = {m.text for m in context.last_messages if m.sender == "bot"}
+    if mouth_output.message_text in recent_bot_texts:
+        metrics.incr("answer_cache.skip_repeat")
+        return None
+
+    metrics.incr("answer_cache.hit")
+    logger.info(f"Answer cache hit for org {context.organization_id}: {user_message[:60]!r}")
+    return BrainOutput.model_validate(entry.brain), mouth_output
+
+
+def maybe_cache_answer(
+    context: PipelineInput,
+    user_message: str,
+    eyes_output: Optional[EyesOutput],
+    brain_output: BrainOutput,
+    mouth_output: Optional[MouthOutput],
+) -> None:
+    """Cache a plain informational answer. Anything stateful is never cached."""
+    if not llm_config.answer_cache_enabled or not context.organization_id:
+        return
+    if mouth_output is None or not mouth_output.message_text or not mouth_output.self_check_passed:
+        return
+    if not is_faq_question(user_message):
+        return
+    if (
+        brain_output.action != DecisionAction.SEND_NOW
+        or brain_output.selected_cta_id is not None
+        or brain_output.cta_scheduled_at
+        or brain_output.needs_human_attention
+        or brain_output.new_stage != context.conversation_stage
+        or brain_output.confidence < 0.6
+    ):
+        return
+    if eyes_output is not None:
+        flags = eyes_output.risk_flags
+        if flags.policy_risk != RiskLevel.LOW or flags.hallucination_risk != RiskLevel.LOW:
+            return
+    if mouth_output.message_language != context.language_pref:
+        return
+    if mentions_lead(mouth_output.message_text, context):
+        metrics.incr("answer_cache.skip_personal")
+        return
+
+    answer_cache.store(
+        context.organization_id,
+        config_version(context),
+        context.language_pref,
+        context.conversation_stage.value,
+        user_message,
+        brain=brain_output.model_dump(mode="json"),
+        mouth=mouth_output.model_dump(mode="json"),
+    )
+    metrics.incr("answer_cache.store")
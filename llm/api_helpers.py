@@ -1,54 +1,27 @@
-import json
-import re
+import time
 import logging
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 
-from openai import OpenAI
 from llm.config import llm_config
+from llm.json_repair import (
+    ParseOutcome, TruncatedFieldError, coerce_to_schema, extract_json, schema_from_response_format,
+)
+from llm.metrics import metrics
+from llm.tracing import trace_recorder
+from llm.deadline import call_with_deadline
+from llm.rate_limit import governor
+from llm.transport import LLMResponse, LLMTransport, get_hedge_transport, get_transport
 
 logger = logging.getLogger(__name__)
 logging.getLogger("llm").disabled = True
 logging.getLogger("llm.api_helpers").disabled = True
 
-# Initialize single OpenAI client
-client = OpenAI(
-    api_key=llm_config.api_key,
-    base_url=llm_config.base_url,
-)
-
 def extract_json_from_text(text: str) -> Optional[Dict[str, Any]]:
     """
     Extract JSON object from text that may contain thinking/reasoning before JSON.
     """
-    if not text:
-        return None
-    
-    text = text.strip()
-    
-    # If it's already valid JSON, parse it directly
-    if text.startswith("{"):
-        try:
-            return json.loads(text)
-        except json.JSONDecodeError:
-            pass
-    
-    # Try to find JSON object in the text
-    json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', text, re.DOTALL)
-    if json_match:
-        try:
-            return json.loads(json_match.group())
-        except json.JSONDecodeError:
-            pass
-    
-    # Try markdown code block extraction
-    code_block_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', text, re.DOTALL)
-    if code_block_match:
-        try:
-            return json.loads(code_block_match.group(1))
-        except json.JSONDecodeError:
-            pass
-    
-    return None
+    data, _ = extract_json(text)
+    return data
 
 def make_api_call(
     messages: List[Dict[str, str]],
@@ -56,7 +29,11 @@ def make_api_call(
     temperature: float = 0.7,
     max_tokens: Optional[int] = None,
     step_name: str = "LLM",
-    strict: bool = False
+    strict: bool = False,
+    model: Optional[str] = None,
+    timeout: Optional[float] = None,
+    hedge_model: Optional[str] = None,
+    intact_fields: Tuple[str, ...] = (),
 ) -> Dict[str, Any]:
     """
     Execute LLM API call.
@@ -68,30 +45,25 @@ def make_api_call(
         max_tokens: Max tokens to generate
         step_name: Name of step for logging
         strict: If True, enforces strict JSON schema adherence (Groq specific)
+        model: Model override (defaults to LLM_MODEL)
+        timeout: Request timeout in seconds (defaults to LLM_TIMEOUT)
+        hedge_model: Alternate model for a hedged request if the primary is slow
+        intact_fields: Top-level fields that must not be cut off; a truncated
+            response ending inside one raises TruncatedFieldError
     
     Returns:
         Parsed JSON response dict
     """
-    llm_logger = logging.getLogger("llm")
-
-    # Set to True to see full prompts in terminal
-    DEBUG_PROMPTS = True
+    model = model or llm_config.model
+    start_time = time.time()
+    content = None
 
     try:
-        # Print full request for debugging
-        if DEBUG_PROMPTS:
-            print(f"\n{'='*60}")
-            print(f"[{step_name}] REQUEST")
-            print(f"{'='*60}")
-            for msg in messages:
-                print(f"--- {msg['role'].upper()} ---")
-                print(msg['content'])
-            print(f"{'='*60}\n")
-
         kwargs = {
-            "model": llm_config.model,
+            "model": model,
             "messages": messages,
             "temperature": temperature,
+            "timeout": timeout or llm_config.timeout,
         }
         
         if response_format:
@@ -106,34 +78,60 @@ def make_api_call(
         if max_tokens:
             kwargs["max_tokens"] = max_tokens
 
-        response = client.chat.completions.create(**kwargs)
-        content = response.choices[0].message.content
+        # Bounded by the pipeline deadline (if any); hedged if an alternate is configured
+        hedge_target = hedge_model or (model if llm_config.hedge_base_url else None)
+        if hedge_target == model and not llm_config.hedge_base_url:
+            hedge_target = None
+        response = call_with_deadline(
+            step_name.lower(),
+            model,
+            _request_sender(get_transport(), kwargs, model),
+            hedge=_request_sender(get_hedge_transport(), kwargs, hedge_target) if hedge_target else None,
+            hedge_model=hedge_target,
+            timeout=kwargs["timeout"],
+        )
+        content = response.content
+        latency_ms = int((time.time() - start_time) * 1000)
 
-        # Print full response for debugging
-        if DEBUG_PROMPTS:
-            print(f"\n{'='*60}")
-            print(f"[{step_name}] RESPONSE")
-            print(f"{'='*60}")
-            print(content)
-            print(f"{'='*60}\n")
+        usage = response.usage
+        metrics.observe("llm.latency_ms", latency_ms, step=step_name, model=model)
+        if usage:
+            metrics.incr("llm.tokens", usage.get("total_tokens", 0), step=step_name, model=model)
+        trace_recorder.record(step_name, model, messages, latency_ms, response=content, usage=usage)
         
-        # If strict mode was used, we can trust the JSON
-        if strict:
-            return json.loads(content)
+        data, outcome = extract_json(content)
+        metrics.incr("llm.json_parse", step=step_name, outcome=outcome)
+        if data is None:
+            raise ValueError(f"{step_name}: Could not parse JSON from response: {(content or '')[:100]}...")
+        if outcome == ParseOutcome.TRUNCATED and data and list(data)[-1] in intact_fields:
+            # Closing the JSON would send half a value as if it were whole
+            raise TruncatedFieldError(list(data)[-1])
+        if outcome in (ParseOutcome.REPAIRED, ParseOutcome.TRUNCATED):
+            # Without repair this response would have failed the step
+            metrics.incr("llm.json_repair.avoided_fallback", step=step_name)
+            logger.warning(f"{step_name}: Invalid JSON, recovered via {outcome} parse.")
 
-        # Fallback logic for non-strict mode
-        try:
-            return json.loads(content)
-        except json.JSONDecodeError:
-            # Try extraction from text
-            extracted = extract_json_from_text(content)
-            if extracted:
-                logger.warning(f"{step_name}: Invalid JSON, but successfully extracted from text fallback.")
-                return extracted
-            raise ValueError(f"{step_name}: Could not parse JSON from response: {content[:100]}...")
+        data, coerced = coerce_to_schema(data, schema_from_response_format(response_format))
+        if coerced:
+            metrics.incr("llm.json_coerced", coerced, step=step_name)
+        return data
             
     except Exception as e:
-        print(f"[LLM ERROR] {step_name}: {e}")
+        if content is None:
+            # Transport/API failure: the successful-response trace was never written
+            latency_ms = int((time.time() - start_time) * 1000)
+            metrics.incr("llm.errors", step=step_name, model=model)
+            trace_recorder.record(step_name, model, messages, latency_ms, error=str(e))
         logger.error(f"{step_name} API call failed: {e}")
         raise
 
+
+def _request_sender(transport: LLMTransport, kwargs: Dict[str, Any], model: str):
+    """Bind a request to a transport/model; the caller supplies the timeout."""
+    def send(request_timeout: Optional[float]) -> LLMResponse:
+        request = dict(kwargs, model=model)
+        if request_timeout is not None:
+            request["timeout"] = request_timeout
+        # Queues for RPM/TPM capacity (within the timeout) and retries 429s
+        return governor.execute(model, request, transport, max_wait=request_timeout)
+    return send
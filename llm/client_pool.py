@@ -0,0 +1,199 @@
+"""
+Multi-endpoint LLM Client Pool.
+Spreads requests over several OpenAI-compatible endpoints (keys, regions or
+providers) and steers traffic away from slow or failing ones.
+
+Configured with LLM_ENDPOINTS, a JSON list:
+    [
+      {"name": "groq-a", "base_url": "https://api.groq.com/openai/v1", "api_key_env": "GROQ_API_KEY"},
+      {"name": "groq-b", "base_url": "https://api.groq.com/openai/v1", "api_key_env": "GROQ_API_KEY_2"},
+      {"name": "backup", "base_url": "https://...", "api_key_env": "BACKUP_KEY", "weight": 0.5,
+       "models": {"llama-3.3-70b-versatile": "meta-llama/Llama-3.3-70B-Instruct"}}
+    ]
+"models" (optional) maps our model names to the endpoint's names and limits
+the endpoint to those models.
+
+Routing: each endpoint keeps an EWMA of latency and error rate; endpoints are
+picked at random weighted by weight / (latency * (1 + error penalty)).
+After consecutive failures an endpoint is ejected for a cooldown (doubling
+on repeat ejections), then gets a trial request; one success restores it.
+A 429 ejects the endpoint at once, for the provider's retry-after, so the
+retry goes to another endpoint. The rate limiter (llm/rate_limit.py) keeps
+its buckets per model + endpoint: each endpoint has its own quota.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from llm.config import llm_config
+from llm.metrics import metrics
+from llm.rate_limit import retry_after_seconds
+from llm.transport import LiveTransport, LLMResponse, LLMTransport
+
+logger = logging.getLogger(__name__)
+
+EWMA_ALPHA = 0.2
+ERROR_PENALTY = 10.0            # error_rate 0.1 doubles an endpoint's effective latency
+EJECT_AFTER_FAILURES = 3
+BASE_COOLDOWN_SECONDS = 30.0
+MAX_COOLDOWN_SECONDS = 300.0
+INITIAL_LATENCY_SECONDS = 1.0   # Prior for endpoints with no samples yet
+
+
+@dataclass
+class Endpoint:
+    name: str
+    base_url: str
+    api_key: Optional[str]
+    weight: float = 1.0
+    models: Dict[str, str] = field(default_factory=dict)
+
+    # Health (guarded by the pool lock)
+    latency_ewma: float = INITIAL_LATENCY_SECONDS
+    error_ewma: float = 0.0
+    consecutive_failures: int = 0
+    ejected_until: float = 0.0
+    ejections: int = 0
+
+    def __post_init__(self) -> None:
+        self.transport = LiveTransport(self.base_url, self.api_key)
+
+    def supports(self, model: str) -> bool:
+        return not self.models or model in self.models
+
+    def score(self) -> float:
+        return self.weight / (self.latency_ewma * (1 + ERROR_PENALTY * self.error_ewma))
+
+
+def _is_endpoint_fault(error: Exception) -> bool:
+    """Errors that say something about the endpoint's health (not our request)."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        return True  # Connection errors, timeouts
+    return status == 429 or status >= 500
+
+
+class ClientPool(LLMTransport):
+    """LLMTransport that load-balances over healthy endpoints."""
+
+    def __init__(self, endpoints: List[Endpoint]) -> None:
+        if not endpoints:
+            raise ValueError("ClientPool needs at least one endpoint")
+        self.endpoints = endpoints
+        self._lock = threading.Lock()
+        self._rng = random.Random()
+
+    # ---------- selection ----------
+
+    def _pick(self, model: str) -> Endpoint:
+        now = time.monotonic()
+        with self._lock:
+            candidates = [e for e in self.endpoints if e.supports(model)]
+            if not candidates:
+                raise ValueError(f"No LLM endpoint serves model {model!r}")
+
+            healthy = [e for e in candidates if e.ejected_until <= now]
+            if not healthy:
+                # Everything is ejected: try the one that recovers first
+                return min(candidates, key=lambda e: e.ejected_until)
+
+            scores = [e.score() for e in healthy]
+            return self._rng.choices(healthy, weights=scores, k=1)[0]
+
+    # ---------- health ----------
+
+    def _record_success(self, endpoint: Endpoint, latency: float) -> None:
+        with self._lock:
+            endpoint.latency_ewma += EWMA_ALPHA * (latency - endpoint.latency_ewma)
+            endpoint.error_ewma *= 1 - EWMA_ALPHA
+            if endpoint.ejections and endpoint.consecutive_failures:
+                logger.info(f"LLM endpoint {endpoint.name} recovered")
+            endpoint.consecutive_failures = 0
+            endpoint.ejections = 0
+        metrics.incr("llm.endpoint.requests", endpoint=endpoint.name, outcome="ok")
+        metrics.observe("llm.endpoint.latency_ms", latency * 1000, endpoint=endpoint.name)
+
+    def _record_failure(self, endpoint: Endpoint, latency: float, error: Exception) -> None:
+        throttled = getattr(error, "status_code", None) == 429
+        with self._lock:
+            endpoint.error_ewma += EWMA_ALPHA * (1 - endpoint.error_ewma)
+            # A timeout is also a latency signal
+            endpoint.latency_ewma += EWMA_ALPHA * (latency - endpoint.latency_ewma)
+            endpoint.consecutive_failures += 1
+            if throttled:
+                # Out of quota: unhealthy until the provider's retry-after
+                ejected = retry_after_seconds(error) or BASE_COOLDOWN_SECONDS
+                endpoint.ejected_until = max(endpoint.ejected_until, time.monotonic() + ejected)
+            elif endpoint.consecutive_failures >= EJECT_AFTER_FAILURES:
+                cooldown = min(BASE_COOLDOWN_SECONDS * (2 ** endpoint.ejections), MAX_COOLDOWN_SECONDS)
+                endpoint.ejected_until = time.monotonic() + cooldown
+                endpoint.ejections += 1
+                # Half-open after the cooldown: one more failure re-ejects immediately
+                endpoint.consecutive_failures = EJECT_AFTER_FAILURES - 1
+                ejected = cooldown
+            else:
+                ejected = None
+        metrics.incr("llm.endpoint.requests", endpoint=endpoint.name, outcome="error")
+        if ejected:
+            metrics.incr("llm.endpoint.ejected", endpoint=endpoint.name)
+            logger.warning(f"LLM endpoint {endpoint.name} ejected for {ejected:.1f}s: {error}")
+
+    # ---------- LLMTransport ----------
+
+    def complete(self, request: Dict[str, Any]) -> LLMResponse:
+        _, send = self.route(request)
+        return send(request)
+
+    def route(self, request: Dict[str, Any]) -> Tuple[Optional[str], Callable[[Dict[str, Any]], LLMResponse]]:
+        endpoint = self._pick(request.get("model"))
+        return endpoint.name, lambda routed: self._send(endpoint, routed)
+
+    def _send(self, endpoint: Endpoint, request: Dict[str, Any]) -> LLMResponse:
+        model = request.get("model")
+        if endpoint.models:
+            request = dict(request, model=endpoint.models[model])
+
+        start = time.monotonic()
+        try:
+            response = endpoint.transport.complete(request)
+        except Exception as e:
+            if _is_endpoint_fault(e):
+                self._record_failure(endpoint, time.monotonic() - start, e)
+            raise
+        self._record_success(endpoint, time.monotonic() - start)
+        return response
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Current health of every endpoint (for logs / debugging)."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "name": e.name,
+                    "latency_ms": round(e.latency_ewma * 1000, 1),
+                    "error_rate": round(e.error_ewma, 3),
+                    "ejected_for_s": round(max(0.0, e.ejected_until - now), 1),
+                }
+                for e in self.endpoints
+            ]
+
+
+def build_pool(endpoint_configs: List[Dict[str, Any]]) -> ClientPool:
+    """Build a pool from LLM_ENDPOINTS entries."""
+    endpoints = []
+    for i, cfg in enumerate(endpoint_configs):
+        api_key = cfg.get("api_key")
+        if not api_key and cfg.get("api_key_env"):
+            api_key = os.getenv(cfg["api_key_env"])
+        endpoints.append(Endpoint(
+            name=cfg.get("name") or f"endpoint-{i}",
+            base_url=cfg.get("base_url") or llm_config.base_url,
+            api_key=api_key or llm_config.api_key,
+            weight=float(cfg.get("weight", 1.0)),
+            models=cfg.get("models") or {},
+        ))
+    return ClientPool(endpoints)
@@ -3,9 +3,15 @@ LLM Configuration for HTL Pipeline.
 Uses Groq for fast, cost-effective inference.
 """
 import os
+import json
+import logging
+from dataclasses import dataclass, replace
 from pathlib import Path
+from typing import Any, Dict, List, Optional
 from dotenv import load_dotenv
 
+logger = logging.getLogger(__name__)
+
 # Load environment variables
 current_file_path = Path(__file__).resolve()
 root_dir = current_file_path.parent.parent
@@ -14,11 +20,151 @@ env_path = root_dir / ".env.dev"
 if env_path.exists():
     load_dotenv(dotenv_path=env_path, override=True)
 
+
+# "fused" is Eyes+Brain in one call, used only by the degraded profile
+PIPELINE_STEPS = ("eyes", "brain", "mouth", "memory", "fused")
+
+# Defaults that match the historical hard-coded values in each step
+_STEP_DEFAULTS = {
+    "eyes": {"temperature": 0.3, "max_tokens": None},
+    "brain": {"temperature": 0.3, "max_tokens": None},
+    "mouth": {"temperature": 0.7, "max_tokens": None},
+    "memory": {"temperature": 0.7, "max_tokens": 2000},
+    "fused": {"temperature": 0.3, "max_tokens": None},
+}
+
+_OVERRIDABLE_FIELDS = {
+    "model": str,
+    "temperature": float,
+    "max_tokens": int,
+    "timeout": float,
+    "hedge_model": str,
+}
+
+
+def _env_float(name: str) -> Optional[float]:
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else None
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else None
+
+
+@dataclass(frozen=True)
+class StepConfig:
+    """Model routing for a single pipeline step."""
+    model: str
+    temperature: float
+    max_tokens: Optional[int]
+    timeout: float
+    hedge_model: Optional[str] = None  # Alternate model for hedged requests
+
+
 class LLMConfig:
     def __init__(self)-> None:  
         self.api_key=os.getenv("GROQ_API_KEY")
         self.model=os.getenv("LLM_MODEL")
         self.base_url=os.getenv("LLM_BASE_URL")
+        self.timeout = float(os.getenv("LLM_TIMEOUT", "30"))
+        self.hedge_model = os.getenv("LLM_HEDGE_MODEL") or None
+        # Smaller model for the degraded (load-shedding) profile; unset = keep step models
+        self.degraded_model = os.getenv("LLM_DEGRADED_MODEL") or None
+        # Optional multi-endpoint pool (see llm/client_pool.py); empty = single endpoint
+        self.endpoints: List[Dict[str, Any]] = json.loads(os.getenv("LLM_ENDPOINTS") or "[]")
+
+        # Per-step routing: LLM_<STEP>_MODEL / _TEMPERATURE / _MAX_TOKENS / _TIMEOUT
+        # e.g. LLM_EYES_MODEL=llama-3.1-8b-instant for cheap classification
+        self.steps: Dict[str, StepConfig] = {}
+        for step in PIPELINE_STEPS:
+            prefix = f"LLM_{step.upper()}"
+            defaults = _STEP_DEFAULTS[step]
+            temperature = _env_float(f"{prefix}_TEMPERATURE")
+            max_tokens = _env_int(f"{prefix}_MAX_TOKENS")
+            timeout = _env_float(f"{prefix}_TIMEOUT")
+            default_model = self.degraded_model if step == "fused" else None
+            self.steps[step] = StepConfig(
+                model=os.getenv(f"{prefix}_MODEL") or default_model or self.model,
+                temperature=temperature if temperature is not None else defaults["temperature"],
+                max_tokens=max_tokens if max_tokens is not None else defaults["max_tokens"],
+                timeout=timeout if timeout is not None else self.timeout,
+                hedge_model=os.getenv(f"{prefix}_HEDGE_MODEL") or self.hedge_model,
+            )
+
+        # End-to-end pipeline deadline, split across Eyes/Brain/Mouth (or Fused/Mouth) by share
+        self.pipeline_deadline_seconds = float(os.getenv("LLM_PIPELINE_DEADLINE_SECONDS", "8"))
+        self.step_budget_shares: Dict[str, float] = {"eyes": 0.3, "brain": 0.3, "fused": 0.5, "mouth": 0.4}
+        if os.getenv("LLM_STEP_BUDGET_SHARES"):
+            self.step_budget_shares.update(json.loads(os.environ["LLM_STEP_BUDGET_SHARES"]))
+
+        # Hedged requests: fire a second request once the primary passes the step's p95.
+        # LLM_HEDGE_BASE_URL/_API_KEY point hedges at an alternate endpoint.
+        self.hedge_base_url = os.getenv("LLM_HEDGE_BASE_URL") or None
+        self.hedge_api_key = os.getenv("LLM_HEDGE_API_KEY") or self.api_key
+        self.hedge_default_delay_seconds = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_MS", "2500")) / 1000
+        self.hedge_min_delay_seconds = float(os.getenv("LLM_HEDGE_MIN_DELAY_MS", "300")) / 1000
+        self.hedge_pool_size = int(os.getenv("LLM_HEDGE_POOL_SIZE", "32"))
+
+        # Client-side rate limiting (see llm/rate_limit.py), e.g.
+        # {"llama-3.3-70b-versatile": {"rpm": 30, "tpm": 6000, "concurrency": 8}, "default": {...}}
+        self.rate_limits: Dict[str, Dict[str, Any]] = json.loads(os.getenv("LLM_RATE_LIMITS") or "{}")
+        self.rate_limit_redis_url = os.getenv("LLM_RATE_LIMIT_REDIS_URL") or None
+        # Retries for 429s and transient errors (handled by the rate limiter, not the client)
+        self.max_retries = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+        # Mouth replies that fail a hard guardrail (llm/guardrails.py) are regenerated up to this many times
+        self.guardrail_max_regenerations = int(os.getenv("LLM_GUARDRAIL_MAX_REGENERATIONS", "1"))
+
+        # Per-org answer cache for FAQ-style questions
+        self.answer_cache_enabled = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+        self.answer_cache_ttl_seconds = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "21600"))
+        self.answer_cache_max_entries = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "256"))
+        self.answer_cache_max_orgs = int(os.getenv("ANSWER_CACHE_MAX_ORGS", "500"))
+
+        # Transport: live | record | replay (see llm/transport.py)
+        self.transport = os.getenv("LLM_TRANSPORT", "live").lower()
+        self.cassette_dir = os.getenv("LLM_CASSETTE_DIR", "cassettes")
+        self.replay_latency_ms = os.getenv("LLM_REPLAY_LATENCY_MS") or None
+
+        # Sampled LLM trace recorder (see llm/tracing.py)
+        self.trace_sample_rate = float(os.getenv("LLM_TRACE_SAMPLE_RATE", "0"))
+        self.trace_include_prompts = os.getenv("LLM_TRACE_INCLUDE_PROMPTS", "true").lower() == "true"
+        self.trace_force_conversations = {
+            c.strip() for c in os.getenv("LLM_TRACE_FORCE_CONVERSATIONS", "").split(",") if c.strip()
+        }
+        self.trace_path = os.getenv("LLM_TRACE_PATH", "logs/llm_traces.jsonl")
+        self.trace_max_bytes = int(os.getenv("LLM_TRACE_MAX_BYTES", "50000000"))
+        self.trace_backup_count = int(os.getenv("LLM_TRACE_BACKUP_COUNT", "5"))
+        self.trace_queue_size = int(os.getenv("LLM_TRACE_QUEUE_SIZE", "1000"))
+
+    def for_step(
+        self,
+        step: str,
+        org_overrides: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> StepConfig:
+        """
+        Resolve the config for a pipeline step.
+
+        org_overrides comes from Organization.llm_settings, e.g.:
+            {"default": {"timeout": 20}, "eyes": {"model": "llama-3.1-8b-instant"}}
+        "default" applies to every step; step keys win over "default".
+        """
+        config = self.steps[step]
+        if not org_overrides:
+            return config
+
+        merged: Dict[str, Any] = {}
+        for scope in ("default", step):
+            for key, value in (org_overrides.get(scope) or {}).items():
+                caster = _OVERRIDABLE_FIELDS.get(key)
+                if caster is None or value is None:
+                    continue
+                try:
+                    merged[key] = caster(value)
+                except (TypeError, ValueError):
+                    logger.warning(f"Ignoring invalid LLM override {scope}.{key}={value!r}")
+        return replace(config, **merged) if merged else config
 
 # Exported configuration object
 llm_config = LLMConfig()
@@ -0,0 +1,214 @@
+"""
+Pipeline Deadlines and Hedged Requests.
+
+A pipeline run gets one end-to-end deadline (LLM_PIPELINE_DEADLINE_SECONDS).
+Each LLM step receives a share of whatever time is left, so a slow Eyes call
+eats into the budget of later steps instead of stalling the worker slot.
+
+Within its budget a step may hedge: if the primary request has not answered
+by the step's observed p95 latency, a second request is sent to the hedge
+model/endpoint and the first answer wins. When the budget runs out the call
+raises DeadlineExceeded, which each step already handles with its fallback.
+"""
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+from llm.config import llm_config
+from llm.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(TimeoutError):
+    """The pipeline (or step) ran out of time."""
+
+
+# ============================================================
+# Deadline Context
+# ============================================================
+
+# Steps that share the deadline, per pipeline profile
+STEP_ORDER_FULL = ("eyes", "brain", "mouth")
+STEP_ORDER_DEGRADED = ("fused", "mouth")
+
+# Absolute time.monotonic() at which the current pipeline run must finish
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("llm_deadline", default=None)
+
+
+@contextmanager
+def pipeline_deadline(seconds: Optional[float] = None):
+    """
+    Bound every LLM call in the block by one end-to-end deadline.
+
+    Usage:
+        with pipeline_deadline(8):
+            run_eyes(...); run_brain(...); run_mouth(...)
+    """
+    seconds = llm_config.pipeline_deadline_seconds if seconds is None else seconds
+    token = _deadline.set(time.monotonic() + seconds if seconds and seconds > 0 else None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current deadline, or None if there is none."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def step_budget(step: str) -> Optional[float]:
+    """
+    Time this step may use: its share of the remaining time, relative to the
+    steps still to run after it.
+    """
+    left = remaining()
+    if left is None:
+        return None
+    if left <= 0:
+        return 0.0
+
+    shares = llm_config.step_budget_shares
+    profile = STEP_ORDER_DEGRADED if step == "fused" else STEP_ORDER_FULL
+    order = [s for s in profile if s in shares]
+    if step not in order:
+        return left
+    pending = order[order.index(step):]
+    total = sum(shares[s] for s in pending) or 1.0
+    return left * shares[step] / total
+
+
+# ============================================================
+# Latency Tracking (for hedge delays)
+# ============================================================
+
+class LatencyTracker:
+    """Rolling per-(step, model) latency windows."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20) -> None:
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[Tuple[str, str], Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, step: str, model: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get((step, model))
+            if samples is None:
+                samples = self._samples[(step, model)] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def p95(self, step: str, model: str) -> Optional[float]:
+        with self._lock:
+            samples = list(self._samples.get((step, model), ()))
+        if len(samples) < self.min_samples:
+            return None
+        samples.sort()
+        return samples[int(0.95 * (len(samples) - 1))]
+
+
+latency_tracker = LatencyTracker()
+
+# Shared pool for bounded / hedged calls. Abandoned calls finish in the background
+# and are bounded by the per-request timeout.
+_executor = ThreadPoolExecutor(max_workers=llm_config.hedge_pool_size, thread_name_prefix="llm-call")
+
+
+def _hedge_delay(step: str, model: str) -> float:
+    p95 = latency_tracker.p95(step, model)
+    if p95 is None:
+        return llm_config.hedge_default_delay_seconds
+    return max(p95, llm_config.hedge_min_delay_seconds)
+
+
+# ============================================================
+# Bounded / Hedged Execution
+# ============================================================
+
+def call_with_deadline(
+    step: str,
+    model: str,
+    primary: Callable[[Optional[float]], T],
+    hedge: Optional[Callable[[Optional[float]], T]] = None,
+    hedge_model: Optional[str] = None,
+    timeout: Optional[float] = None,
+) -> T:
+    """
+    Run primary(timeout) within the step budget, hedging if configured.
+
+    primary/hedge receive the per-request timeout they should use.
+    Without an active deadline and without a hedge this is a plain call.
+    """
+    budget = step_budget(step)
+    if budget is not None and budget <= 0:
+        metrics.incr("llm.deadline_exceeded", step=step, phase="before_call")
+        raise DeadlineExceeded(f"{step}: no time left in pipeline deadline")
+
+    limits = [t for t in (timeout, budget) if t is not None]
+    request_timeout = min(limits) if limits else None
+    if budget is None and hedge is None:
+        return _timed(step, model, primary, request_timeout)
+
+    wait_limit = budget if budget is not None else request_timeout
+    started = time.monotonic()
+    futures: Dict[Future, str] = {_executor.submit(_timed, step, model, primary, request_timeout): "primary"}
+
+    if hedge is not None:
+        delay = _hedge_delay(step, model)
+        if wait_limit is None or delay < wait_limit:
+            done, _ = wait(futures, timeout=delay)
+            if not done:
+                hedge_timeout = (
+                    max(request_timeout - (time.monotonic() - started), 0.1) if request_timeout else None
+                )
+                futures[_executor.submit(
+                    _timed, step, hedge_model or model, hedge, hedge_timeout
+                )] = "hedge"
+                metrics.incr("llm.hedge", step=step, outcome="launched")
+                logger.info(f"{step}: primary slower than {delay:.2f}s, sent hedged request")
+
+    last_error: Optional[BaseException] = None
+    pending = set(futures)
+    while pending:
+        left = None if wait_limit is None else wait_limit - (time.monotonic() - started)
+        if left is not None and left <= 0:
+            break
+        done, pending = wait(pending, timeout=left, return_when=FIRST_COMPLETED)
+        for future in done:
+            error = future.exception()
+            if error is None:
+                if len(futures) > 1:
+                    metrics.incr("llm.hedge", step=step, outcome=f"{futures[future]}_won")
+                return future.result()
+            last_error = error
+        if not done:
+            break
+
+    if pending or last_error is None:
+        metrics.incr("llm.deadline_exceeded", step=step, phase="in_call")
+        raise DeadlineExceeded(f"{step}: no response within {wait_limit:.2f}s budget")
+    raise last_error
+
+
+def _timed(step: str, model: str, call: Callable[[Optional[float]], T], timeout: Optional[float]) -> T:
+    """Run a call and feed its latency into the tracker (successes only)."""
+    start = time.monotonic()
+    try:
+        result = call(timeout)
+    except Exception as e:
+        if isinstance(e, TimeoutError) or "timed out" in str(e).lower():
+            metrics.incr("llm.timeout", step=step, model=model)
+        raise
+    latency_tracker.record(step, model, time.monotonic() - start)
+    return result
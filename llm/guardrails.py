@@ -0,0 +1,158 @@
+"""
+Mouth Output Guardrails.
+Deterministic checks and rewrites for outbound messages, so small style
+violations are fixed locally instead of costing another LLM round-trip.
+
+Soft violations are rewritten in place:
+    bullets / numbering  -> stripped, and the lines joined into one
+    markdown (**, #)     -> stripped, and the lines joined into one
+    slang address terms  -> removed ("bhai", "bro", ...)
+    too many questions   -> extra questions dropped (the last ones are kept)
+    too many words       -> trimmed at a sentence boundary
+
+Hard failures cannot be fixed without changing meaning and are the only
+reason to regenerate: empty text, template placeholders left in the text,
+or a first sentence that alone exceeds the word limit.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+# Address terms the Mouth prompt forbids; removed when used vocatively ("Sure bro," / "ok bhai!")
+SLANG_TERMS = ("bhai", "bro", "bruh", "boss", "dude")
+
+_BULLET_RE = re.compile(r"^\s*(?:[-*•▪●]|\d+[.)])\s+", re.MULTILINE)
+_MARKDOWN_RE = re.compile(r"\*\*|__|^\s*#+\s*", re.MULTILINE)
+_SLANG_RE = re.compile(
+    r"[ \t]*,?[ \t]*\b(?:" + "|".join(SLANG_TERMS) + r")\b(?=\s*[,.!?]|\s*$)",
+    re.IGNORECASE,
+)
+_PLACEHOLDER_RE = re.compile(r"\{[^{}]*\}|\[(?:your |insert |customer |lead )?[A-Za-z _]*name\]", re.IGNORECASE)
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")  # Not inside "1.2 Cr" or "Rs.85"
+_WHITESPACE_RE = re.compile(r"\s+")
+_SPACE_BEFORE_PUNCT_RE = re.compile(r"\s+([,.!?])")
+
+
+@dataclass
+class GuardrailResult:
+    text: str
+    violations: List[str] = field(default_factory=list)   # What was found (fixed or not)
+    fixes: List[str] = field(default_factory=list)        # Rules that rewrote the text
+    hard_failure: Optional[str] = None                    # Set when the text must be regenerated
+
+    @property
+    def passed(self) -> bool:
+        return self.hard_failure is None
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
+def count_questions(text: str) -> int:
+    return sum(1 for s in _sentences(text) if s.endswith("?"))
+
+
+def _sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_END_RE.split(text) if s.strip()]
+
+
+def _drop_extra_questions(sentences: List[str], max_questions: int) -> List[str]:
+    """Keep the last max_questions questions (usually the guided one that closes the message)."""
+    question_positions = [i for i, s in enumerate(sentences) if s.endswith("?")]
+    drop = set(question_positions[: max(len(question_positions) - max_questions, 0)])
+    return [s for i, s in enumerate(sentences) if i not in drop]
+
+
+def _trim_to_words(sentences: List[str], max_words: int) -> Optional[List[str]]:
+    """
+    Drop whole sentences until the text fits, keeping a closing question if
+    there is one. None if not even the first sentence fits.
+    """
+    closing = sentences[-1] if sentences[-1].endswith("?") else None
+    budget = max_words - (count_words(closing) if closing else 0)
+    body = sentences[:-1] if closing else sentences
+
+    kept: List[str] = []
+    used = 0
+    for sentence in body:
+        words = count_words(sentence)
+        if used + words > budget:
+            break
+        kept.append(sentence)
+        used += words
+
+    if closing and (kept or count_words(closing) <= max_words):
+        return kept + [closing]
+    return kept or None
+
+
+def _single_line(text: str) -> str:
+    """Join lines (e.g. former bullets) into one WhatsApp-style line and tidy punctuation."""
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    joined = ""
+    for line in lines:
+        if joined:
+            joined += ("" if joined[-1] in ".!?,:;" else ",") + " "
+        joined += line
+    joined = _SPACE_BEFORE_PUNCT_RE.sub(r"\1", _WHITESPACE_RE.sub(" ", joined)).lstrip(" ,;")
+    return joined[:1].upper() + joined[1:]
+
+
+def enforce(text: Optional[str], max_words: int, max_questions: int) -> GuardrailResult:
+    """Check a Mouth message against the limits and rewrite what can be fixed locally."""
+    result = GuardrailResult(text=(text or "").strip())
+    if not result.text:
+        result.violations.append("empty")
+        result.hard_failure = "empty"
+        return result
+
+    if _PLACEHOLDER_RE.search(result.text):
+        result.violations.append("placeholder")
+        result.hard_failure = "placeholder"
+        return result
+
+    # ---------- formatting ----------
+    for rule, pattern in (("bullets", _BULLET_RE), ("markdown", _MARKDOWN_RE), ("slang", _SLANG_RE)):
+        rewritten = pattern.sub("", result.text)
+        if rewritten != result.text:
+            result.violations.append(rule)
+            result.fixes.append(rule)
+            result.text = rewritten
+    # Former list items become one line; line breaks the model chose on its own stay
+    if {"bullets", "markdown"} & set(result.fixes):
+        joined = _single_line(result.text)
+        if joined != result.text:
+            result.fixes.append("single_line")
+            result.text = joined
+
+    sentences = _sentences(result.text)
+    if not sentences:
+        result.violations.append("empty")
+        result.hard_failure = "empty"
+        return result
+
+    # ---------- questions ----------
+    questions = sum(1 for s in sentences if s.endswith("?"))
+    if questions > max_questions:
+        result.violations.append(f"questions({questions}>{max_questions})")
+        sentences = _drop_extra_questions(sentences, max_questions)
+        if not sentences:
+            result.hard_failure = "questions"
+            return result
+        result.fixes.append("questions")
+
+    # ---------- length ----------
+    words = sum(count_words(s) for s in sentences)
+    if words > max_words:
+        result.violations.append(f"words({words}>{max_words})")
+        trimmed = _trim_to_words(sentences, max_words)
+        if trimmed is None:
+            result.hard_failure = "too_long"
+            return result
+        sentences = trimmed
+        result.fixes.append("words")
+
+    if {"questions", "words"} & set(result.fixes):
+        result.text = " ".join(sentences)
+    return result
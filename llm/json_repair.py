@@ -0,0 +1,275 @@
+"""
+JSON Extraction and Repair for LLM Responses.
+Replaces regex extraction, which could not handle more than two levels of
+nesting (Eyes' risk_flags already needs two).
+
+One linear pass over the response:
+    - finds the first balanced {...} object, skipping prose and ``` fences
+    - tracks strings and escapes, so braces inside strings are ignored
+    - drops trailing commas and escapes raw newlines inside strings
+    - closes truncated output (open strings, objects and arrays), cutting back
+      to the last complete member if the tail is unusable
+
+The result can then be coerced to the step's JSON schema (string booleans,
+numeric strings, enum casing, missing nullable fields).
+"""
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+# How many '{' candidates to try before giving up (prose can contain braces)
+MAX_CANDIDATES = 5
+
+# How many cut points to try when closing truncated output
+MAX_CUT_ATTEMPTS = 8
+
+
+class ParseOutcome:
+    CLEAN = "clean"          # Valid JSON as returned
+    EXTRACTED = "extracted"  # Valid JSON object surrounded by other text
+    REPAIRED = "repaired"    # Needed trailing-comma / newline fixes
+    TRUNCATED = "truncated"  # Cut off and closed: the last value may be partial
+    FAILED = "failed"
+
+
+class TruncatedFieldError(ValueError):
+    """A field that must be complete was the one cut off by a truncated response."""
+
+    def __init__(self, field_name: str) -> None:
+        super().__init__(f"Response was truncated inside {field_name!r}")
+        self.field_name = field_name
+
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def _closing(stack: List[str]) -> str:
+    return "".join(_CLOSERS[c] for c in reversed(stack))
+
+
+def _try_load(text: str) -> Optional[Dict[str, Any]]:
+    try:
+        data = json.loads(text)
+    except (json.JSONDecodeError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _scan_object(text: str, start: int) -> Tuple[Optional[Dict[str, Any]], str]:
+    """
+    Scan one object starting at text[start] == "{".
+
+    Returns (parsed_object, outcome). parsed_object is None if the object
+    could not be recovered.
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    # (output length, stack snapshot) just before each structural comma
+    cuts: List[Tuple[int, Tuple[str, ...]]] = []
+    in_string = False
+    escaped = False
+    repaired = False
+
+    for i in range(start, len(text)):
+        ch = text[i]
+
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            elif ch == "\n":
+                out.append("\\n")
+                repaired = True
+                continue
+            out.append(ch)
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append(ch)
+        elif ch in "}]":
+            # Trailing comma: {"a": 1,} / [1, 2,]
+            j = len(out) - 1
+            while j >= 0 and out[j].isspace():
+                j -= 1
+            if j >= 0 and out[j] == ",":
+                del out[j]
+                repaired = True
+            if not stack:
+                break
+            stack.pop()
+            out.append(ch)
+            if not stack:
+                data = _try_load("".join(out))
+                return data, ParseOutcome.REPAIRED if repaired else ParseOutcome.EXTRACTED
+            continue
+        elif ch == ",":
+            cuts.append((len(out), tuple(stack)))
+        out.append(ch)
+
+    # Truncated: close whatever is still open
+    if not stack:
+        return None, ParseOutcome.FAILED
+
+    tail = "".join(out)
+    if in_string:
+        if escaped:
+            tail = tail[:-1]
+        tail += '"'
+    tail = tail.rstrip()
+    if tail.endswith(","):
+        tail = tail[:-1]
+    if tail.endswith(":"):
+        tail += " null"
+
+    data = _try_load(tail + _closing(stack))
+    if data is not None:
+        return data, ParseOutcome.TRUNCATED
+
+    # The last member is unusable (e.g. a dangling key or half a literal):
+    # cut back to the previous complete member
+    for length, snapshot in reversed(cuts[-MAX_CUT_ATTEMPTS:]):
+        data = _try_load("".join(out[:length]) + _closing(list(snapshot)))
+        if data is not None:
+            return data, ParseOutcome.TRUNCATED
+
+    return None, ParseOutcome.FAILED
+
+
+def extract_json(text: Optional[str]) -> Tuple[Optional[Dict[str, Any]], str]:
+    """
+    Extract a JSON object from an LLM response.
+
+    Returns:
+        (data, outcome) where outcome is one of ParseOutcome.*
+    """
+    if not text:
+        return None, ParseOutcome.FAILED
+
+    stripped = text.strip()
+    if stripped.startswith("{"):
+        data = _try_load(stripped)
+        if data is not None:
+            return data, ParseOutcome.CLEAN
+
+    start = text.find("{")
+    for _ in range(MAX_CANDIDATES):
+        if start < 0:
+            break
+        data, outcome = _scan_object(text, start)
+        if data is not None:
+            return data, outcome
+        start = text.find("{", start + 1)
+
+    return None, ParseOutcome.FAILED
+
+
+# ============================================================
+# Schema-guided Coercion
+# ============================================================
+
+_TRUE_STRINGS = {"true", "yes", "1"}
+_FALSE_STRINGS = {"false", "no", "0"}
+
+
+def _types(schema: Dict[str, Any]) -> List[str]:
+    declared = schema.get("type")
+    if declared is None:
+        return []
+    return declared if isinstance(declared, list) else [declared]
+
+
+def _coerce_value(value: Any, schema: Dict[str, Any]) -> Tuple[Any, int]:
+    """Coerce a single value. Returns (value, number_of_changes)."""
+    types = _types(schema)
+
+    if value is None:
+        if "array" in types and "null" not in types:
+            return [], 1
+        return value, 0
+
+    if "object" in types and isinstance(value, dict):
+        return _coerce_object(value, schema)
+
+    if "array" in types:
+        if not isinstance(value, list):
+            value, changes = [value], 1
+        else:
+            changes = 0
+        item_schema = schema.get("items") or {}
+        items = []
+        for item in value:
+            item, item_changes = _coerce_value(item, item_schema)
+            items.append(item)
+            changes += item_changes
+        return items, changes
+
+    if "boolean" in types and not isinstance(value, bool):
+        if isinstance(value, str) and value.strip().lower() in _TRUE_STRINGS:
+            return True, 1
+        if isinstance(value, str) and value.strip().lower() in _FALSE_STRINGS:
+            return False, 1
+        if isinstance(value, (int, float)):
+            return bool(value), 1
+
+    if "integer" in types and not isinstance(value, bool):
+        if isinstance(value, float) and value.is_integer():
+            return int(value), 1
+        if isinstance(value, str):
+            try:
+                return int(float(value.strip())), 1
+            except ValueError:
+                pass
+
+    if "number" in types and isinstance(value, str):
+        try:
+            return float(value.strip()), 1
+        except ValueError:
+            pass
+
+    enum = schema.get("enum")
+    if enum and isinstance(value, str) and value not in enum:
+        normalized = value.strip().lower().replace(" ", "_").replace("-", "_")
+        for option in enum:
+            if isinstance(option, str) and option.lower() == normalized:
+                return option, 1
+
+    return value, 0
+
+
+def _coerce_object(data: Dict[str, Any], schema: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+    properties = schema.get("properties") or {}
+    changes = 0
+    for key, prop_schema in properties.items():
+        if key in data:
+            data[key], prop_changes = _coerce_value(data[key], prop_schema)
+            changes += prop_changes
+        elif key in schema.get("required", ()) and "null" in _types(prop_schema):
+            data[key] = None
+            changes += 1
+    return data, changes
+
+
+def coerce_to_schema(data: Dict[str, Any], schema: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], int]:
+    """
+    Nudge parsed output toward a JSON schema (in place).
+
+    Only unambiguous fixes are applied; anything else is left for the step's
+    own validation and defaults.
+
+    Returns:
+        (data, number_of_changes)
+    """
+    if not schema:
+        return data, 0
+    return _coerce_object(data, schema)
+
+
+def schema_from_response_format(response_format: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """The JSON schema inside an OpenAI-style response_format, if any."""
+    if not response_format:
+        return None
+    return (response_format.get("json_schema") or {}).get("schema")
@@ -0,0 +1,122 @@
+"""
+Hierarchical Conversation Memory.
+Pure helpers for the segment list stored in Conversation.memory_segments.
+
+Each Memory run appends a level-0 segment summarizing only the messages since
+the previous segment. When the total size crosses a threshold, the oldest
+level-0 segments are compacted into one level-1 segment, and level-1 segments
+into a single level-2 segment. Segments are always ordered oldest → newest, so
+higher levels form a prefix. render_memory_view() gives the pipeline a
+bounded-size view regardless of conversation length.
+
+Segment shape:
+    {"level": 0, "summary": "...", "until": "<ISO ts of last message covered>", "messages": 3}
+"""
+from typing import Dict, List, Optional, Tuple
+
+# Compaction kicks in once all segments together exceed this many characters
+COMPACTION_THRESHOLD_CHARS = 2400
+
+# Newest level-0 segments are never compacted (keeps recent detail verbatim)
+KEEP_RECENT_SEGMENTS = 2
+
+MAX_LEVEL = 2
+
+# Upper bound on the memory view handed to the pipeline
+MEMORY_VIEW_MAX_CHARS = 1800
+
+
+def total_chars(segments: List[Dict]) -> int:
+    return sum(len(seg.get("summary") or "") for seg in segments)
+
+
+def summarized_through(segments: List[Dict]) -> Optional[str]:
+    """ISO timestamp of the newest message covered by any segment."""
+    for seg in reversed(segments):
+        if seg.get("until"):
+            return seg["until"]
+    return None
+
+
+def seed_segments(rolling_summary: Optional[str]) -> List[Dict]:
+    """Bootstrap segments for conversations summarized before segments existed."""
+    if not rolling_summary:
+        return []
+    return [{"level": 1, "summary": rolling_summary, "until": None, "messages": 0}]
+
+
+def append_segment(segments: List[Dict], summary: str, until: str, messages: int) -> List[Dict]:
+    return segments + [{"level": 0, "summary": summary, "until": until, "messages": messages}]
+
+
+def plan_compaction(segments: List[Dict], force: bool = False) -> Optional[Tuple[int, int, int]]:
+    """
+    Decide which contiguous range to merge.
+
+    Returns (start, end, new_level) for segments[start:end], or None when the
+    memory is under the size threshold or nothing can be merged.
+    """
+    if not force and total_chars(segments) <= COMPACTION_THRESHOLD_CHARS:
+        return None
+
+    # 1) Oldest level-0 segments (excluding the most recent ones) -> level 1
+    level0 = [i for i, seg in enumerate(segments) if seg.get("level", 0) == 0]
+    mergeable = level0[:-KEEP_RECENT_SEGMENTS] if len(level0) > KEEP_RECENT_SEGMENTS else []
+    if len(mergeable) >= 2:
+        return mergeable[0], mergeable[-1] + 1, 1
+
+    # 2) All higher-level segments (a prefix) -> single top-level segment
+    upper = [i for i, seg in enumerate(segments) if seg.get("level", 0) >= 1]
+    if len(upper) >= 2:
+        return upper[0], upper[-1] + 1, MAX_LEVEL
+
+    return None
+
+
+def apply_compaction(
+    segments: List[Dict],
+    start: int,
+    end: int,
+    level: int,
+    summary: str,
+) -> List[Dict]:
+    """Replace segments[start:end] with one merged segment."""
+    merged = segments[start:end]
+    compacted = {
+        "level": level,
+        "summary": summary,
+        "until": summarized_through(merged),
+        "messages": sum(seg.get("messages", 0) for seg in merged),
+    }
+    return segments[:start] + [compacted] + segments[end:]
+
+
+def render_memory_view(
+    segments: Optional[List[Dict]],
+    fallback_summary: str = "",
+    max_chars: int = MEMORY_VIEW_MAX_CHARS,
+) -> str:
+    """
+    Render segments into a bounded-size summary for the pipeline.
+    Newest segments win; the oldest included segment is truncated from the front.
+    """
+    if not segments:
+        if len(fallback_summary or "") <= max_chars:
+            return fallback_summary or ""
+        return "..." + fallback_summary[-(max_chars - 3):]
+
+    parts: List[str] = []
+    remaining = max_chars
+    for seg in reversed(segments):
+        text = (seg.get("summary") or "").strip()
+        if not text:
+            continue
+        if len(text) + 1 <= remaining:
+            parts.append(text)
+            remaining -= len(text) + 1
+            continue
+        if remaining > 20:
+            parts.append("..." + text[-(remaining - 3):])
+        break
+
+    return "\n".join(reversed(parts))
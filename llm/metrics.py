@@ -0,0 +1,101 @@
+"""
+Lightweight in-process metrics for the HTL pipeline.
+Thread-safe counters and observations, periodically flushed to the logs.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_key(name: str, key: LabelKey) -> str:
+    if not key:
+        return name
+    labels = ",".join(f"{k}={v}" for k, v in key)
+    return f"{name}{{{labels}}}"
+
+
+class MetricsRegistry:
+    """
+    Process-local counters and value observations.
+
+    Usage:
+        metrics.incr("prefilter.decision", decision="no_reply")
+        metrics.observe("llm.queue_wait_ms", 42.0, model="llama")
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, LabelKey], float] = defaultdict(float)
+        # name/labels -> [count, sum, max]
+        self._observations: Dict[Tuple[str, LabelKey], list] = {}
+        self._last_flush = time.monotonic()
+
+    def incr(self, name: str, value: float = 1, **labels) -> None:
+        """Increment a counter."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] += value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Record a single observation (latency, size, wait time...)."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            stats = self._observations.get(key)
+            if stats is None:
+                self._observations[key] = [1, value, value]
+            else:
+                stats[0] += 1
+                stats[1] += value
+                stats[2] = max(stats[2], value)
+
+    def get(self, name: str, **labels) -> float:
+        """Read a single counter value."""
+        with self._lock:
+            return self._counters.get((name, _label_key(labels)), 0)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Return a point-in-time copy of all metrics."""
+        with self._lock:
+            counters = {
+                _format_key(name, key): value
+                for (name, key), value in self._counters.items()
+            }
+            observations = {
+                _format_key(name, key): {
+                    "count": count,
+                    "avg": total / count if count else 0.0,
+                    "max": peak,
+                }
+                for (name, key), (count, total, peak) in self._observations.items()
+            }
+        return {"counters": counters, "observations": observations}
+
+    def reset(self) -> None:
+        """Clear all metrics (used by benchmarks)."""
+        with self._lock:
+            self._counters.clear()
+            self._observations.clear()
+
+    def maybe_log_snapshot(self, interval_seconds: float = 60.0) -> None:
+        """Log a snapshot at most once per interval. Cheap to call in hot loops."""
+        now = time.monotonic()
+        if now - self._last_flush < interval_seconds:
+            return
+        self._last_flush = now
+        snapshot = self.snapshot()
+        if snapshot["counters"] or snapshot["observations"]:
+            logger.info(f"METRICS: {snapshot}")
+
+
+# Module-level singleton
+metrics = MetricsRegistry()
@@ -3,44 +3,111 @@ Eyes → Brain → Mouth → Memory Pipeline.
 Orchestrates the 4-stage LLM pipeline.
 """
 import logging
-from llm.schemas import PipelineInput, PipelineResult, BrainOutput, EyesOutput
+from dataclasses import replace
+from typing import Optional
+from llm.config import llm_config
+from llm.schemas import PipelineInput, PipelineResult, BrainOutput, EyesOutput, MouthOutput
 from llm.steps.eyes import run_eyes
 from llm.steps.brain import run_brain
 from llm.steps.mouth import run_mouth
+from llm.steps.fused import run_fused
+from llm.prefilter import classify_message, FastPathDecision
+from llm.answer_cache import get_cached_answer, maybe_cache_answer
+from llm.tracing import trace_scope
+from llm.deadline import pipeline_deadline
 from server.enums import DecisionAction
 
 logger = logging.getLogger(__name__)
 
 
-def run_pipeline(context: PipelineInput, user_message: str) -> PipelineResult:
+def run_pipeline(
+    context: PipelineInput,
+    user_message: str,
+    allow_fast_path: bool = True,
+    degraded: bool = False,
+) -> PipelineResult:
     """
     Run the Eyes → Brain → Mouth → Memory pipeline.
     
     Steps:
+    0. FAST PATH: Rule-based shortcut for trivial messages (no LLM)
     1. EYES: Observe and analyze
     2. BRAIN: Decide and strategize
     3. MOUTH: Communicate (if Brain says so)
     4. MEMORY: Backgrounded (not in this call)
+
+    degraded: cheaper profile used while the worker sheds load — Eyes and
+    Brain fused into one call, and Mouth on LLM_DEGRADED_MODEL if set.
     """
+    # One sampling decision per turn, so a traced turn is traced end-to-end.
+    # The deadline bounds all LLM steps; steps that run out of time use their fallbacks.
+    with trace_scope(context.conversation_id), pipeline_deadline():
+        return _run_pipeline(context, user_message, allow_fast_path, degraded)
+
+
+def _run_pipeline(
+    context: PipelineInput,
+    user_message: str,
+    allow_fast_path: bool,
+    degraded: bool,
+) -> PipelineResult:
     total_latency_ms = 0
     total_tokens = 0
     
     try:
         # ========================================
-        # Step 1: EYES
+        # Step 0: FAST PATH
         # ========================================
-        logger.info("Running Step 1: Eyes")
-        eyes_output, latency, tokens = run_eyes(context)
-        total_latency_ms += latency
-        total_tokens += tokens
-        
-        # ========================================
-        # Step 2: BRAIN
-        # ========================================
-        logger.info("Running Step 2: Brain")
-        brain_output, latency, tokens = run_brain(context, eyes_output)
-        total_latency_ms += latency
-        total_tokens += tokens
+        if allow_fast_path:
+            decision, canned_reply = classify_message(context, user_message)
+            if decision != FastPathDecision.FULL_PIPELINE:
+                return _get_fast_path_result(context, decision, canned_reply)
+
+            # ========================================
+            # Step 0b: ANSWER CACHE (repeated FAQ questions)
+            # ========================================
+            cached = get_cached_answer(context, user_message)
+            if cached:
+                brain_output, mouth_output = cached
+                return PipelineResult(
+                    brain=brain_output,
+                    mouth=mouth_output,
+                    needs_background_summary=True,
+                    fast_path="answer_cache",
+                )
+
+        step_models = {}
+
+        if degraded:
+            # ========================================
+            # Steps 1+2: EYES + BRAIN (fused, degraded profile)
+            # ========================================
+            logger.info("Running Steps 1+2: Fused Eyes+Brain (degraded profile)")
+            fused_config = llm_config.for_step("fused", context.llm_overrides)
+            step_models["fused"] = fused_config.model
+            eyes_output, brain_output, latency, tokens = run_fused(context, fused_config)
+            total_latency_ms += latency
+            total_tokens += tokens
+        else:
+            # ========================================
+            # Step 1: EYES
+            # ========================================
+            logger.info("Running Step 1: Eyes")
+            eyes_config = llm_config.for_step("eyes", context.llm_overrides)
+            step_models["eyes"] = eyes_config.model
+            eyes_output, latency, tokens = run_eyes(context, eyes_config)
+            total_latency_ms += latency
+            total_tokens += tokens
+
+            # ========================================
+            # Step 2: BRAIN
+            # ========================================
+            logger.info("Running Step 2: Brain")
+            brain_config = llm_config.for_step("brain", context.llm_overrides)
+            step_models["brain"] = brain_config.model
+            brain_output, latency, tokens = run_brain(context, eyes_output, brain_config)
+            total_latency_ms += latency
+            total_tokens += tokens
         
         # ========================================
         # Step 3: MOUTH
@@ -49,12 +116,20 @@ def run_pipeline(context: PipelineInput, user_message: str) -> PipelineResult:
         
         if brain_output.should_respond:
             logger.info(f"Running Step 3: Mouth - Action: {brain_output.action.value}")
-            mouth_output, latency, tokens = run_mouth(context, brain_output)
+            mouth_config = llm_config.for_step("mouth", context.llm_overrides)
+            if degraded and llm_config.degraded_model:
+                mouth_config = replace(mouth_config, model=llm_config.degraded_model)
+            step_models["mouth"] = mouth_config.model
+            mouth_output, latency, tokens = run_mouth(context, brain_output, mouth_config)
             total_latency_ms += latency
             total_tokens += tokens
         else:
             logger.info("Skipping Mouth (Brain decided not to respond)")
 
+        # Degraded answers come from a cheaper model; don't let them outlive the spike
+        if allow_fast_path and not degraded:
+            maybe_cache_answer(context, user_message, eyes_output, brain_output, mouth_output)
+
         # ========================================
         # Build Result
         # ========================================
@@ -66,6 +141,7 @@ def run_pipeline(context: PipelineInput, user_message: str) -> PipelineResult:
             pipeline_latency_ms=total_latency_ms,
             total_tokens_used=total_tokens,
             needs_background_summary=True,  # Signal to worker
+            step_models=step_models,
         )
         
         logger.info(f"Pipeline Complete: {total_latency_ms}ms. Response: {bool(mouth_output)}")
@@ -76,6 +152,37 @@ def run_pipeline(context: PipelineInput, user_message: str) -> PipelineResult:
         return _get_emergency_result(context)
 
 
+def _get_fast_path_result(
+    context: PipelineInput,
+    decision: FastPathDecision,
+    canned_reply: Optional[str],
+) -> PipelineResult:
+    """Build a result for a message handled by the rule-based fast path."""
+    should_respond = decision == FastPathDecision.CANNED_REPLY and bool(canned_reply)
+    
+    brain_output = BrainOutput(
+        implementation_plan=f"Fast path: {decision.value}",
+        action=DecisionAction.SEND_NOW if should_respond else DecisionAction.WAIT_SCHEDULE,
+        new_stage=context.conversation_stage,
+        should_respond=should_respond,
+        confidence=1.0,
+    )
+    
+    mouth_output = None
+    if should_respond:
+        mouth_output = MouthOutput(
+            message_text=canned_reply,
+            message_language=context.language_pref,
+        )
+    
+    return PipelineResult(
+        brain=brain_output,
+        mouth=mouth_output,
+        needs_background_summary=False,  # Trivial turn, nothing worth summarizing
+        fast_path=decision.value,
+    )
+
+
 def _get_emergency_result(context: PipelineInput) -> PipelineResult:
     """Catastrophic failure fallback."""
     from llm.schemas import RiskFlags
@@ -113,4 +220,4 @@ def run_followup_pipeline(context: PipelineInput) -> PipelineResult:
     Run pipeline for scheduled follow-ups.
     """
     synthetic_message = "[System: Scheduled follow-up triggered]"
-    return run_pipeline(context, synthetic_message)
+    return run_pipeline(context, synthetic_message, allow_fast_path=False)
@@ -0,0 +1,195 @@
+"""
+Rule-based Fast Path (Pre-classifier).
+Decides, without any LLM call, whether a trivial inbound message needs
+no reply, a canned reply, or the full Eyes → Brain → Mouth pipeline.
+"""
+import logging
+import re
+import unicodedata
+from enum import Enum
+from typing import Optional, Tuple
+from rapidfuzz import process, fuzz
+
+from llm.metrics import metrics
+from llm.schemas import PipelineInput
+from server.enums import ConversationStage
+
+logger = logging.getLogger(__name__)
+
+
+class FastPathDecision(str, Enum):
+    NO_REPLY = "no_reply"
+    CANNED_REPLY = "canned_reply"
+    FULL_PIPELINE = "full_pipeline"
+
+
+# Messages longer than this always go through the full pipeline
+MAX_FAST_PATH_CHARS = 40
+
+# Minimum rapidfuzz score for a phrase-table hit (handles "thnks", "okk", "helo")
+FUZZY_SCORE_CUTOFF = 88
+
+
+# ============================================================
+# Phrase Tables
+# ============================================================
+
+ACK_PHRASES = [
+    "ok", "okay", "okk", "k", "kk", "ok ok", "okie", "oki", "cool", "fine", "sure",
+    "alright", "noted", "got it", "understood", "done", "great", "nice", "hmm",
+    "theek hai", "thik hai", "acha", "achha", "accha", "haan", "ha", "hmm ok",
+]
+
+THANKS_PHRASES = [
+    "thanks", "thank you", "thank u", "thanku", "thankyou", "thx", "ty", "tq",
+    "thanks a lot", "thank you so much", "ok thanks", "ok thank you",
+    "dhanyavad", "dhanyawad", "shukriya",
+]
+
+GREETING_PHRASES = [
+    "hi", "hii", "hello", "helo", "hey", "hey there", "hi there", "hello there",
+    "namaste", "namaskar", "good morning", "good afternoon", "good evening",
+]
+
+GOODBYE_PHRASES = [
+    "bye", "bye bye", "good night", "gn", "see you", "talk later", "ttyl",
+]
+
+_PHRASE_TABLE = {
+    **{p: "ack" for p in ACK_PHRASES},
+    **{p: "thanks" for p in THANKS_PHRASES},
+    **{p: "greeting" for p in GREETING_PHRASES},
+    **{p: "goodbye" for p in GOODBYE_PHRASES},
+}
+_PHRASE_KEYS = list(_PHRASE_TABLE.keys())
+
+CANNED_REPLIES = {
+    "thanks": "You're welcome! Let me know if there's anything else I can help you with.",
+    "greeting": "Hi! Thanks for reaching out to {business_name}. How can I help you today?",
+}
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]", re.UNICODE)
+_REPEATED_CHAR_RE = re.compile(r"(\w)\1{2,}")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+# ============================================================
+# Helpers
+# ============================================================
+
+def _is_emoji_only(text: str) -> bool:
+    """True if the message only contains emoji / symbols / joiners."""
+    stripped = "".join(ch for ch in text if not ch.isspace())
+    if not stripped:
+        return False
+    # So: emoji/symbols, Sk: skin-tone modifiers, Mn/Cf: variation selectors and ZWJ
+    return all(unicodedata.category(ch) in ("So", "Sk", "Mn", "Cf") for ch in stripped)
+
+
+def _normalize(text: str) -> str:
+    text = text.strip().lower()
+    text = _PUNCTUATION_RE.sub(" ", text)
+    text = _REPEATED_CHAR_RE.sub(r"\1\1", text)  # "hiiiii" -> "hii"
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def _classify_phrase(normalized: str) -> Optional[str]:
+    """Map a normalized message to a phrase category via exact or fuzzy lookup."""
+    if not normalized:
+        return None
+    if normalized in _PHRASE_TABLE:
+        return _PHRASE_TABLE[normalized]
+
+    # Very short strings fuzz-match too eagerly ("no" ~ "ok")
+    if len(normalized) < 4:
+        return None
+
+    match = process.extractOne(
+        normalized,
+        _PHRASE_KEYS,
+        scorer=fuzz.ratio,
+        score_cutoff=FUZZY_SCORE_CUTOFF,
+    )
+    if match:
+        return _PHRASE_TABLE[match[0]]
+    return None
+
+
+def _bot_awaiting_answer(context: PipelineInput) -> bool:
+    """
+    True if the last bot/human message asked the lead a question.
+    An "ok" or a thumbs-up in that case is an answer, not an acknowledgement.
+    """
+    for msg in reversed(context.last_messages):
+        if msg.sender in ("bot", "human"):
+            return "?" in msg.text
+    return False
+
+
+def _has_bot_spoken(context: PipelineInput) -> bool:
+    return any(msg.sender in ("bot", "human") for msg in context.last_messages)
+
+
+# ============================================================
+# Public API
+# ============================================================
+
+def classify_message(
+    context: PipelineInput,
+    user_message: str,
+) -> Tuple[FastPathDecision, Optional[str]]:
+    """
+    Decide how to handle an inbound message.
+
+    Returns:
+        (decision, canned_reply_text). canned_reply_text is only set for CANNED_REPLY.
+    """
+    decision, reply, category = _classify(context, user_message)
+    metrics.incr("prefilter.decision", decision=decision.value, category=category or "none")
+    if decision != FastPathDecision.FULL_PIPELINE:
+        logger.info(f"Fast path: {decision.value} ({category}) for message {user_message[:40]!r}")
+    return decision, reply
+
+
+def _classify(
+    context: PipelineInput,
+    user_message: str,
+) -> Tuple[FastPathDecision, Optional[str], Optional[str]]:
+    text = (user_message or "").strip()
+    if not text or len(text) > MAX_FAST_PATH_CHARS:
+        return FastPathDecision.FULL_PIPELINE, None, None
+
+    # Closed/lost/ghosted conversations are re-engaging: always let Brain decide
+    if context.conversation_stage in (
+        ConversationStage.CLOSED, ConversationStage.LOST, ConversationStage.GHOSTED
+    ):
+        return FastPathDecision.FULL_PIPELINE, None, None
+
+    awaiting_answer = _bot_awaiting_answer(context)
+
+    if _is_emoji_only(text):
+        if awaiting_answer:
+            return FastPathDecision.FULL_PIPELINE, None, "emoji"
+        return FastPathDecision.NO_REPLY, None, "emoji"
+
+    category = _classify_phrase(_normalize(text))
+    if category is None:
+        return FastPathDecision.FULL_PIPELINE, None, None
+
+    if category in ("ack", "goodbye"):
+        if awaiting_answer:
+            return FastPathDecision.FULL_PIPELINE, None, category
+        return FastPathDecision.NO_REPLY, None, category
+
+    if category == "thanks":
+        return FastPathDecision.CANNED_REPLY, CANNED_REPLIES["thanks"], category
+
+    if category == "greeting":
+        # Only a fresh conversation gets the canned intro; a "hi" after silence
+        # is a re-engagement that Brain should handle with full context.
+        if context.conversation_stage == ConversationStage.GREETING and not _has_bot_spoken(context):
+            reply = CANNED_REPLIES["greeting"].format(business_name=context.business_name)
+            return FastPathDecision.CANNED_REPLY, reply, category
+        return FastPathDecision.FULL_PIPELINE, None, category
+
+    return FastPathDecision.FULL_PIPELINE, None, category
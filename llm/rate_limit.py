@@ -0,0 +1,351 @@
+"""
+Client-side LLM Rate Limiter.
+Keeps concurrent workers under provider limits instead of failing together
+with 429s.
+
+Per model and endpoint (LLM_RATE_LIMITS, keyed by model; every endpoint of
+a client pool has its own quota and so its own buckets):
+    rpm          requests per minute  (token bucket)
+    tpm          tokens per minute    (token bucket, estimated up front and
+                                       reconciled with reported usage)
+    concurrency  max in-flight requests in this process
+
+Requests wait in line for capacity rather than failing; the wait is bounded
+by the caller's timeout (the step budget inside the pipeline). A 429 blocks
+only the endpoint that returned it, for the provider's retry-after; with a
+client pool the retry goes to another endpoint straight away. No backoff or
+retry outlives the caller's timeout.
+
+With LLM_RATE_LIMIT_REDIS_URL the buckets and retry-after blocks are shared
+by every worker process; otherwise they are process-local.
+"""
+import logging
+import re
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from llm.config import llm_config
+from llm.metrics import metrics
+
+if TYPE_CHECKING:
+    from llm.transport import LLMResponse, LLMTransport
+
+logger = logging.getLogger(__name__)
+
+# Completion tokens assumed when a request sets no max_tokens
+DEFAULT_COMPLETION_TOKENS = 500
+
+# Backoff for transient (connection / 5xx) errors
+TRANSIENT_BACKOFF_SECONDS = 0.5
+
+
+class RateLimitWaitExceeded(TimeoutError):
+    """Capacity would not be available within the caller's time limit."""
+
+
+# ============================================================
+# Token Buckets
+# ============================================================
+
+class TokenBucket:
+    """
+    Reservation-based token bucket. reserve() always succeeds and returns how
+    long the caller must wait; the balance may go negative, which queues
+    callers in arrival order without a background scheduler.
+    """
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self, amount: float) -> None:
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+# Same algorithm as TokenBucket, atomically in Redis. Returns the wait in seconds.
+_REDIS_RESERVE = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local amount = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate) - amount
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], 300)
+if tokens >= 0 then return '0' end
+return tostring(-tokens / rate)
+"""
+
+
+class RedisTokenBucket:
+    """TokenBucket shared across processes. Falls back to a local bucket on Redis errors."""
+
+    def __init__(self, redis_client, key: str, per_minute: float) -> None:
+        self.redis = redis_client
+        self.key = key
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._script = redis_client.register_script(_REDIS_RESERVE)
+        self._local = TokenBucket(per_minute)
+
+    def reserve(self, amount: float) -> float:
+        try:
+            return float(self._script(keys=[self.key], args=[self.capacity, self.rate, time.time(), amount]))
+        except Exception as e:
+            logger.warning(f"Redis rate limiter unavailable, using local bucket: {e}")
+            return self._local.reserve(amount)
+
+    def refund(self, amount: float) -> None:
+        try:
+            self._script(keys=[self.key], args=[self.capacity, self.rate, time.time(), -amount])
+        except Exception:
+            self._local.refund(amount)
+
+
+# ============================================================
+# Per-model (and endpoint) Limiter
+# ============================================================
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Provider's retry hint from a 429 (retry-after, retry-after-ms, Groq reset headers)."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    if headers.get("retry-after"):
+        try:
+            return float(headers["retry-after"])
+        except ValueError:
+            pass
+    # Groq: x-ratelimit-reset-requests / -tokens, e.g. "2m59.56s" or "7.66s"
+    for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+        value = headers.get(name)
+        if value:
+            match = re.fullmatch(r"(?:(\d+)m)?([\d.]+)s", value)
+            if match:
+                return int(match.group(1) or 0) * 60 + float(match.group(2))
+    return None
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    return getattr(error, "status_code", None)
+
+
+def _is_transient(error: Exception) -> bool:
+    status = _status_code(error)
+    if status is not None:
+        return status >= 500
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+class ModelLimiter:
+    """RPM/TPM buckets, concurrency cap and retry-after block for one model on one endpoint."""
+
+    def __init__(self, model: str, limits: Dict[str, Any], redis_client=None, endpoint: Optional[str] = None) -> None:
+        self.model = model
+        self.endpoint = endpoint
+        # Redis key scope; the single-endpoint form keeps the original keys
+        self.scope = model if endpoint is None else f"{endpoint}:{model}"
+        self.redis = redis_client
+        self.rpm = self._bucket("rpm", limits.get("rpm"))
+        self.tpm = self._bucket("tpm", limits.get("tpm"))
+        concurrency = limits.get("concurrency")
+        self.slots = threading.BoundedSemaphore(int(concurrency)) if concurrency else None
+        self._blocked_until = 0.0  # time.time(); mirrored in Redis when shared
+
+    def _bucket(self, kind: str, per_minute: Optional[float]):
+        if not per_minute:
+            return None
+        if self.redis is not None:
+            return RedisTokenBucket(self.redis, f"llm:ratelimit:{self.scope}:{kind}", float(per_minute))
+        return TokenBucket(float(per_minute))
+
+    # ---------- retry-after block ----------
+
+    def block_for(self, seconds: float) -> None:
+        until = time.time() + seconds
+        self._blocked_until = max(self._blocked_until, until)
+        if self.redis is not None:
+            try:
+                self.redis.set(f"llm:ratelimit:{self.scope}:blocked", until, px=max(int(seconds * 1000), 1))
+            except Exception:
+                pass
+
+    def blocked_for(self) -> float:
+        until = self._blocked_until
+        if self.redis is not None:
+            try:
+                until = max(until, float(self.redis.get(f"llm:ratelimit:{self.scope}:blocked") or 0))
+            except Exception:
+                pass
+        return max(0.0, until - time.time())
+
+    # ---------- capacity ----------
+
+    def acquire(self, tokens: int, max_wait: Optional[float]) -> float:
+        """Reserve capacity, sleeping until it is available. Returns seconds waited."""
+        start = time.monotonic()
+        wait = self.blocked_for()
+        rpm_wait = self.rpm.reserve(1) if self.rpm else 0.0
+        tpm_wait = self.tpm.reserve(tokens) if self.tpm else 0.0
+        wait = max(wait, rpm_wait, tpm_wait)
+
+        if max_wait is not None and wait > max_wait:
+            self._refund(tokens)
+            raise RateLimitWaitExceeded(f"{self.scope}: capacity in {wait:.2f}s exceeds {max_wait:.2f}s limit")
+        if wait > 0:
+            time.sleep(wait)
+
+        if self.slots is not None:
+            slot_wait = None if max_wait is None else max(max_wait - (time.monotonic() - start), 0)
+            if not self.slots.acquire(timeout=slot_wait):
+                self._refund(tokens)
+                raise RateLimitWaitExceeded(f"{self.scope}: no free concurrency slot")
+        return time.monotonic() - start
+
+    def release(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        if self.slots is not None:
+            self.slots.release()
+        # Reconcile the token estimate with what the provider reported
+        if self.tpm and actual_tokens:
+            difference = actual_tokens - estimated_tokens
+            if difference > 0:
+                self.tpm.reserve(difference)
+            elif difference < 0:
+                self.tpm.refund(-difference)
+
+    def _refund(self, tokens: int) -> None:
+        if self.rpm:
+            self.rpm.refund(1)
+        if self.tpm:
+            self.tpm.refund(tokens)
+
+
+# ============================================================
+# Governor
+# ============================================================
+
+class RateLimitGovernor:
+    """Shared entry point: one ModelLimiter per model + endpoint, created on first use."""
+
+    def __init__(self, limits: Dict[str, Dict[str, Any]], redis_url: Optional[str], max_retries: int) -> None:
+        self.limits = limits
+        self.max_retries = max_retries
+        self._redis_url = redis_url
+        self._redis = None
+        self._limiters: Dict[Tuple[str, Optional[str]], ModelLimiter] = {}
+        self._lock = threading.Lock()
+
+    def _redis_client(self):
+        if not self._redis_url:
+            return None
+        if self._redis is None:
+            import redis
+            self._redis = redis.Redis.from_url(self._redis_url, socket_timeout=2)
+        return self._redis
+
+    def limiter(self, model: str, endpoint: Optional[str] = None) -> ModelLimiter:
+        key = (model, endpoint)
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            with self._lock:
+                limiter = self._limiters.get(key)
+                if limiter is None:
+                    limits = self.limits.get(model) or self.limits.get("default") or {}
+                    limiter = self._limiters[key] = ModelLimiter(model, limits, self._redis_client(), endpoint)
+        return limiter
+
+    def execute(
+        self,
+        model: str,
+        request: Dict[str, Any],
+        transport: "LLMTransport",
+        max_wait: Optional[float] = None,
+    ) -> "LLMResponse":
+        """
+        Send a request once capacity is available, retrying 429s (after the
+        provider's retry-after) and transient errors within max_wait.
+        A backoff that would end past max_wait raises the error instead.
+        Every attempt is routed first (transport.route) and queues on that
+        endpoint's limiter.
+        """
+        estimated = _estimate_tokens(request)
+        deadline = None if max_wait is None else time.monotonic() + max_wait
+        attempt = 0
+
+        while True:
+            endpoint, send = transport.route(request)
+            limiter = self.limiter(model, endpoint)
+            left = None if deadline is None else deadline - time.monotonic()
+            try:
+                waited = limiter.acquire(estimated, left)
+            except RateLimitWaitExceeded:
+                metrics.incr("llm.rate_limit.wait_exceeded", model=model)
+                raise
+            metrics.observe("llm.rate_limit.queue_wait_ms", waited * 1000, model=model)
+
+            if deadline is not None:
+                # Waiting in line used part of this request's timeout
+                request = dict(request, timeout=max(deadline - time.monotonic(), 0.1))
+
+            actual_tokens = None
+            try:
+                response = send(request)
+                actual_tokens = (getattr(response, "usage", None) or {}).get("total_tokens")
+                return response
+            except Exception as e:
+                attempt += 1
+                if _status_code(e) == 429:
+                    # The endpoint waits out the retry-after in acquire(); other endpoints don't
+                    retry_after = retry_after_seconds(e) or 1.0
+                    limiter.block_for(retry_after)
+                    backoff = 0.0
+                    metrics.incr("llm.rate_limit.throttled", model=model)
+                    logger.warning(f"{limiter.scope}: rate limited by provider for {retry_after:.2f}s, retrying")
+                elif _is_transient(e):
+                    backoff = TRANSIENT_BACKOFF_SECONDS * attempt
+                else:
+                    raise
+                if attempt > self.max_retries:
+                    raise
+                if deadline is not None and time.monotonic() + backoff >= deadline:
+                    metrics.incr("llm.rate_limit.wait_exceeded", model=model)
+                    raise
+            finally:
+                limiter.release(estimated, actual_tokens)
+            # Outside the try: the concurrency slot is not held while backing off
+            if backoff:
+                logger.warning(f"{limiter.scope}: transient error, retrying in {backoff:.2f}s")
+                time.sleep(backoff)
+
+
+def _estimate_tokens(request: Dict[str, Any]) -> int:
+    """Rough prompt + completion tokens (~4 chars per token)."""
+    prompt_chars = sum(len(m.get("content") or "") for m in request.get("messages", ()))
+    return prompt_chars // 4 + (request.get("max_tokens") or DEFAULT_COMPLETION_TOKENS)
+
+
+# Module-level singleton
+governor = RateLimitGovernor(
+    limits=llm_config.rate_limits,
+    redis_url=llm_config.rate_limit_redis_url,
+    max_retries=llm_config.max_retries,
+)
@@ -2,7 +2,7 @@
 Pydantic schemas for Eyes → Brain → Mouth → Memory Pipeline.
 Strict JSON schemas ensure LLM outputs are validated and typed.
 """
-from typing import Optional, List, Literal, Dict
+from typing import Any, Optional, List, Literal, Dict
 from uuid import UUID
 from pydantic import BaseModel, Field
 from server.enums import (
@@ -45,10 +45,16 @@ class PipelineInput(BaseModel):
     Kept minimal for token efficiency.
     """
     # Business context
+    organization_id: Optional[str] = None
+    conversation_id: Optional[str] = None
     business_name: str
     business_description: str = ""
     flow_prompt: str = ""  # Conversation flow/sales script instructions
     
+    # Lead
+    lead_name: str = ""
+    lead_phone: str = ""
+    
     # CTAs
     available_ctas: List[Dict[str, str]] = []  # [{id: UUID, name: str}]
     
@@ -71,6 +77,9 @@ class PipelineInput(BaseModel):
     max_words: int = 80
     questions_per_message: int = 1
     language_pref: str = "en"
+    
+    # Per-org LLM routing overrides (Organization.llm_settings)
+    llm_overrides: Dict[str, Dict[str, Any]] = {}
 
 
 # ============================================================
@@ -205,10 +214,15 @@ class PipelineResult(BaseModel):
     # Metadata
     pipeline_latency_ms: int = 0
     total_tokens_used: int = 0
+    step_models: Dict[str, str] = Field(default_factory=dict)  # step -> model that served it
     
     # Async Flags
     needs_background_summary: bool = True
     
+    # Set when the result was produced without the LLM
+    # ("no_reply"/"canned_reply" from the fast path, "answer_cache" on a cache hit)
+    fast_path: Optional[str] = None
+    
     # Computed action helpers
     @property
     def should_send_message(self) -> bool:
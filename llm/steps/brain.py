@@ -4,8 +4,9 @@ Makes decisions based on Eyes observation.
 """
 import logging
 import time
-from typing import Tuple
+from typing import Tuple, Optional
 from llm.api_helpers import make_api_call
+from llm.config import llm_config, StepConfig
 from llm.schemas import PipelineInput, EyesOutput, BrainOutput
 from llm.prompts import BRAIN_SYSTEM_PROMPT, BRAIN_USER_TEMPLATE
 from llm.utils import normalize_enum, format_ctas
@@ -106,11 +107,16 @@ def _validate_and_build_output(data: dict, context: PipelineInput) -> BrainOutpu
     )
 
 
-def run_brain(context: PipelineInput, eyes_output: EyesOutput) -> Tuple[BrainOutput, int, int]:
+def run_brain(
+    context: PipelineInput,
+    eyes_output: EyesOutput,
+    step_config: Optional[StepConfig] = None,
+) -> Tuple[BrainOutput, int, int]:
     """
     Run the Brain step.
     Makes strategic decisions based on Eyes observation.
     """
+    step_config = step_config or llm_config.for_step("brain", context.llm_overrides)
     user_prompt = _build_user_prompt(context, eyes_output)
     
     start_time = time.time()
@@ -122,9 +128,13 @@ def run_brain(context: PipelineInput, eyes_output: EyesOutput) -> Tuple[BrainOut
                 {"role": "user", "content": user_prompt},
             ],
             response_format={"type": "json_schema", "json_schema": BRAIN_SCHEMA},
-            temperature=0.3,
+            temperature=step_config.temperature,
+            max_tokens=step_config.max_tokens,
             step_name="Brain",
-            strict=False
+            strict=False,
+            model=step_config.model,
+            timeout=step_config.timeout,
+            hedge_model=step_config.hedge_model,
         )
         
         latency_ms = int((time.time() - start_time) * 1000)
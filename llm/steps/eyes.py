@@ -4,8 +4,9 @@ Analyzes conversation state and produces observation for Brain.
 """
 import logging
 import time
-from typing import Tuple
+from typing import Tuple, Optional
 from llm.api_helpers import make_api_call
+from llm.config import llm_config, StepConfig
 from llm.schemas import PipelineInput, EyesOutput, RiskFlags
 from llm.prompts import EYES_SYSTEM_PROMPT, EYES_USER_TEMPLATE
 from server.enums import IntentLevel, UserSentiment, RiskLevel
@@ -110,11 +111,15 @@ def _validate_and_build_output(data: dict) -> EyesOutput:
     )
 
 
-def run_eyes(context: PipelineInput) -> Tuple[EyesOutput, int, int]:
+def run_eyes(
+    context: PipelineInput,
+    step_config: Optional[StepConfig] = None,
+) -> Tuple[EyesOutput, int, int]:
     """
     Run the Eyes step.
     Observes and analyzes conversation state.
     """
+    step_config = step_config or llm_config.for_step("eyes", context.llm_overrides)
     user_prompt = _build_user_prompt(context)
     
     start_time = time.time()
@@ -126,9 +131,13 @@ def run_eyes(context: PipelineInput) -> Tuple[EyesOutput, int, int]:
                 {"role": "user", "content": user_prompt},
             ],
             response_format={"type": "json_schema", "json_schema": EYES_SCHEMA},
-            temperature=0.3,
+            temperature=step_config.temperature,
+            max_tokens=step_config.max_tokens,
             step_name="Eyes",
-            strict=False
+            strict=False,
+            model=step_config.model,
+            timeout=step_config.timeout,
+            hedge_model=step_config.hedge_model,
         )
         
         latency_ms = int((time.time() - start_time) * 1000)
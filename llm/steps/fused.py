@@ -0,0 +1,112 @@
+"""
+Steps 1+2 fused: EYES + BRAIN in a single call.
+Used by the degraded pipeline profile when the worker is shedding load:
+one round-trip instead of two, on a smaller model.
+"""
+import logging
+import time
+from typing import Tuple, Optional
+from llm.api_helpers import make_api_call
+from llm.config import llm_config, StepConfig
+from llm.schemas import PipelineInput, EyesOutput, BrainOutput, RiskFlags
+from llm.prompts import FUSED_SYSTEM_PROMPT, FUSED_USER_TEMPLATE
+from llm.steps.eyes import EYES_SCHEMA, _format_messages, _validate_and_build_output as _build_eyes_output
+from llm.steps.brain import BRAIN_SCHEMA, _validate_and_build_output as _build_brain_output
+from llm.utils import format_ctas
+from server.enums import DecisionAction
+
+logger = logging.getLogger(__name__)
+
+
+# JSON Schema for fused output: the Eyes and Brain objects side by side
+FUSED_SCHEMA = {
+    "name": "fused_output",
+    "strict": False,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "eyes": EYES_SCHEMA["schema"],
+            "brain": BRAIN_SCHEMA["schema"],
+        },
+        "required": ["eyes", "brain"],
+        "additionalProperties": False
+    }
+}
+
+
+def _build_user_prompt(context: PipelineInput) -> str:
+    """Build the user prompt: Eyes context plus the Brain's decision inputs."""
+    return FUSED_USER_TEMPLATE.format(
+        rolling_summary=context.rolling_summary or "No summary yet",
+        conversation_stage=context.conversation_stage.value,
+        intent_level=context.intent_level.value,
+        user_sentiment=context.user_sentiment.value,
+        business_description=context.business_description,
+        flow_prompt=context.flow_prompt,
+        available_ctas=format_ctas(context.available_ctas),
+        followup_count_24h=context.nudges.followup_count_24h,
+        total_nudges=context.nudges.total_nudges,
+        now_local=context.timing.now_local,
+        whatsapp_window_open=context.timing.whatsapp_window_open,
+        last_messages=_format_messages(context.last_messages),
+    )
+
+
+def run_fused(
+    context: PipelineInput,
+    step_config: Optional[StepConfig] = None,
+) -> Tuple[EyesOutput, BrainOutput, int, int]:
+    """
+    Run Eyes and Brain as one LLM call.
+    Falls back to the same safe outputs the individual steps use.
+    """
+    step_config = step_config or llm_config.for_step("fused", context.llm_overrides)
+    user_prompt = _build_user_prompt(context)
+
+    start_time = time.time()
+
+    try:
+        data = make_api_call(
+            messages=[
+                {"role": "system", "content": FUSED_SYSTEM_PROMPT},
+                {"role": "user", "content": user_prompt},
+            ],
+            response_format={"type": "json_schema", "json_schema": FUSED_SCHEMA},
+            temperature=step_config.temperature,
+            max_tokens=step_config.max_tokens,
+            step_name="Fused",
+            strict=False,
+            model=step_config.model,
+            timeout=step_config.timeout,
+            hedge_model=step_config.hedge_model,
+        )
+
+        latency_ms = int((time.time() - start_time) * 1000)
+        eyes_output = _build_eyes_output(data.get("eyes") or {})
+        brain_output = _build_brain_output(data.get("brain") or {}, context)
+
+        logger.info(
+            f"Fused: intent={eyes_output.intent_level.value}, "
+            f"{brain_output.action.value} -> {brain_output.new_stage.value} (Conf: {brain_output.confidence})"
+        )
+        return eyes_output, brain_output, latency_ms, 0
+
+    except Exception as e:
+        logger.error(f"Fused Eyes+Brain failed: {e}")
+        eyes_fallback = EyesOutput(
+            observation="System error during observation. Falling back to safe state.",
+            thought_process="Error fallback",
+            situation_summary="Error",
+            intent_level=context.intent_level,
+            user_sentiment=context.user_sentiment,
+            risk_flags=RiskFlags(),
+            confidence=0.0,
+        )
+        brain_fallback = BrainOutput(
+            implementation_plan="System error. Send a polite acknowledgment.",
+            action=DecisionAction.WAIT_SCHEDULE,
+            new_stage=context.conversation_stage,
+            should_respond=False,
+            confidence=0.0,
+        )
+        return eyes_fallback, brain_fallback, int((time.time() - start_time) * 1000), 0
@@ -1,94 +1,146 @@
 """
 Step 4: MEMORY - Archivist.
-Updates the rolling summary after Mouth responds.
+LLM calls of the deferred summarization tasks (whatsapp_worker/tasks.py):
+summarize the messages since the last memory segment, and compact several
+segments into one.
 """
 import logging
-import time
-from typing import Tuple, Optional
+from typing import Any, Dict, List, Tuple, Optional
 from llm.api_helpers import make_api_call
-from llm.schemas import PipelineInput, BrainOutput, MouthOutput, MemoryOutput
-from llm.prompts import MEMORY_SYSTEM_PROMPT, MEMORY_USER_TEMPLATE
+from llm.config import llm_config
+from llm.schemas import MessageContext
+from llm.prompts import (
+    MEMORY_SYSTEM_PROMPT,
+    MEMORY_SEGMENT_USER_TEMPLATE,
+    MEMORY_COMPACTION_SYSTEM_PROMPT,
+    MEMORY_COMPACTION_USER_TEMPLATE,
+)
 
 logger = logging.getLogger(__name__)
 
 
-# JSON Schema for Memory output (inline)
-MEMORY_SCHEMA = {
-    "name": "memory_output",
+# JSON Schema for a single memory segment (hierarchical memory)
+MEMORY_SEGMENT_SCHEMA = {
+    "name": "memory_segment_output",
     "strict": False,
     "schema": {
         "type": "object",
         "properties": {
-            "updated_rolling_summary": {
+            "segment_summary": {
                 "type": "string",
-                "description": "Updated summary (80-200 words)"
+                "description": "Summary of the new messages only (30-80 words)"
             },
             "needs_recursive_summary": {
                 "type": "boolean"
             }
         },
-        "required": ["updated_rolling_summary", "needs_recursive_summary"],
+        "required": ["segment_summary", "needs_recursive_summary"],
         "additionalProperties": False
     }
 }
 
 
-def run_memory(
-    context: PipelineInput,
-    user_message: str,
-    mouth_output: Optional[MouthOutput],
-    brain_output: BrainOutput
-) -> Optional[str]:
+# JSON Schema for compacting several segments into one
+MEMORY_COMPACTION_SCHEMA = {
+    "name": "memory_compaction_output",
+    "strict": False,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "compacted_summary": {
+                "type": "string",
+                "description": "Merged summary (80-200 words)"
+            }
+        },
+        "required": ["compacted_summary"],
+        "additionalProperties": False
+    }
+}
+
+
+def run_memory_segment(
+    memory_view: str,
+    new_messages: List[MessageContext],
+    conversation_stage: str,
+    llm_overrides: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Optional[Tuple[str, bool]]:
     """
-    Run the Memory step.
-    Returns the new summary string so the worker can save it.
-    Runs AFTER Mouth output is available.
+    Summarize only the messages since the last segment.
+    Used by the deferred summarization task, which coalesces several turns
+    into one LLM call.
+
+    Returns:
+        (segment_summary, needs_recursive_summary), or None on failure.
     """
+    if not new_messages:
+        return None
+
+    step_config = llm_config.for_step("memory", llm_overrides)
+    user_prompt = MEMORY_SEGMENT_USER_TEMPLATE.format(
+        memory_view=memory_view or "No prior summary",
+        new_messages="\n".join(f"[{msg.sender}] {msg.text}" for msg in new_messages),
+        action_taken=f"Stage: {conversation_stage}",
+    )
+
     try:
-        output, latency, tokens = _run_memory_llm(
-            context, user_message, mouth_output, brain_output
+        data = make_api_call(
+            messages=[
+                {"role": "system", "content": MEMORY_SYSTEM_PROMPT},
+                {"role": "user", "content": user_prompt},
+            ],
+            response_format={"type": "json_schema", "json_schema": MEMORY_SEGMENT_SCHEMA},
+            temperature=step_config.temperature,
+            max_tokens=step_config.max_tokens,
+            step_name="Memory",
+            strict=False,
+            model=step_config.model,
+            timeout=step_config.timeout,
         )
-        return output.updated_rolling_summary
-        
     except Exception as e:
-        logger.error(f"Memory failed: {e}")
-        return context.rolling_summary or "No summary available"
-
-
-def _run_memory_llm(
-    context: PipelineInput,
-    user_message: str,
-    mouth_output: Optional[MouthOutput],
-    brain_output: BrainOutput
-) -> Tuple[MemoryOutput, int, int]:
-    """Core LLM Logic."""
-    bot_message = mouth_output.message_text if mouth_output else "(No response sent)"
-    action_taken = f"Action: {brain_output.action.value}, Stage: {brain_output.new_stage.value}"
-    
-    user_prompt = MEMORY_USER_TEMPLATE.format(
-        rolling_summary=context.rolling_summary or "No prior summary",
-        user_message=user_message,
-        bot_message=bot_message,
-        action_taken=action_taken,
-    )
-    
-    start_time = time.time()
-
-    data = make_api_call(
-        messages=[
-            {"role": "system", "content": MEMORY_SYSTEM_PROMPT},
-            {"role": "user", "content": user_prompt},
-        ],
-        response_format={"type": "json_schema", "json_schema": MEMORY_SCHEMA},
-        max_tokens=2000,
-        step_name="Memory",
-        strict=False
-    )
-    
-    output = MemoryOutput(
-        updated_rolling_summary=data.get("updated_rolling_summary", ""),
-        needs_recursive_summary=data.get("needs_recursive_summary", False),
+        logger.error(f"Memory segment failed: {e}")
+        return None
+
+    summary = (data.get("segment_summary") or "").strip()
+    if not summary:
+        return None
+
+    logger.info(f"Memory segment ({step_config.model}): {len(new_messages)} messages -> {len(summary)} chars")
+    return summary, bool(data.get("needs_recursive_summary", False))
+
+
+def run_memory_compaction(
+    segments: List[Dict[str, Any]],
+    llm_overrides: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Optional[str]:
+    """Merge several memory segments into one compacted summary."""
+    if not segments:
+        return None
+
+    step_config = llm_config.for_step("memory", llm_overrides)
+    user_prompt = MEMORY_COMPACTION_USER_TEMPLATE.format(
+        segments="\n\n".join(
+            f"[{i + 1}] {seg.get('summary', '')}" for i, seg in enumerate(segments)
+        ),
     )
-    
-    logger.info(f"Memory: {len(output.updated_rolling_summary)} chars")
-    return output, int((time.time() - start_time) * 1000), 0
+
+    try:
+        data = make_api_call(
+            messages=[
+                {"role": "system", "content": MEMORY_COMPACTION_SYSTEM_PROMPT},
+                {"role": "user", "content": user_prompt},
+            ],
+            response_format={"type": "json_schema", "json_schema": MEMORY_COMPACTION_SCHEMA},
+            temperature=step_config.temperature,
+            max_tokens=step_config.max_tokens,
+            step_name="MemoryCompaction",
+            strict=False,
+            model=step_config.model,
+            timeout=step_config.timeout,
+        )
+    except Exception as e:
+        logger.error(f"Memory compaction failed: {e}")
+        return None
+
+    summary = (data.get("compacted_summary") or "").strip()
+    logger.info(f"Memory compaction ({step_config.model}): {len(segments)} segments -> {len(summary)} chars")
+    return summary or None
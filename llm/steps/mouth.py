@@ -6,8 +6,12 @@ import logging
 import time
 from typing import Tuple, Optional
 from llm.api_helpers import make_api_call
+from llm.config import llm_config, StepConfig
 from llm.schemas import PipelineInput, BrainOutput, MouthOutput
-from llm.prompts import MOUTH_SYSTEM_PROMPT, MOUTH_USER_TEMPLATE
+from llm.prompts import MOUTH_SYSTEM_PROMPT, MOUTH_USER_TEMPLATE, MOUTH_REGENERATE_TEMPLATE
+from llm.guardrails import GuardrailResult, enforce
+from llm.json_repair import TruncatedFieldError
+from llm.metrics import metrics
 from llm.utils import format_ctas
 
 logger = logging.getLogger(__name__)
@@ -83,32 +87,93 @@ def _validate_and_build_output(data: dict, context: PipelineInput) -> MouthOutpu
     )
 
 
-def run_mouth(context: PipelineInput, brain_output: BrainOutput) -> Tuple[Optional[MouthOutput], int, int]:
+# Why a reply was rejected, for the regeneration prompt
+_HARD_FAILURE_PROBLEMS = {
+    "empty": "The message was empty.",
+    "placeholder": "The message contained a template placeholder (like {{name}}) instead of final text.",
+    "questions": "The message consisted only of questions.",
+    "too_long": "The message was far too long; even its first sentence was over {max_words} words.",
+    "truncated": "The response was cut off in the middle of the message.",
+}
+
+
+def _apply_guardrails(output: MouthOutput, context: PipelineInput) -> Tuple[MouthOutput, GuardrailResult]:
+    """Fix soft violations locally; the result says whether a regeneration is needed."""
+    result = enforce(output.message_text, context.max_words, context.questions_per_message)
+    for rule in result.fixes:
+        metrics.incr("llm.guardrail.fixed", rule=rule)
+    if result.fixes:
+        logger.info(f"Mouth guardrails fixed: {', '.join(result.violations)}")
+
+    output = output.model_copy(update={
+        "message_text": result.text if result.passed else output.message_text,
+        "self_check_passed": result.passed,
+        "violations": list(output.violations) + result.violations,
+    })
+    return output, result
+
+
+def run_mouth(
+    context: PipelineInput,
+    brain_output: BrainOutput,
+    step_config: Optional[StepConfig] = None,
+) -> Tuple[Optional[MouthOutput], int, int]:
     """
     Run the Mouth step.
     Only runs if brain_output.should_respond is True.
+    The reply is checked by llm/guardrails.py; only hard failures are regenerated.
     """
     if not brain_output.should_respond:
         return None, 0, 0
     
+    step_config = step_config or llm_config.for_step("mouth", context.llm_overrides)
     system_prompt = _build_system_prompt(context)
     user_prompt = _build_user_prompt(context, brain_output)
     
     start_time = time.time()
     
     try:
-        data = make_api_call(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            response_format={"type": "json_schema", "json_schema": MOUTH_SCHEMA},
-            step_name="Mouth",
-            strict=True
-        )
+        regenerations = 0
+        while True:
+            try:
+                data = make_api_call(
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt},
+                    ],
+                    response_format={"type": "json_schema", "json_schema": MOUTH_SCHEMA},
+                    temperature=step_config.temperature,
+                    max_tokens=step_config.max_tokens,
+                    step_name="Mouth",
+                    strict=True,
+                    model=step_config.model,
+                    timeout=step_config.timeout,
+                    hedge_model=step_config.hedge_model,
+                    intact_fields=("message_text",),
+                )
+            except TruncatedFieldError:
+                # A cut-off message is never sent, however well the JSON closes
+                guardrail = GuardrailResult(text="", violations=["truncated"], hard_failure="truncated")
+            else:
+                output, guardrail = _apply_guardrails(_validate_and_build_output(data, context), context)
+            if guardrail.passed:
+                break
+
+            metrics.incr("llm.guardrail.hard_failure", reason=guardrail.hard_failure)
+            if regenerations >= llm_config.guardrail_max_regenerations:
+                metrics.incr("llm.guardrail.unresolved", reason=guardrail.hard_failure)
+                raise ValueError(f"Mouth reply failed guardrail: {guardrail.hard_failure}")
+
+            regenerations += 1
+            metrics.incr("llm.guardrail.regenerate", reason=guardrail.hard_failure)
+            logger.warning(f"Mouth reply failed guardrail ({guardrail.hard_failure}), regenerating")
+            user_prompt = _build_user_prompt(context, brain_output) + MOUTH_REGENERATE_TEMPLATE.format(
+                problem=_HARD_FAILURE_PROBLEMS[guardrail.hard_failure].format(max_words=context.max_words),
+                max_words=context.max_words,
+                questions_per_message=context.questions_per_message,
+            )
         
         latency_ms = int((time.time() - start_time) * 1000)
-        output = _validate_and_build_output(data, context)
         
         logger.info(f"Mouth: {len(output.message_text)} chars")
         return output, latency_ms, 0
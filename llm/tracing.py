@@ -0,0 +1,208 @@
+"""
+LLM Trace Recorder.
+Structured, sampled records of every LLM call (step, model, prompt hash,
+latency, tokens, response) written to a rotating JSONL file.
+
+Callers never block on disk: records go onto a bounded queue drained by a
+background thread, and are dropped (and counted) if the queue is full.
+
+Sampling is decided once per trace scope (one pipeline run / memory task) so a
+sampled turn is traced end-to-end. Conversations listed in
+LLM_TRACE_FORCE_CONVERSATIONS, or forced at runtime, are always traced.
+"""
+import atexit
+import contextvars
+import hashlib
+import json
+import logging
+import queue
+import random
+import threading
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from llm.config import llm_config
+from llm.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class TraceScope:
+    trace_id: str
+    conversation_id: Optional[str]
+    sampled: bool
+
+
+_current_scope: contextvars.ContextVar[Optional[TraceScope]] = contextvars.ContextVar(
+    "llm_trace_scope", default=None
+)
+
+
+def prompt_hash(messages: List[Dict[str, str]]) -> str:
+    """Stable hash of the prompt, for grouping identical requests."""
+    raw = json.dumps(messages, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+class TraceRecorder:
+    """Background JSONL writer with sampling and per-conversation force-trace."""
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        path: str,
+        sample_rate: float,
+        include_prompts: bool,
+        force_conversations: Set[str],
+        max_bytes: int,
+        backup_count: int,
+        queue_size: int,
+    ) -> None:
+        self.path = Path(path)
+        self.sample_rate = sample_rate
+        self.include_prompts = include_prompts
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._forced: Set[str] = set(force_conversations)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- sampling ----------
+
+    def force_conversation(self, conversation_id: str, enabled: bool = True) -> None:
+        """Always (or no longer) trace a specific conversation."""
+        with self._lock:
+            if enabled:
+                self._forced.add(str(conversation_id))
+            else:
+                self._forced.discard(str(conversation_id))
+
+    def should_sample(self, conversation_id: Optional[str]) -> bool:
+        if conversation_id and str(conversation_id) in self._forced:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    # ---------- writing ----------
+
+    def _ensure_writer(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="llm-trace-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Reuse stdlib rotation; records are pre-serialized JSON lines
+        handler = RotatingFileHandler(
+            self.path, maxBytes=self.max_bytes, backupCount=self.backup_count, encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        while True:
+            record = self._queue.get()
+            if record is self._STOP:
+                handler.close()
+                return
+            try:
+                line = json.dumps(record, ensure_ascii=False, default=str)
+                handler.emit(logging.makeLogRecord({"msg": line, "args": None}))
+            except Exception as e:
+                logger.warning(f"Failed to write LLM trace: {e}")
+
+    def record(
+        self,
+        step: str,
+        model: str,
+        messages: List[Dict[str, str]],
+        latency_ms: int,
+        response: Optional[str] = None,
+        usage: Optional[Dict[str, int]] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        """Record one LLM call if the current scope is sampled. Never blocks."""
+        scope = _current_scope.get()
+        if scope is None:
+            # Calls outside a scope (scripts, ad-hoc) are sampled per call
+            if not self.should_sample(None):
+                return
+            scope = TraceScope(trace_id=uuid.uuid4().hex, conversation_id=None, sampled=True)
+        elif not scope.sampled:
+            return
+
+        record: Dict[str, Any] = {
+            "ts": datetime.now(timezone.utc).isoformat(),
+            "trace_id": scope.trace_id,
+            "conversation_id": scope.conversation_id,
+            "step": step,
+            "model": model,
+            "prompt_hash": prompt_hash(messages),
+            "latency_ms": latency_ms,
+            "usage": usage or {},
+            "response": response,
+            "error": error,
+        }
+        if self.include_prompts:
+            record["messages"] = messages
+
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(record)
+            metrics.incr("llm.trace.recorded", step=step)
+        except queue.Full:
+            metrics.incr("llm.trace.dropped", step=step)
+
+    def flush(self, timeout: float = 2.0) -> None:
+        """Stop the writer after draining queued records (called at exit)."""
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(self._STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout=timeout)
+        self._thread = None
+
+
+@contextmanager
+def trace_scope(conversation_id: Optional[str] = None):
+    """
+    Group all LLM calls made inside the block into one trace, with a single
+    sampling decision.
+
+    Usage:
+        with trace_scope(context.conversation_id):
+            run_eyes(...); run_brain(...)
+    """
+    scope = TraceScope(
+        trace_id=uuid.uuid4().hex,
+        conversation_id=str(conversation_id) if conversation_id else None,
+        sampled=trace_recorder.should_sample(conversation_id),
+    )
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+
+
+# Module-level singleton
+trace_recorder = TraceRecorder(
+    path=llm_config.trace_path,
+    sample_rate=llm_config.trace_sample_rate,
+    include_prompts=llm_config.trace_include_prompts,
+    force_conversations=llm_config.trace_force_conversations,
+    max_bytes=llm_config.trace_max_bytes,
+    backup_count=llm_config.trace_backup_count,
+    queue_size=llm_config.trace_queue_size,
+)
+atexit.register(trace_recorder.flush)
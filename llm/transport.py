@@ -0,0 +1,269 @@
+"""
+LLM Transport Layer.
+Pluggable backend under make_api_call, so the pipeline can run offline.
+
+Modes (LLM_TRANSPORT):
+    live   - call the OpenAI-compatible endpoint (default)
+    record - call the endpoint and save each response as a cassette
+    replay - serve responses from cassettes only; no network, no API key
+
+Cassettes are JSON files in LLM_CASSETTE_DIR, keyed by a stable hash of
+(model, messages, response_format). Temperature and timeouts are excluded,
+and so is the prompt's "Now: <timestamp>" line (it changes on every run), so
+a replay is deterministic for the same prompt. LLM_REPLAY_LATENCY_MS
+simulates endpoint latency: a number of milliseconds, or "recorded" to
+sleep for the latency captured at record time.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from llm.config import llm_config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LLMResponse:
+    content: Optional[str]
+    usage: Dict[str, int] = field(default_factory=dict)
+
+
+class CassetteMissError(LookupError):
+    """Replay mode found no recorded response for a request."""
+
+
+# The prompts' clock line (llm/prompts.py "## Timing")
+_VOLATILE_LINE_RE = re.compile(r"^Now: .*$", re.MULTILINE)
+
+
+def _stable_messages(messages: Any) -> Any:
+    """Messages with the volatile timestamp lines blanked out."""
+    if not isinstance(messages, list):
+        return messages
+    return [
+        {**message, "content": _VOLATILE_LINE_RE.sub("Now: <now>", message["content"])}
+        if isinstance(message, dict) and isinstance(message.get("content"), str)
+        else message
+        for message in messages
+    ]
+
+
+def cassette_key(request: Dict[str, Any]) -> str:
+    """Stable hash of the parts of a request that determine the response."""
+    raw = json.dumps(
+        {
+            "model": request.get("model"),
+            "messages": _stable_messages(request.get("messages")),
+            "response_format": request.get("response_format"),
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _usage_dict(response: Any) -> Dict[str, int]:
+    """Token usage from an OpenAI-compatible response (empty if not reported)."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return {}
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        "total_tokens": getattr(usage, "total_tokens", 0) or 0,
+    }
+
+
+# ============================================================
+# Transports
+# ============================================================
+
+class LLMTransport:
+    """Executes a chat completion request (the kwargs for chat.completions.create)."""
+
+    def complete(self, request: Dict[str, Any]) -> LLMResponse:
+        raise NotImplementedError
+
+    def route(self, request: Dict[str, Any]) -> Tuple[Optional[str], Callable[[Dict[str, Any]], LLMResponse]]:
+        """
+        Pick where the next attempt goes: (endpoint name, send). The rate
+        limiter keeps separate state per endpoint; None is the single endpoint.
+        """
+        return None, self.complete
+
+
+class LiveTransport(LLMTransport):
+    """Real endpoint. The OpenAI client is created on first use."""
+
+    def __init__(self, base_url: Optional[str] = None, api_key: Optional[str] = None) -> None:
+        self.base_url = base_url
+        self.api_key = api_key
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from openai import OpenAI
+                    # Per-request timeouts are always passed; this is the backstop
+                    self._client = OpenAI(
+                        api_key=self.api_key or llm_config.api_key,
+                        base_url=self.base_url or llm_config.base_url,
+                        timeout=llm_config.timeout,
+                        # Retries (429 retry-after, transient errors) are coordinated by llm/rate_limit.py
+                        max_retries=0,
+                    )
+        return self._client
+
+    def complete(self, request: Dict[str, Any]) -> LLMResponse:
+        response = self.client.chat.completions.create(**request)
+        return LLMResponse(
+            content=response.choices[0].message.content,
+            usage=_usage_dict(response),
+        )
+
+
+class CassetteStore:
+    """One JSON file per request key."""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = Path(directory)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, key: str, cassette: Dict[str, Any]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename so concurrent workers never read a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(cassette, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self._path(key))
+
+
+class RecordTransport(LLMTransport):
+    """Calls the inner transport and stores every response."""
+
+    def __init__(self, inner: LLMTransport, store: CassetteStore) -> None:
+        self.inner = inner
+        self.store = store
+
+    def complete(self, request: Dict[str, Any]) -> LLMResponse:
+        _, send = self.route(request)
+        return send(request)
+
+    def route(self, request: Dict[str, Any]) -> Tuple[Optional[str], Callable[[Dict[str, Any]], LLMResponse]]:
+        endpoint, send = self.inner.route(request)
+        return endpoint, lambda routed: self._record(routed, send)
+
+    def _record(self, request: Dict[str, Any], send: Callable[[Dict[str, Any]], LLMResponse]) -> LLMResponse:
+        start_time = time.time()
+        response = send(request)
+        latency_ms = int((time.time() - start_time) * 1000)
+
+        key = cassette_key(request)
+        self.store.save(key, {
+            "key": key,
+            "model": request.get("model"),
+            "messages": request.get("messages"),
+            "response_format": request.get("response_format"),
+            "content": response.content,
+            "usage": response.usage,
+            "latency_ms": latency_ms,
+        })
+        return response
+
+
+class ReplayTransport(LLMTransport):
+    """Serves recorded responses. Raises CassetteMissError for unknown requests."""
+
+    def __init__(self, store: CassetteStore, latency_ms: Optional[str] = None) -> None:
+        self.store = store
+        self.latency_ms = latency_ms
+
+    def _simulated_delay(self, cassette: Dict[str, Any]) -> float:
+        if not self.latency_ms:
+            return 0.0
+        if self.latency_ms == "recorded":
+            return (cassette.get("latency_ms") or 0) / 1000
+        return float(self.latency_ms) / 1000
+
+    def complete(self, request: Dict[str, Any]) -> LLMResponse:
+        key = cassette_key(request)
+        cassette = self.store.load(key)
+        if cassette is None:
+            raise CassetteMissError(
+                f"No cassette for model={request.get('model')} key={key[:12]} in {self.store.directory}"
+            )
+
+        delay = self._simulated_delay(cassette)
+        if delay > 0:
+            time.sleep(delay)
+        return LLMResponse(content=cassette.get("content"), usage=cassette.get("usage") or {})
+
+
+# ============================================================
+# Active Transport
+# ============================================================
+
+def _live_transport() -> LLMTransport:
+    """Single endpoint, or a health-balanced pool when LLM_ENDPOINTS is set."""
+    if llm_config.endpoints:
+        from llm.client_pool import build_pool
+        return build_pool(llm_config.endpoints)
+    return LiveTransport()
+
+
+def build_transport(mode: str) -> LLMTransport:
+    store = CassetteStore(llm_config.cassette_dir)
+    if mode == "record":
+        return RecordTransport(_live_transport(), store)
+    if mode == "replay":
+        return ReplayTransport(store, llm_config.replay_latency_ms)
+    if mode != "live":
+        logger.warning(f"Unknown LLM_TRANSPORT {mode!r}, using live")
+    return _live_transport()
+
+
+_transport: LLMTransport = build_transport(llm_config.transport)
+
+
+_hedge_transport: Optional[LLMTransport] = None
+
+
+def get_transport() -> LLMTransport:
+    return _transport
+
+
+def get_hedge_transport() -> LLMTransport:
+    """Transport for hedged requests: the alternate endpoint if configured."""
+    global _hedge_transport
+    if not llm_config.hedge_base_url or llm_config.transport != "live":
+        return _transport
+    if _hedge_transport is None:
+        _hedge_transport = LiveTransport(llm_config.hedge_base_url, llm_config.hedge_api_key)
+    return _hedge_transport
+
+
+def set_transport(transport: LLMTransport) -> None:
+    """Swap the transport at runtime (benchmarks, scripts)."""
+    global _transport
+    _transport = transport
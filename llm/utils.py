@@ -3,9 +3,13 @@ LLM Utilities for Pipeline.
 Provides enum normalization and prompt formatting.
 """
 import logging
-from typing import Type, TypeVar, Optional
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Optional, Set, Tuple, Type, TypeVar
 from enum import Enum
 from rapidfuzz import process, fuzz
+from llm.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -46,6 +50,117 @@ ENUM_ALIASES = {
 }
 
 
+# Distinct fuzzy results remembered per enum class (LLM misspellings repeat a lot)
+FUZZY_MEMO_SIZE = 256
+
+# Distinct raw values labelled in correction metrics per enum class; the rest count as "other"
+MAX_CORRECTION_LABELS = 100
+
+
+def _normalize_key(value: str) -> str:
+    return value.strip().lower().replace("-", "_").replace(" ", "_")
+
+
+class EnumNormalizer:
+    """
+    Compiled normalizer for one enum class.
+
+    Built once per class: a single lookup table of raw values, lowercased
+    values and the ENUM_ALIASES that point at this class, plus a bounded LRU
+    memo of fuzzy-match results so a repeated misspelling costs one dict hit.
+    """
+
+    def __init__(self, enum_class: Type[T], memo_size: int = FUZZY_MEMO_SIZE) -> None:
+        self.enum_class = enum_class
+        self.name = enum_class.__name__
+        self.memo_size = memo_size
+
+        self.values: Dict[str, T] = {e.value.lower(): e for e in enum_class}
+        self.exact: Dict[str, T] = {e.value: e for e in enum_class}
+        # Only aliases that resolve inside this class
+        self.aliases: Dict[str, T] = {
+            alias: self.values[target]
+            for alias, target in ENUM_ALIASES.items()
+            if target in self.values
+        }
+        self._choices = list(self.values)
+
+        self._memo: "OrderedDict[str, Tuple[Optional[T], float]]" = OrderedDict()
+        self._labelled: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def normalize(self, value: Optional[str], default: Optional[T] = None, log_corrections: bool = True) -> Optional[T]:
+        if value is None or value == "null" or value == "":
+            return default
+
+        # Well-behaved output: the exact enum value
+        member = self.exact.get(value)
+        if member is not None:
+            return member
+
+        normalized = _normalize_key(value)
+        member = self.values.get(normalized)
+        if member is not None:
+            return member
+
+        member = self.aliases.get(normalized)
+        if member is not None:
+            self._record(value, "alias")
+            return member
+
+        member, score = self._fuzzy(normalized)
+        if member is not None:
+            self._record(value, "fuzzy")
+            if log_corrections:
+                logger.warning(
+                    f"Enum correction: '{value}' → '{member.value}' "
+                    f"(score={score:.1f}, class={self.name})"
+                )
+            return member
+
+        self._record(value, "fallback")
+        if log_corrections:
+            logger.warning(
+                f"Enum fallback: '{value}' not valid for {self.name}, "
+                f"using default={default.value if default else None}"
+            )
+        return default
+
+    def _fuzzy(self, normalized: str) -> Tuple[Optional[T], float]:
+        with self._lock:
+            cached = self._memo.get(normalized)
+            if cached is not None:
+                self._memo.move_to_end(normalized)
+                return cached
+
+        # score_cutoff=60 is roughly equivalent to difflib cutoff=0.6
+        match = process.extractOne(normalized, self._choices, scorer=fuzz.WRatio, score_cutoff=60)
+        result = (self.values[match[0]], match[1]) if match else (None, 0.0)
+
+        with self._lock:
+            self._memo[normalized] = result
+            if len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        return result
+
+    def _record(self, value: str, kind: str) -> None:
+        """Count corrections by raw value, so the most frequent ones can be fixed in the prompts."""
+        raw = value[:40]
+        if raw not in self._labelled:
+            with self._lock:
+                if len(self._labelled) >= MAX_CORRECTION_LABELS:
+                    raw = "other"
+                else:
+                    self._labelled.add(raw)
+        metrics.incr("llm.enum_correction", enum=self.name, kind=kind, raw=raw)
+
+
+@lru_cache(maxsize=None)
+def get_enum_normalizer(enum_class: Type[T]) -> EnumNormalizer:
+    """The compiled normalizer for an enum class (built on first use)."""
+    return EnumNormalizer(enum_class)
+
+
 def normalize_enum(
     value: Optional[str],
     enum_class: Type[T],
@@ -60,50 +175,7 @@ def normalize_enum(
     - "Greeting" -> ConversationStage.GREETING  
     - "send_now" or "SEND_NOW" -> DecisionAction.SEND_NOW
     """
-    if value is None or value == "null" or value == "":
-        return default
-    
-    # Normalize input
-    normalized = value.strip().lower().replace("-", "_").replace(" ", "_")
-    
-    # Check explicit aliases first
-    if normalized in ENUM_ALIASES:
-        normalized = ENUM_ALIASES[normalized]
-    
-    # Get all valid enum values
-    valid_values = {e.value.lower(): e for e in enum_class}
-    
-    # Direct match
-    if normalized in valid_values:
-        return valid_values[normalized]
-    
-    # Try fuzzy matching with rapidfuzz
-    # score_cutoff=60 is roughly equivalent to difflib cutoff=0.6
-    match = process.extractOne(
-        normalized, 
-        valid_values.keys(), 
-        scorer=fuzz.WRatio, 
-        score_cutoff=60
-    )
-    
-    if match:
-        matched_value, score, _ = match
-        result = valid_values[matched_value]
-        
-        if log_corrections:
-            logger.warning(
-                f"Enum correction: '{value}' → '{result.value}' "
-                f"(score={score:.1f}, class={enum_class.__name__})"
-            )
-        return result
-    
-    # No match found
-    if log_corrections:
-        logger.warning(
-            f"Enum fallback: '{value}' not valid for {enum_class.__name__}, "
-            f"using default={default.value if default else None}"
-        )
-    return default
+    return get_enum_normalizer(enum_class).normalize(value, default, log_corrections)
 
 
 # ============================================================
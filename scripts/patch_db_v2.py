@@ -0,0 +1,64 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from sqlalchemy import text
+from server.database import engine
+
+def patch_db():
+    print("🔄 Patching Database Schema (v2)...")
+    
+    commands = [
+        # Per-step LLM routing overrides
+        "ALTER TABLE organizations ADD COLUMN IF NOT EXISTS llm_settings JSON;",
+        # Hierarchical memory segments
+        "ALTER TABLE conversations ADD COLUMN IF NOT EXISTS memory_segments JSON;",
+        # Materialized follow-up schedule + partial index over scheduled rows
+        "ALTER TABLE conversations ADD COLUMN IF NOT EXISTS next_followup_at TIMESTAMPTZ;",
+        "ALTER TABLE conversations ADD COLUMN IF NOT EXISTS next_followup_stage VARCHAR(32);",
+        "CREATE INDEX IF NOT EXISTS ix_conversations_next_followup_due ON conversations (next_followup_at) WHERE next_followup_at IS NOT NULL;",
+        "ALTER TABLE conversations ADD COLUMN IF NOT EXISTS followup_lease_until TIMESTAMPTZ;",
+        "ALTER TABLE conversations ADD COLUMN IF NOT EXISTS followup_lease_token UUID;",
+        # Pre-generated follow-up drafts
+        "ALTER TABLE conversations ADD COLUMN IF NOT EXISTS followup_draft JSON;",
+        # Template follow-up sequence progress
+        "ALTER TABLE conversations ADD COLUMN IF NOT EXISTS template_followup_order INTEGER;",
+        "ALTER TABLE conversations ADD COLUMN IF NOT EXISTS template_followup_sent_at TIMESTAMPTZ;",
+        # Campaigns (the campaigns table itself is created by create_all on server startup)
+        "ALTER TABLE messages ADD COLUMN IF NOT EXISTS campaign_id UUID REFERENCES campaigns(id);",
+        "CREATE INDEX IF NOT EXISTS ix_messages_campaign_lead ON messages (campaign_id, lead_id) WHERE campaign_id IS NOT NULL;",
+        "ALTER TABLE whatsapp_integrations ADD COLUMN IF NOT EXISTS messaging_limit INTEGER NOT NULL DEFAULT 1000;",
+        # Template sends (campaigns and template follow-ups) count against the messaging tier
+        "ALTER TABLE messages ADD COLUMN IF NOT EXISTS is_template BOOLEAN NOT NULL DEFAULT FALSE;",
+        "UPDATE messages SET is_template = TRUE WHERE campaign_id IS NOT NULL AND is_template = FALSE;",
+        "CREATE INDEX IF NOT EXISTS ix_messages_template_sends ON messages (organization_id, created_at) WHERE is_template;",
+        # WhatsApp message ids, for delivery / read status webhooks
+        "ALTER TABLE messages ADD COLUMN IF NOT EXISTS external_message_id VARCHAR(255);",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_messages_external_message_id ON messages (external_message_id) WHERE external_message_id IS NOT NULL;",
+        "ALTER TABLE messages ADD COLUMN IF NOT EXISTS send_lease_until TIMESTAMP WITH TIME ZONE;",
+        "CREATE INDEX IF NOT EXISTS ix_messages_outbox ON messages (created_at) WHERE status = 'sending' AND campaign_id IS NULL;",
+        # Chat messages left in "sending" by the old inline send never went out; fail them rather than
+        # let the outbox deliver them late (unleased and older than a few minutes: nothing is sending them)
+        "UPDATE messages SET status = 'failed' WHERE status = 'sending' AND campaign_id IS NULL AND send_lease_until IS NULL AND created_at < now() - interval '10 minutes';",
+    ]
+    
+    with engine.connect() as conn:
+        for cmd in commands:
+            try:
+                print(f"Executing: {cmd}")
+                conn.execute(text(cmd))
+                print("✅ Success")
+            except Exception as e:
+                print(f"⚠️ Error (ignoring): {e}")
+        conn.commit()
+
+    # Compute the follow-up schedule for existing conversations still inside the 24h window
+    from server.database import SessionLocal
+    from server.services.followup_schedule import backfill_followup_schedule
+    with SessionLocal() as db:
+        print(f"✅ Follow-up schedule backfilled for {backfill_followup_schedule(db)} conversations")
+    
+    print("✅ Patch Complete.")
+
+if __name__ == "__main__":
+    patch_db()
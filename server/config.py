@@ -20,4 +20,35 @@ class ServerConfig:
         self.ALGORITHM = os.getenv("ALGORITHM")
         self.INTERNAL_API_SECRET = os.getenv("INTERNAL_API_SECRET")
 
+        # Template follow-ups (bulk sends outside the 24h window): per phone number
+        # send rate (Meta throughput tier) and concurrent Graph requests per run
+        self.TEMPLATE_SEND_RATE_PER_SECOND = float(os.getenv("TEMPLATE_SEND_RATE_PER_SECOND", "20"))
+        self.TEMPLATE_SEND_CONCURRENCY = int(os.getenv("TEMPLATE_SEND_CONCURRENCY", "8"))
+
+        # Meta Graph API client (server/services/graph_client.py): per-request
+        # timeout, connect timeout and size of the keep-alive connection pool
+        self.GRAPH_TIMEOUT_SECONDS = float(os.getenv("GRAPH_TIMEOUT_SECONDS", "15"))
+        self.GRAPH_CONNECT_TIMEOUT_SECONDS = float(os.getenv("GRAPH_CONNECT_TIMEOUT_SECONDS", "5"))
+        self.GRAPH_MAX_CONNECTIONS = int(os.getenv("GRAPH_MAX_CONNECTIONS", "50"))
+
+        # Outbound chat queue (server/services/outbound_queue.py): per phone number
+        # send rate, parallel lanes, attempts for 429/5xx and the first backoff,
+        # how long a process holds a "sending" message (must outlive queueing plus
+        # retries), how often each process picks up unheld ones from the outbox,
+        # and the age past which an unheld one is failed instead of sent late
+        self.OUTBOUND_RATE_PER_SECOND = float(os.getenv("OUTBOUND_RATE_PER_SECOND", "20"))
+        self.OUTBOUND_LANES = int(os.getenv("OUTBOUND_LANES", "16"))
+        self.OUTBOUND_MAX_ATTEMPTS = int(os.getenv("OUTBOUND_MAX_ATTEMPTS", "4"))
+        self.OUTBOUND_BACKOFF_SECONDS = float(os.getenv("OUTBOUND_BACKOFF_SECONDS", "1"))
+        self.OUTBOUND_LEASE_SECONDS = int(os.getenv("OUTBOUND_LEASE_SECONDS", "600"))
+        self.OUTBOUND_POLL_SECONDS = float(os.getenv("OUTBOUND_POLL_SECONDS", "30"))
+        self.OUTBOUND_MAX_AGE_SECONDS = int(os.getenv("OUTBOUND_MAX_AGE_SECONDS", "1800"))
+        # Optional: share the per-number rate across server processes (one bucket in Redis)
+        self.OUTBOUND_REDIS_URL = os.getenv("OUTBOUND_REDIS_URL")
+
+        # Campaigns: leads per checkpoint, and how long a run holds a campaign
+        # (a crashed run's campaign is picked up again once its lease expires)
+        self.CAMPAIGN_BATCH_SIZE = int(os.getenv("CAMPAIGN_BATCH_SIZE", "100"))
+        self.CAMPAIGN_LEASE_SECONDS = int(os.getenv("CAMPAIGN_LEASE_SECONDS", "300"))
+
 config = ServerConfig()
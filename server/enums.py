@@ -66,6 +66,12 @@ class TemplateStatus(str, Enum):
     APPROVED = "approved"
     REJECTED = "rejected"
 
+class CampaignStatus(str, Enum):
+    DRAFT = "draft"
+    RUNNING = "running"
+    PAUSED = "paused"
+    COMPLETED = "completed"
+
 class MessageFrom(str, Enum):
     LEAD = "lead"
     BOT = "bot"
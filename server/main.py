@@ -77,4 +77,23 @@ def init_database():
     if new_tables:
         print(f"✅ Created new tables: {sorted(new_tables)}")
     else:
-        print(f"ℹ️ No new tables created. Tables now: {updated_tables}")
\ No newline at end of file
+        print(f"ℹ️ No new tables created. Tables now: {updated_tables}")
+
+# =========================================================
+# OUTBOUND MESSAGE QUEUE
+# =========================================================
+@app.on_event("startup")
+async def start_outbound_dispatcher():
+    from server.services.outbound_queue import outbound_dispatcher
+
+    # The first outbox poll also picks up messages a previous process left in "sending"
+    outbound_dispatcher.start()
+
+
+@app.on_event("shutdown")
+async def stop_outbound_dispatcher():
+    from server.services.graph_client import graph_client
+    from server.services.outbound_queue import outbound_dispatcher
+
+    await outbound_dispatcher.stop()
+    await graph_client.aclose()
@@ -9,6 +9,7 @@ from sqlalchemy import (
     ForeignKey,
     Enum as SQLEnum,
     JSON,
+    Index,
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
@@ -20,6 +21,7 @@ from server.enums import (
     UserSentiment,
     TemplateStatus,
     MessageFrom,
+    CampaignStatus,
 )
 from server.database import Base
 
@@ -38,6 +40,7 @@ class Organization(Base):
     business_name = Column(Text, nullable=True)  # Chatbot persona name
     business_description = Column(Text, nullable=True)  # Business context for LLM
     flow_prompt = Column(Text, nullable=True)  # Conversation flow instructions
+    llm_settings = Column(JSON, nullable=True)  # Per-step LLM overrides: {"eyes": {"model": ...}}
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -82,6 +85,7 @@ class Conversation(Base):
     
     # === Context ===
     rolling_summary = Column(Text, nullable=True)
+    memory_segments = Column(JSON, nullable=True)  # Hierarchical memory (see llm/memory_segments.py)
     last_message = Column(Text, nullable=True)
     
     # === Timing (for WhatsApp window & decisions) ===
@@ -93,10 +97,30 @@ class Conversation(Base):
     followup_count_24h = Column(Integer, default=0)
     total_nudges = Column(Integer, default=0)
     scheduled_followup_at = Column(DateTime(timezone=True), nullable=True)
+    # Materialized by server/services/followup_schedule.py on every message/state write
+    next_followup_at = Column(DateTime(timezone=True), nullable=True)
+    next_followup_stage = Column(SQLEnum(ConversationStage, native_enum=False), nullable=True)
+    # Claim lease (POST /internals/conversations/due-followups/claim); cleared when the schedule moves
+    followup_lease_until = Column(DateTime(timezone=True), nullable=True)
+    followup_lease_token = Column(UUID(as_uuid=True), nullable=True)
+    # Pre-generated next follow-up + fingerprint of the state it was drafted from (whatsapp_worker/processors/followup_drafts.py)
+    followup_draft = Column(JSON, nullable=True)
+    # Template sequence progress (server/services/template_followups.py); only counts while newer than last_user_message_at
+    template_followup_order = Column(Integer, nullable=True)
+    template_followup_sent_at = Column(DateTime(timezone=True), nullable=True)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    __table_args__ = (
+        # Only scheduled rows are indexed, so due-followup scans stay small
+        Index(
+            "ix_conversations_next_followup_due",
+            "next_followup_at",
+            postgresql_where=next_followup_at.isnot(None),
+        ),
+    )
+
     organization = relationship("Organization", back_populates="conversations")
     lead = relationship("Lead", back_populates="conversations")
     cta = relationship("CTA", back_populates="conversations")
@@ -113,8 +137,42 @@ class Message(Base):
     assigned_user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
     content = Column(Text, nullable=False)
     status = Column(String(30), nullable=False, default="sent")
+    # Set for campaign sends: one message per (campaign, lead), checked on resume
+    campaign_id = Column(UUID(as_uuid=True), ForeignKey("campaigns.id"), nullable=True)
+    # Business-initiated template send (campaign or template follow-up): counts against the Meta tier
+    is_template = Column(Boolean, nullable=False, default=False, server_default="false")
+    # WhatsApp message id (wamid) of an accepted send; status webhooks are matched on it
+    external_message_id = Column(String(255), nullable=True)
+    # Chat messages in "sending" are the outbound outbox; the process delivering one holds it until then
+    send_lease_until = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index(
+            "ux_messages_external_message_id",
+            "external_message_id",
+            unique=True,
+            postgresql_where=external_message_id.isnot(None),
+        ),
+        Index(
+            "ix_messages_campaign_lead",
+            "campaign_id",
+            "lead_id",
+            postgresql_where=campaign_id.isnot(None),
+        ),
+        Index(
+            "ix_messages_template_sends",
+            "organization_id",
+            "created_at",
+            postgresql_where=is_template.is_(True),
+        ),
+        Index(
+            "ix_messages_outbox",
+            "created_at",
+            postgresql_where=(status == "sending") & campaign_id.is_(None),
+        ),
+    )
+
     conversation = relationship("Conversation", back_populates="messages")
     lead = relationship("Lead", back_populates="messages")
     assigned_user = relationship("User", back_populates="messages")
@@ -178,6 +236,32 @@ class Followup(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+class Campaign(Base):
+    __tablename__ = "campaigns"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    organization_id = Column(UUID(as_uuid=True), ForeignKey("organizations.id"), nullable=False)
+    template_id = Column(UUID(as_uuid=True), ForeignKey("templates.id"), nullable=False)
+
+    name = Column(String(255), nullable=False)
+    audience = Column(JSON, nullable=False, default=dict)  # Lead filter (schemas.CampaignAudience)
+    status = Column(SQLEnum(CampaignStatus, native_enum=False), nullable=False, default=CampaignStatus.DRAFT)
+
+    # Checkpoint: the audience is walked in lead id order, everything up to here is done
+    cursor_lead_id = Column(UUID(as_uuid=True), nullable=True)
+    total_recipients = Column(Integer, nullable=False, default=0)
+    sent_count = Column(Integer, nullable=False, default=0)
+    failed_count = Column(Integer, nullable=False, default=0)
+    skipped_count = Column(Integer, nullable=False, default=0)
+
+    # Held by the run currently sending this campaign
+    lease_until = Column(DateTime(timezone=True), nullable=True)
+
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
 # --------------------
 # Leads
 # --------------------
@@ -234,6 +318,8 @@ class WhatsAppIntegration(Base):
     app_secret = Column(String(255), nullable=False)
     phone_number_id = Column(String(255), nullable=False)
     is_connected = Column(Boolean, default=False)
+    # Meta messaging tier: business-initiated conversations allowed per rolling 24h
+    messaging_limit = Column(Integer, nullable=False, default=1000)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -5,6 +5,8 @@ from . import (
     leads, 
     conversations, 
     templates, 
+    followups,
+    campaigns,
     analytics, 
     dashboard, 
     ctas, 
@@ -25,6 +27,8 @@ router.include_router(conversations.router, prefix="/conversations", tags=["Conv
 router.include_router(messages.router, prefix="/messages", tags=["Messages"])
 router.include_router(ctas.router, prefix="/ctas", tags=["CTAs"])
 router.include_router(templates.router, prefix="/templates", tags=["Templates"])
+router.include_router(followups.router, prefix="/followups", tags=["Followups"])
+router.include_router(campaigns.router, prefix="/campaigns", tags=["Campaigns"])
 router.include_router(analytics.router, prefix="/analytics", tags=["Analytics"])
 router.include_router(settings.router, prefix="/settings", tags=["Settings"])
 router.include_router(users.router, prefix="/users", tags=["Users"])
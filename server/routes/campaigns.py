@@ -0,0 +1,116 @@
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import List
+from server.dependencies import get_db
+from server.dependencies import get_auth_context
+from server.enums import CampaignStatus, TemplateStatus
+from server.schemas import CampaignCreate, CampaignOut, AuthContext
+from server.models import Campaign, Template
+from server.services.campaigns import count_audience
+from server.services.template_followups import is_renderable
+from uuid import UUID
+
+router = APIRouter()
+
+
+def _get_campaign(db: Session, campaign_id: UUID, auth: AuthContext) -> Campaign:
+    campaign = db.query(Campaign).filter(
+        Campaign.id == campaign_id,
+        Campaign.organization_id == auth.organization_id
+    ).first()
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return campaign
+
+
+@router.get("", response_model=List[CampaignOut])
+def get_campaigns(
+    db: Session = Depends(get_db),
+    auth: AuthContext = Depends(get_auth_context)
+):
+    return (
+        db.query(Campaign)
+        .filter(Campaign.organization_id == auth.organization_id)
+        .order_by(Campaign.created_at.desc())
+        .all()
+    )
+
+
+@router.post("", response_model=CampaignOut)
+def create_campaign(
+    campaign: CampaignCreate,
+    db: Session = Depends(get_db),
+    auth: AuthContext = Depends(get_auth_context)
+):
+    template = db.query(Template).filter(
+        Template.id == campaign.template_id,
+        Template.organization_id == auth.organization_id
+    ).first()
+
+    if not template:
+        raise HTTPException(status_code=404, detail="Template not found")
+
+    db_campaign = Campaign(
+        organization_id=auth.organization_id,
+        template_id=campaign.template_id,
+        name=campaign.name,
+        audience=campaign.audience.model_dump(mode="json", exclude_none=True),
+        status=CampaignStatus.DRAFT,
+    )
+    db.add(db_campaign)
+    db.commit()
+    db.refresh(db_campaign)
+    return db_campaign
+
+
+@router.get("/{campaign_id}", response_model=CampaignOut)
+def get_campaign(
+    campaign_id: UUID,
+    db: Session = Depends(get_db),
+    auth: AuthContext = Depends(get_auth_context)
+):
+    """Campaign with its live progress counters."""
+    return _get_campaign(db, campaign_id, auth)
+
+
+@router.post("/{campaign_id}/start", response_model=CampaignOut)
+def start_campaign(
+    campaign_id: UUID,
+    db: Session = Depends(get_db),
+    auth: AuthContext = Depends(get_auth_context)
+):
+    """Start a draft campaign, or resume a paused one from its checkpoint."""
+    campaign = _get_campaign(db, campaign_id, auth)
+    if campaign.status not in (CampaignStatus.DRAFT, CampaignStatus.PAUSED):
+        raise HTTPException(status_code=400, detail=f"Campaign is {campaign.status.value}")
+
+    template = db.query(Template).filter(Template.id == campaign.template_id).first()
+    if not template or template.status != TemplateStatus.APPROVED:
+        raise HTTPException(status_code=400, detail="Template is not approved")
+    if not is_renderable(template):
+        raise HTTPException(status_code=400, detail="Template has parameters that cannot be filled")
+
+    if campaign.started_at is None:
+        campaign.started_at = datetime.now(timezone.utc)
+        campaign.total_recipients = count_audience(db, campaign)
+    campaign.status = CampaignStatus.RUNNING
+    db.commit()
+    db.refresh(campaign)
+    return campaign
+
+
+@router.post("/{campaign_id}/pause", response_model=CampaignOut)
+def pause_campaign(
+    campaign_id: UUID,
+    db: Session = Depends(get_db),
+    auth: AuthContext = Depends(get_auth_context)
+):
+    """Stop sending after the batch in flight; start resumes from the checkpoint."""
+    campaign = _get_campaign(db, campaign_id, auth)
+    if campaign.status != CampaignStatus.RUNNING:
+        raise HTTPException(status_code=400, detail=f"Campaign is {campaign.status.value}")
+    campaign.status = CampaignStatus.PAUSED
+    db.commit()
+    db.refresh(campaign)
+    return campaign
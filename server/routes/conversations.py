@@ -5,6 +5,7 @@ from server.dependencies import get_db, get_auth_context
 from server.schemas import ConversationOut, MessageOut, AuthContext
 from server.models import Conversation, Message
 from server.enums import ConversationMode
+from server.services.followup_schedule import refresh_followup_schedule
 from uuid import UUID
 from datetime import datetime
 
@@ -113,6 +114,7 @@ def takeover_conversation(
     # Clear human attention flag since human is now handling it
     db_conv.needs_human_attention = False
     db_conv.human_attention_resolved_at = datetime.utcnow()
+    refresh_followup_schedule(db_conv)
     db.commit()
     db.refresh(db_conv)
     return db_conv
@@ -132,6 +134,7 @@ def release_conversation(
         raise HTTPException(status_code=404, detail="Conversation not found")
     
     db_conv.mode = ConversationMode.BOT
+    refresh_followup_schedule(db_conv)
     db.commit()
     db.refresh(db_conv)
     return db_conv
@@ -0,0 +1,64 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from typing import List
+from server.dependencies import get_db
+from server.dependencies import get_auth_context
+from server.schemas import FollowupCreate, FollowupOut, AuthContext
+from server.models import Followup, Template
+from uuid import UUID
+
+router = APIRouter()
+
+@router.get("", response_model=List[FollowupOut])
+def get_followups(
+    db: Session = Depends(get_db),
+    auth: AuthContext = Depends(get_auth_context)
+):
+    """The org's template follow-up sequence, in send order."""
+    return (
+        db.query(Followup)
+        .filter(Followup.organization_id == auth.organization_id)
+        .order_by(Followup.sequence_order)
+        .all()
+    )
+
+@router.post("", response_model=FollowupOut)
+def create_followup(
+    followup: FollowupCreate,
+    db: Session = Depends(get_db),
+    auth: AuthContext = Depends(get_auth_context)
+):
+    template = db.query(Template).filter(
+        Template.id == followup.template_id,
+        Template.organization_id == auth.organization_id
+    ).first()
+
+    if not template:
+        raise HTTPException(status_code=404, detail="Template not found")
+
+    db_followup = Followup(
+        **followup.model_dump(),
+        organization_id=auth.organization_id
+    )
+    db.add(db_followup)
+    db.commit()
+    db.refresh(db_followup)
+    return db_followup
+
+@router.delete("/{followup_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_followup(
+    followup_id: UUID,
+    db: Session = Depends(get_db),
+    auth: AuthContext = Depends(get_auth_context)
+):
+    db_followup = db.query(Followup).filter(
+        Followup.id == followup_id,
+        Followup.organization_id == auth.organization_id
+    ).first()
+
+    if not db_followup:
+        raise HTTPException(status_code=404, detail="Followup not found")
+
+    db.delete(db_followup)
+    db.commit()
+    return None
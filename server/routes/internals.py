@@ -5,12 +5,13 @@ This module provides the single authorized layer for database access
 from the whatsapp_worker module. All database operations should go
 through these endpoints.
 """
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import List, Optional
-from uuid import UUID
+from uuid import UUID, uuid4
 from server.services.websocket_events import emit_conversation_updated
 from server.schemas import ConversationOut
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, or_
 from sqlalchemy.orm import Session
 from server.dependencies import require_internal_secret, get_db
 import logging
@@ -26,8 +27,15 @@ from server.schemas import (
     InternalIncomingMessageCreate, InternalIntegrationWithOrgOut,
     InternalLeadCreate, InternalLeadOut, InternalMessageContext, InternalMessageOut,
     InternalOutgoingMessageCreate, InternalPipelineEventCreate, InternalPipelineEventOut, 
-    InternalDueFollowupOut, CTAOut
+    InternalDueFollowupGroupOut, InternalDueFollowupItem, InternalFollowupClaimRequest,
+    InternalFollowupClaimOneRequest, InternalFollowupDraftIn,
+    InternalTemplateFollowupRunRequest, InternalTemplateFollowupRunOut,
+    InternalCampaignAdvanceRequest, InternalCampaignAdvanceOut,
+    InternalMessageStatusBatch, InternalMessageStatusBatchOut, CTAOut
 )
+from server.services import campaigns, template_followups
+from server.services.message_statuses import apply_status_updates
+from server.services.followup_schedule import refresh_followup_schedule
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -129,6 +137,7 @@ def get_integration_with_org(
         business_name=org.business_name,
         business_description=org.business_description,
         flow_prompt=org.flow_prompt,
+        llm_settings=org.llm_settings,
     )
 
 
@@ -250,6 +259,7 @@ def _conversation_to_schema(conv: Conversation) -> InternalConversationOut:
         mode=conv.mode,
         user_sentiment=conv.user_sentiment,
         rolling_summary=conv.rolling_summary,
+        memory_segments=conv.memory_segments,
         last_message=conv.last_message,
         last_message_at=conv.last_message_at,
         last_user_message_at=conv.last_user_message_at,
@@ -258,6 +268,11 @@ def _conversation_to_schema(conv: Conversation) -> InternalConversationOut:
         total_nudges=conv.total_nudges or 0,
         needs_human_attention=conv.needs_human_attention or False,
         scheduled_followup_at=conv.scheduled_followup_at,
+        next_followup_at=conv.next_followup_at,
+        next_followup_stage=conv.next_followup_stage,
+        followup_lease_until=conv.followup_lease_until,
+        followup_lease_token=conv.followup_lease_token,
+        followup_draft=conv.followup_draft,
         created_at=conv.created_at,
         updated_at=conv.updated_at,
     )
@@ -323,99 +338,226 @@ async def create_conversation(
 # Followup Evaluation Endpoints
 # ========================================
 
-@router.get("/conversations/due-followups", response_model=List[InternalDueFollowupOut])
+def _due_followups_query(db: Session, now: datetime, per_org_limit: Optional[int], unleased: bool = False):
+    """
+    Due conversations (with their lead), oldest first. per_org_limit caps each
+    org's share, so one org's backlog cannot fill the page. unleased leaves out
+    rows another claimer currently holds.
+    """
+    due_filter = [
+        Conversation.next_followup_at.isnot(None),
+        Conversation.next_followup_at <= now,
+    ]
+    if unleased:
+        due_filter.append(or_(
+            Conversation.followup_lease_until.is_(None),
+            Conversation.followup_lease_until <= now,
+        ))
+
+    query = (
+        db.query(Conversation, Lead)
+        .join(Lead, Conversation.lead_id == Lead.id)
+        .filter(*due_filter)
+    )
+    if per_org_limit:
+        ranked = (
+            db.query(
+                Conversation.id.label("id"),
+                func.row_number().over(
+                    partition_by=Conversation.organization_id,
+                    order_by=Conversation.next_followup_at,
+                ).label("org_rank"),
+            )
+            .filter(*due_filter)
+            .subquery()
+        )
+        # IN rather than a join: Postgres refuses FOR UPDATE next to window functions
+        query = query.filter(Conversation.id.in_(
+            db.query(ranked.c.id).filter(ranked.c.org_rank <= per_org_limit)
+        ))
+    return query.order_by(Conversation.next_followup_at)
+
+
+def _group_due_followups(db: Session, due: list) -> List[InternalDueFollowupGroupOut]:
+    """Group (conversation, lead) rows by org, dropping orgs whose WhatsApp is not connected."""
+    if not due:
+        return []
+
+    org_ids = {conv.organization_id for conv, _ in due}
+    orgs = {
+        org.id: (org, integration)
+        for org, integration in (
+            db.query(Organization, WhatsAppIntegration)
+            .join(WhatsAppIntegration, Organization.id == WhatsAppIntegration.organization_id)
+            .filter(
+                Organization.id.in_(org_ids),
+                # WhatsApp must be connected
+                WhatsAppIntegration.is_connected.is_(True),
+            )
+            .all()
+        )
+    }
+
+    groups: dict = {}
+    for conv, lead in due:
+        if conv.organization_id not in orgs:
+            continue
+        group = groups.get(conv.organization_id)
+        if group is None:
+            org, integration = orgs[conv.organization_id]
+            group = groups[conv.organization_id] = InternalDueFollowupGroupOut(
+                organization_id=org.id,
+                organization_name=org.name,
+                access_token=integration.access_token,
+                phone_number_id=integration.phone_number_id,
+                version=integration.version,
+                business_name=org.business_name,
+                business_description=org.business_description,
+                flow_prompt=org.flow_prompt,
+                llm_settings=org.llm_settings,
+                followups=[],
+            )
+        group.followups.append(InternalDueFollowupItem(
+            followup_type=conv.next_followup_stage,
+            conversation=_conversation_to_schema(conv),
+            lead=_lead_to_schema(lead),
+            lease_token=conv.followup_lease_token,
+        ))
+    return list(groups.values())
+
+
+@router.get("/conversations/due-followups", response_model=List[InternalDueFollowupGroupOut])
 def get_due_followups(
+    limit: int = Query(default=500, le=5000),
+    per_org_limit: Optional[int] = Query(default=None, ge=1),
     db: Session = Depends(get_db),
     _: None = Depends(require_internal_secret),
 ):
     """
-    Fetch conversations due for follow-ups based on real-time evaluation.
-    Buckets:
-    - 10 minutes (1st follow-up)
-    - 180 minutes / 3 hours (2nd follow-up)
-    - 360 minutes / 6 hours (3rd follow-up)
+    Fetch conversations whose materialized follow-up is due, grouped by org.
+
+    Read-only view; schedulers use the claim endpoint below. next_followup_at /
+    next_followup_stage are kept current by server/services/followup_schedule.py,
+    so this is one range scan over the partial due index (oldest first) plus one
+    lookup for the orgs involved.
     """
     now = datetime.now(timezone.utc)
+    due = _due_followups_query(db, now, per_org_limit).limit(limit).all()
+    groups = _group_due_followups(db, due)
+    logger.info(f"Found {len(due)} due follow-ups across {len(groups)} orgs")
+    return groups
 
-    # (min_elapsed, max_elapsed, target_stage, eligible_stages)
-    # Buckets based on time since LEAD's LAST MESSAGE (not bot's):
-    # - FOLLOWUP_10M: 10 min ± 2 min tolerance (1st followup)
-    # - FOLLOWUP_3H: 180 min ± 10 min tolerance (2nd followup)
-    # - FOLLOWUP_6H: 360 min ± 20 min tolerance (3rd followup)
-    # - GHOSTED: 1440-2880 min / 24-48h (marks as ghosted after no response)
-    # eligible_stages: stages that are allowed to transition to the target_stage
-    buckets = [
-        (8, 12, ConversationStage.FOLLOWUP_10M, [
-            ConversationStage.GREETING,
-            ConversationStage.QUALIFICATION,
-            ConversationStage.PRICING,
-            ConversationStage.CTA,
-            ConversationStage.FOLLOWUP,
-        ]),
-        (170, 190, ConversationStage.FOLLOWUP_3H, [
-            ConversationStage.FOLLOWUP_10M,
-        ]),
-        (340, 380, ConversationStage.FOLLOWUP_6H, [
-            ConversationStage.FOLLOWUP_3H,
-        ]),
-        (1440, 2880, ConversationStage.GHOSTED, [
-            ConversationStage.FOLLOWUP_6H,
-        ]),
-    ]
 
-    results: list[InternalDueFollowupOut] = []
+@router.post("/conversations/due-followups/claim", response_model=List[InternalDueFollowupGroupOut])
+def claim_due_followups(
+    data: InternalFollowupClaimRequest,
+    db: Session = Depends(get_db),
+    _: None = Depends(require_internal_secret),
+):
+    """
+    Lease due follow-ups to the caller, grouped by org.
+
+    Rows are locked with FOR UPDATE SKIP LOCKED and given a lease expiry and a
+    fresh lease token in the same transaction, so concurrent claimers (several
+    beat instances, overlapping ticks) each get a disjoint set and skip rows
+    whose lease has not expired. A follow-up whose worker dies is handed out
+    again once its lease runs out. Any schedule change clears the lease, and the
+    worker checks its token is still current before sending.
+    """
+    now = datetime.now(timezone.utc)
+    query = _due_followups_query(db, now, data.per_org_limit, unleased=True).limit(data.limit)
+    due = _lease_due_followups(db, query, now, data.lease_seconds)
+    groups = _group_due_followups(db, due)
+    logger.info(f"Claimed {len(due)} due follow-ups across {len(groups)} orgs (lease {data.lease_seconds}s)")
+    return groups
 
-    for min_m, max_m, target_stage, eligible_stages in buckets:
-        start_time = now - timedelta(minutes=max_m)
-        end_time = now - timedelta(minutes=min_m)
 
-        due_convs = (
-            db.query(Conversation, Lead, Organization, WhatsAppIntegration)
-            .join(Lead, Conversation.lead_id == Lead.id)
-            .join(Organization, Conversation.organization_id == Organization.id)
-            .join(
-                WhatsAppIntegration,
-                Organization.id == WhatsAppIntegration.organization_id,
-            )
-            .filter(
-                # Time window anchored to LEAD's last message
-                Conversation.last_user_message_at >= start_time,
-                Conversation.last_user_message_at < end_time,
+@router.post(
+    "/conversations/{conversation_id}/followup/claim",
+    response_model=Optional[InternalDueFollowupGroupOut],
+)
+def claim_conversation_followup(
+    conversation_id: UUID,
+    data: InternalFollowupClaimOneRequest,
+    db: Session = Depends(get_db),
+    _: None = Depends(require_internal_secret),
+):
+    """
+    Lease one conversation's follow-up if it is due and unclaimed.
+
+    Called by the ETA task scheduled when the bot's reply was committed. If the
+    lead replied since (or a human took over) the schedule has moved and this
+    returns null, which is how a pending follow-up gets cancelled.
+    """
+    now = datetime.now(timezone.utc)
+    query = _due_followups_query(db, now, None, unleased=True).filter(Conversation.id == conversation_id)
+    groups = _group_due_followups(db, _lease_due_followups(db, query, now, data.lease_seconds))
+    return groups[0] if groups else None
 
-                # Bot has already responded after lead's last message
-                Conversation.last_user_message_at < Conversation.last_bot_message_at,
 
-                # Bot-only, active conversations
-                Conversation.mode == ConversationMode.BOT,
-                Conversation.needs_human_attention.is_(False),
+@router.put("/conversations/{conversation_id}/followup-draft")
+def store_followup_draft(
+    conversation_id: UUID,
+    data: InternalFollowupDraftIn,
+    db: Session = Depends(get_db),
+    _: None = Depends(require_internal_secret),
+):
+    """
+    Store a pre-generated follow-up for the conversation's pending schedule.
 
-                # Only pick up conversations in eligible stages (prevents duplicates)
-                Conversation.stage.in_(eligible_stages),
+    409 if the schedule moved while it was being drafted (the lead replied, a
+    human took over), so a stale draft is never stored.
+    """
+    conv = db.query(Conversation).filter(Conversation.id == conversation_id).with_for_update().first()
+    if not conv:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    if conv.next_followup_at is None or conv.next_followup_at != data.next_followup_at:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Follow-up schedule changed")
+    conv.followup_draft = data.draft
+    db.commit()
+    return {"status": "stored"}
 
-                # WhatsApp must be connected
-                WhatsAppIntegration.is_connected.is_(True),
-            )
-            .all()
-        )
 
-        for conv, lead, org, integration in due_convs:
-            results.append(
-                InternalDueFollowupOut(
-                    followup_type=target_stage,
-                    conversation=_conversation_to_schema(conv),
-                    lead=_lead_to_schema(lead),
-                    organization_id=org.id,
-                    organization_name=org.name,
-                    access_token=integration.access_token,
-                    phone_number_id=integration.phone_number_id,
-                    version=integration.version,
-                    business_name=org.business_name,
-                    business_description=org.business_description,
-                    flow_prompt=org.flow_prompt,
-                )
-            )
-    logger.info(f"Found {results} due follow-ups")
-    return results
+def _lease_due_followups(db: Session, query, now: datetime, lease_seconds: int) -> list:
+    """Lock the rows (skipping ones another claimer holds), lease them and commit."""
+    due = query.with_for_update(skip_locked=True, of=Conversation).all()
+    lease_until = now + timedelta(seconds=lease_seconds)
+    for conv, _lead in due:
+        conv.followup_lease_until = lease_until
+        conv.followup_lease_token = uuid4()
+    db.commit()
+    return due
+
+
+@router.post("/template-followups/run", response_model=InternalTemplateFollowupRunOut)
+def run_template_followups(
+    data: InternalTemplateFollowupRunRequest,
+    db: Session = Depends(get_db),
+    _: None = Depends(require_internal_secret),
+):
+    """
+    Send one batch of template follow-ups to leads whose 24h window has closed.
+
+    Walks each org's Followup sequence (server/services/template_followups.py);
+    sends are throttled per phone number, so a large batch takes a while.
+    """
+    return template_followups.run_template_followups(db, data.limit, data.per_org_limit)
+
+
+@router.post("/campaigns/advance", response_model=InternalCampaignAdvanceOut)
+def advance_campaigns(
+    data: InternalCampaignAdvanceRequest,
+    db: Session = Depends(get_db),
+    _: None = Depends(require_internal_secret),
+):
+    """
+    Send running campaigns for up to time_budget_seconds.
+
+    Each batch is checkpointed (server/services/campaigns.py), so a run that
+    stops or crashes is resumed by the next call from where it left off.
+    """
+    return campaigns.advance_campaigns(db, data.time_budget_seconds)
 
 
 @router.get("/conversations/{conversation_id}", response_model=InternalConversationOut)
@@ -447,6 +589,7 @@ async def update_conversation(
     for field, value in update_data.items():
         if hasattr(conv, field):
             setattr(conv, field, value)
+    refresh_followup_schedule(conv)
 
     db.commit()
     db.refresh(conv)
@@ -540,6 +683,7 @@ async def store_incoming_message(
     conv.last_message_at = now
     conv.last_user_message_at = now
     conv.followup_count_24h = 0
+    refresh_followup_schedule(conv)
 
     db.commit()
     db.refresh(message)
@@ -585,6 +729,7 @@ async def store_outgoing_message(
     conv.last_message = payload.content
     conv.last_message_at = now
     conv.last_bot_message_at = now
+    refresh_followup_schedule(conv)
 
     db.commit()
     db.refresh(message)
@@ -607,6 +752,24 @@ async def store_outgoing_message(
 # Pipeline Event Endpoints
 # ========================================
 
+@router.post("/messages/statuses", response_model=InternalMessageStatusBatchOut)
+def update_message_statuses(
+    payload: InternalMessageStatusBatch,
+    _: None = Depends(require_internal_secret),
+    db: Session = Depends(get_db),
+):
+    """
+    Apply a batch of WhatsApp status webhooks (sent / delivered / read / failed).
+
+    Matched on external_message_id; statuses only move forward. Ids no message
+    has (the send has not stored its wamid yet) are returned as unmatched.
+    """
+    updated, unmatched = apply_status_updates(
+        db, ((event.external_message_id, event.status) for event in payload.statuses)
+    )
+    return InternalMessageStatusBatchOut(received=len(payload.statuses), updated=updated, unmatched=unmatched)
+
+
 @router.post("/conversation-events", response_model=InternalPipelineEventOut, status_code=201)
 def create_pipeline_event(
     payload: InternalPipelineEventCreate,
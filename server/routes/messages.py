@@ -1,98 +1,26 @@
-import json
 import logging
-from datetime import datetime, timezone
-from typing import Mapping, Tuple, Optional
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 
-import requests
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.sql import func
 
+from server.config import config
 from server.dependencies import get_db, get_auth_context, require_internal_secret
 from server.schemas import MessageOut, AuthContext, ConversationOut
 from server.models import Message, Conversation, WhatsAppIntegration, Lead
 from server.enums import MessageFrom
 from server.services.websocket_events import emit_conversation_updated
+from server.services.followup_schedule import refresh_followup_schedule
+from server.services.graph_client import OutboundMessage, whatsapp_text_payload
+from server.services.outbound_queue import OutboundJob, outbound_dispatcher, release_messages
 from uuid import UUID
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
-# ---------------------------
-# WhatsApp send helpers (merged from send.py)
-# ---------------------------
-def _wa_api_url(version: str, phone_number_id: str) -> str:
-    return f"https://graph.facebook.com/{version}/{phone_number_id}/messages"
-
-
-def _wa_text_payload(recipient: str, text: str) -> str:
-    return json.dumps(
-        {
-            "messaging_product": "whatsapp",
-            "recipient_type": "individual",
-            "to": recipient,
-            "type": "text",
-            "text": {"preview_url": False, "body": text},
-        }
-    )
-
-
-def _send_whatsapp_text(
-    *,
-    to: str,
-    message: str,
-    access_token: str,
-    phone_number_id: str,
-    version: str = "v18.0",
-) -> Tuple[Mapping, int]:
-    """
-    Sends WhatsApp text message using runtime credentials passed in payload.
-    """
-    # Debug logging
-    logger.info(f"[WA Send] to={to}, message_len={len(message) if message else 0}, "
-                f"access_token={'set' if access_token else 'MISSING'}, "
-                f"phone_number_id={phone_number_id or 'MISSING'}")
-    
-    # Validation
-    if not (access_token and phone_number_id and to and message):
-        missing = []
-        if not access_token: missing.append("access_token")
-        if not phone_number_id: missing.append("phone_number_id")
-        if not to: missing.append("to (recipient)")
-        if not message: missing.append("message")
-        logger.error(f"Missing WhatsApp configuration or recipient. Missing: {missing}")
-        return {"status": "error", "message": f"Missing configuration: {', '.join(missing)}"}, 500
-
-    headers = {
-        "Content-type": "application/json",
-        "Authorization": f"Bearer {access_token}",
-    }
-
-    try:
-        resp = requests.post(
-            _wa_api_url(version, phone_number_id),
-            data=_wa_text_payload(to, message),
-            headers=headers,
-            timeout=15,
-        )
-        resp.raise_for_status()
-        return resp.json(), resp.status_code
-
-    except requests.Timeout:
-        logger.error("WhatsApp request timed out")
-        return {"status": "error", "message": "Request timed out"}, 408
-
-    except requests.RequestException as e:
-        logger.error(f"WhatsApp send error: {e}")
-
-        # Return WA response if possible
-        try:
-            return resp.json(), resp.status_code  # type: ignore
-        except Exception:
-            return {"status": "error", "message": "Failed to send message"}, 500
-
-
 # ---------------------------
 # NOTE: We need a schema that includes runtime WA credentials.
 # If you already have MessageCreate, extend it to include these fields.
@@ -139,7 +67,10 @@ async def _send_msg(
     user_id: Optional[UUID] = None
 ):
     """
-    Store -> Send on WhatsApp -> Websocket emission
+    Store -> Queue for WhatsApp delivery -> Websocket emission
+
+    Returns the message with status "sending"; delivery (with retries) happens
+    in the outbound queue, which updates the status when it is done.
     """
 
     # 0) Validate required payload fields (runtime creds)
@@ -210,6 +141,8 @@ async def _send_msg(
 
     # Update conversation last message fields
     now = datetime.now(timezone.utc)
+    # This process delivers it; the outbox poller takes over if it never does
+    db_message.send_lease_until = now + timedelta(seconds=config.OUTBOUND_LEASE_SECONDS)
     conv.last_message = content[:500]
     conv.last_message_at = now
     if sender_type == MessageFrom.BOT:
@@ -217,38 +150,33 @@ async def _send_msg(
     elif sender_type == MessageFrom.HUMAN:
         # For simplicity, we can also treat HUMAN replies as bot replies for follow-up purposes
         conv.last_bot_message_at = now
+    refresh_followup_schedule(conv)
 
     db.commit()
     db.refresh(db_message)
 
-    # 3) Send on WhatsApp
-    wa_resp, wa_status = _send_whatsapp_text(
-        to=recipient_phone,
-        message=content,
-        access_token=access_token,
-        phone_number_id=phone_number_id,
-        version=version,
-    )
-
-    if 200 <= wa_status < 300:
-        db_message.status = "sent"
-
-        # Optional: store WA message id if your model supports it
+    # 3) Hand off to the outbound queue; it sets sent/failed and emits the update
+    try:
+        outbound_dispatcher.enqueue(OutboundJob(
+            message_id=db_message.id,
+            organization_id=organization_id,
+            conversation_id=conv.id,
+            message=OutboundMessage(
+                phone_number_id=phone_number_id,
+                access_token=access_token,
+                version=version,
+                payload=whatsapp_text_payload(recipient_phone, content),
+            ),
+        ))
+    except Exception as e:
+        # The message is stored; leave it to the outbox poller rather than fail the request
+        logger.error(f"Failed to queue message {db_message.id}, leaving it to the outbox: {e}")
         try:
-            wa_msg_id = wa_resp.get("messages", [{}])[0].get("id")
-            if wa_msg_id and hasattr(db_message, "external_message_id"):
-                db_message.external_message_id = wa_msg_id
-        except Exception:
-            pass
-    else:
-        db_message.status = "failed"
-        if hasattr(db_message, "error"):
-            db_message.error = json.dumps(wa_resp)
-
-    db.commit()
-    db.refresh(db_message)
+            release_messages([db_message.id])
+        except Exception as release_error:
+            logger.error(f"Failed to release message {db_message.id}: {release_error}")
 
-    # 4) Emit websocket event (before potential raise)
+    # 4) Emit websocket event (message shown as "sending")
     try:
         conv_out = ConversationOut.model_validate(conv, from_attributes=True)
         msg_out = MessageOut.model_validate(db_message, from_attributes=True)
@@ -256,14 +184,4 @@ async def _send_msg(
     except Exception as e:
         logger.error(f"Failed to emit websocket event: {e}")
 
-    if not (200 <= wa_status < 300):
-        raise HTTPException(
-            status_code=502,
-            detail={
-                "message": "WhatsApp send failed",
-                "wa_status": wa_status,
-                "wa_response": wa_resp,
-            },
-        )
-
-    return db_message
\ No newline at end of file
+    return db_message
@@ -43,6 +43,8 @@ def update_organisation(
         org.flow_prompt = update_data["flow_prompt"]
     if "name" in update_data:
         org.name = update_data["name"]
+    if "llm_settings" in update_data:
+        org.llm_settings = update_data["llm_settings"]
     
     try:
         db.commit()
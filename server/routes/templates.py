@@ -8,11 +8,11 @@ from server.schemas import TemplateCreate, TemplateUpdate, TemplateOut, Template
 from server.enums import TemplateStatus
 from uuid import UUID
 from datetime import datetime
-import requests
+from server.services.graph_client import graph_client
 
 router = APIRouter()
 
-META_BASE_URL = "https://graph.facebook.com/v19.0"
+META_API_VERSION = "v19.0"
 
 def submit_template_to_meta(
     *,
@@ -20,14 +20,10 @@ def submit_template_to_meta(
     access_token: str,
     payload: dict
 ):
-    url = f"{META_BASE_URL}/{waba_id}/message_templates"
-
-    response = requests.post(
-        url,
-        headers={
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json"
-        },
+    response = graph_client.call_from_thread(
+        "POST",
+        f"/{META_API_VERSION}/{waba_id}/message_templates",
+        access_token,
         json=payload,
         timeout=10
     )
@@ -49,11 +45,10 @@ def fetch_template_status_from_meta(
     template_name: str,
     access_token: str
 ):
-    url = f"{META_BASE_URL}/message_templates"
-
-    response = requests.get(
-        url,
-        headers={"Authorization": f"Bearer {access_token}"},
+    response = graph_client.call_from_thread(
+        "GET",
+        f"/{META_API_VERSION}/message_templates",
+        access_token,
         params={"name": template_name},
         timeout=10
     )
@@ -9,6 +9,7 @@ from server.enums import (
     UserSentiment,
     TemplateStatus,
     MessageFrom,
+    CampaignStatus,
 )
 from pydantic import EmailStr
 
@@ -122,6 +123,7 @@ class OrganizationOut(BaseModel):
     business_name: Optional[str] = None
     business_description: Optional[str] = None
     flow_prompt: Optional[str] = None
+    llm_settings: Optional[Dict[str, Dict[str, Any]]] = None
     is_active: bool
     created_at: datetime
     updated_at: Optional[datetime]
@@ -133,6 +135,8 @@ class OrganizationUpdate(BaseModel):
     business_name: Optional[str] = None
     business_description: Optional[str] = None
     flow_prompt: Optional[str] = None
+    # Per-step LLM overrides, keyed by "default" or step name (eyes/brain/mouth/memory)
+    llm_settings: Optional[Dict[str, Dict[str, Any]]] = None
 
 
 class UserOut(BaseModel):
@@ -198,7 +202,7 @@ class MessageOut(BaseModel):
     assigned_user_id: Optional[UUID]
 
     content: str
-    status: Literal["sent", "delivered", "read", "failed", "received"]
+    status: Literal["sending", "sent", "delivered", "read", "failed", "received"]
     created_at: datetime
 
 
@@ -282,6 +286,42 @@ class FollowupOut(BaseModel):
     updated_at: Optional[datetime]
 
 
+# ======================================================
+# Campaigns
+# ======================================================
+
+class CampaignAudience(BaseModel):
+    """Lead filter; empty fields match every lead of the org."""
+    stages: Optional[List[ConversationStage]] = None
+    intent_levels: Optional[List[IntentLevel]] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    lead_ids: Optional[List[UUID]] = None
+
+
+class CampaignCreate(BaseModel):
+    name: str
+    template_id: UUID
+    audience: CampaignAudience = Field(default_factory=CampaignAudience)
+
+
+class CampaignOut(BaseModel):
+    id: UUID
+    organization_id: UUID
+    template_id: UUID
+    name: str
+    audience: Dict[str, Any]
+    status: CampaignStatus
+    total_recipients: int
+    sent_count: int
+    failed_count: int
+    skipped_count: int
+    started_at: Optional[datetime]
+    completed_at: Optional[datetime]
+    created_at: datetime
+    updated_at: Optional[datetime]
+
+
 # --------------------
 # Leads
 # --------------------
@@ -428,6 +468,7 @@ class InternalIntegrationWithOrgOut(BaseModel):
     business_name: Optional[str] = None
     business_description: Optional[str] = None
     flow_prompt: Optional[str] = None
+    llm_settings: Optional[Dict[str, Dict[str, Any]]] = None
 
 
 class InternalLeadCreate(BaseModel):
@@ -471,6 +512,7 @@ class InternalConversationOut(BaseModel):
     user_sentiment: Optional[UserSentiment]
     needs_human_attention: bool = False
     rolling_summary: Optional[str]
+    memory_segments: Optional[List[Dict[str, Any]]] = None
     last_message: Optional[str]
     last_message_at: Optional[datetime]
     last_user_message_at: Optional[datetime]
@@ -478,6 +520,11 @@ class InternalConversationOut(BaseModel):
     followup_count_24h: int
     total_nudges: int
     scheduled_followup_at: Optional[datetime]
+    next_followup_at: Optional[datetime] = None
+    next_followup_stage: Optional[ConversationStage] = None
+    followup_lease_until: Optional[datetime] = None
+    followup_lease_token: Optional[UUID] = None
+    followup_draft: Optional[Dict[str, Any]] = None
     created_at: datetime
     updated_at: Optional[datetime]
 
@@ -490,6 +537,7 @@ class InternalConversationUpdate(BaseModel):
     user_sentiment: Optional[UserSentiment] = None
     needs_human_attention: Optional[bool] = None
     rolling_summary: Optional[str] = None
+    memory_segments: Optional[List[Dict[str, Any]]] = None
     last_message: Optional[str] = None
     followup_count_24h: Optional[int] = None
     total_nudges: Optional[int] = None
@@ -532,11 +580,34 @@ class InternalMessageOut(BaseModel):
     created_at: datetime
 
 
-class InternalDueFollowupOut(BaseModel):
-    """Details for a conversation that is due for a followup."""
-    followup_type: ConversationStage  # FOLLOWUP_10M, FOLLOWUP_3H, or FOLLOWUP_6H
+class InternalDueFollowupItem(BaseModel):
+    """A conversation that is due for a followup."""
+    followup_type: ConversationStage  # FOLLOWUP_10M, FOLLOWUP_3H, FOLLOWUP_6H or GHOSTED
     conversation: InternalConversationOut
     lead: InternalLeadOut
+    lease_token: Optional[UUID] = None  # Set when claimed; the worker checks it is still current
+
+
+class InternalFollowupClaimRequest(BaseModel):
+    """Lease due followups so parallel schedulers never hand out the same one."""
+    limit: int = Field(default=500, ge=1, le=5000)
+    per_org_limit: Optional[int] = Field(default=None, ge=1)
+    lease_seconds: int = Field(default=900, ge=30, le=3600)
+
+
+class InternalFollowupDraftIn(BaseModel):
+    """Pre-generated follow-up, stored only while the schedule it was drafted for is current."""
+    next_followup_at: datetime
+    draft: Dict[str, Any]
+
+
+class InternalFollowupClaimOneRequest(BaseModel):
+    """Lease one conversation's follow-up (ETA task firing); nothing is returned if it is not due."""
+    lease_seconds: int = Field(default=900, ge=30, le=3600)
+
+
+class InternalDueFollowupGroupOut(BaseModel):
+    """Due followups for one organization; org and WhatsApp config sent once per group."""
     organization_id: UUID
     organization_name: str
     access_token: str
@@ -546,6 +617,48 @@ class InternalDueFollowupOut(BaseModel):
     business_name: Optional[str] = None
     business_description: Optional[str] = None
     flow_prompt: Optional[str] = None
+    llm_settings: Optional[Dict[str, Dict[str, Any]]] = None
+    followups: List[InternalDueFollowupItem]
+
+
+class InternalTemplateFollowupRunRequest(BaseModel):
+    """One batch of template follow-ups (leads outside the 24h window)."""
+    limit: int = Field(default=200, ge=1, le=5000)
+    per_org_limit: int = Field(default=100, ge=1)
+
+
+class InternalTemplateFollowupRunOut(BaseModel):
+    claimed: int
+    sent: int
+    failed: int
+
+
+class InternalCampaignAdvanceRequest(BaseModel):
+    """Send running campaigns for up to time_budget_seconds (whole batches)."""
+    time_budget_seconds: int = Field(default=50, ge=1, le=600)
+
+
+class InternalCampaignAdvanceOut(BaseModel):
+    campaigns: int
+    sent: int
+    failed: int
+    skipped: int
+
+
+class InternalMessageStatusIn(BaseModel):
+    """A WhatsApp status webhook event for one of our sends."""
+    external_message_id: str
+    status: Literal["sent", "delivered", "read", "failed"]
+
+
+class InternalMessageStatusBatch(BaseModel):
+    statuses: List[InternalMessageStatusIn] = Field(..., max_length=5000)
+
+
+class InternalMessageStatusBatchOut(BaseModel):
+    received: int
+    updated: int
+    unmatched: List[str] = []  # external_message_ids no message has (yet)
 
 
 class InternalPipelineEventCreate(BaseModel):
@@ -0,0 +1,176 @@
+"""
+Throttled Bulk WhatsApp Sender.
+
+Meta limits throughput per business phone number, so bulk sends (template
+follow-ups, campaigns) go through one token bucket per phone_number_id and a
+bounded number of concurrent requests on the shared Graph client: each number
+sends as fast as its rate allows, numbers do not slow each other down, and
+429 / throughput errors are retried after a pause instead of failing the
+message. Network errors are retried only if the request never went out
+(graph_client.UNSENT_ERRORS); after a read timeout or a dropped connection
+Meta may already have the message, so it fails instead (sent at most once).
+
+Buckets live in the process; with several server processes, divide the rate
+(or use SharedTokenBucket, which keeps one bucket per number in Redis).
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+import anyio
+
+from server.config import config
+from server.services.graph_client import OutboundMessage, SendResult, graph_client, is_throttled
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+THROTTLED_BACKOFF_SECONDS = 2.0
+
+
+class TokenBucket:
+    """Token bucket: acquire() waits until a send is allowed."""
+
+    def __init__(self, rate_per_second: float, burst: Optional[float] = None) -> None:
+        self.rate = rate_per_second
+        self.capacity = burst if burst is not None else max(rate_per_second, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """Take a token if one is available (returns 0), else the seconds to wait before retrying."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    async def acquire(self) -> None:
+        while True:
+            wait = self.try_acquire()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Drain the bucket so every sender on this number backs off (after a 429)."""
+        with self._lock:
+            self._tokens = min(self._tokens, 1 - seconds * self.rate)
+
+
+# TokenBucket.try_acquire (ARGV[4] = 1) and pause (ARGV[4] = 0, ARGV[5] = seconds), atomically in Redis
+_REDIS_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if ARGV[4] == '1' then
+    if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+else
+    tokens = math.min(tokens, 1 - tonumber(ARGV[5]) * rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], 3600)
+return tostring(wait)
+"""
+
+
+class SharedTokenBucket(TokenBucket):
+    """TokenBucket kept in Redis, so every server process draws on one budget. Local on Redis errors."""
+
+    def __init__(self, redis_client, key: str, rate_per_second: float, burst: Optional[float] = None) -> None:
+        super().__init__(rate_per_second, burst)
+        self.key = key
+        self._script = redis_client.register_script(_REDIS_BUCKET)
+
+    def _call(self, take: bool, seconds: float = 0.0) -> float:
+        return float(self._script(
+            keys=[self.key], args=[self.capacity, self.rate, time.time(), "1" if take else "0", seconds]
+        ))
+
+    def try_acquire(self) -> float:
+        try:
+            return self._call(True)
+        except Exception as e:
+            logger.warning(f"Shared send bucket unavailable, using local bucket: {e}")
+            return super().try_acquire()
+
+    async def acquire(self) -> None:
+        while True:
+            wait = await asyncio.to_thread(self.try_acquire)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        try:
+            self._call(False, seconds)
+        except Exception:
+            super().pause(seconds)
+
+
+class BulkSender:
+    def __init__(self, rate_per_second: float, concurrency: int) -> None:
+        self.rate_per_second = rate_per_second
+        self.concurrency = concurrency
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, phone_number_id: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(phone_number_id)
+            if bucket is None:
+                bucket = self._buckets[phone_number_id] = TokenBucket(self.rate_per_second)
+            return bucket
+
+    async def send_all(self, messages: List[OutboundMessage]) -> List[SendResult]:
+        """Send every message (throttled per number); results are in input order."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def send_one(message: OutboundMessage) -> SendResult:
+            async with semaphore:
+                return await self.send(message)
+
+        return list(await asyncio.gather(*(send_one(message) for message in messages)))
+
+    def send_all_from_thread(self, messages: List[OutboundMessage]) -> List[SendResult]:
+        """send_all() for the sync services, which run in the API's worker threads."""
+        if not messages:
+            return []
+        return anyio.from_thread.run(self.send_all, messages)
+
+    async def send(self, message: OutboundMessage) -> SendResult:
+        bucket = self._bucket(message.phone_number_id)
+        result = SendResult(ok=False, status_code=0)
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            await bucket.acquire()
+            result = await graph_client.send_message(message)
+            if result.ok:
+                return result
+            if result.unsent:
+                logger.warning(f"[Bulk Send] {message.phone_number_id} attempt {attempt} failed: {result.response}")
+                continue
+            if not is_throttled(result):
+                return result
+
+            backoff = result.retry_after or THROTTLED_BACKOFF_SECONDS * attempt
+            logger.warning(f"[Bulk Send] {message.phone_number_id} throttled, backing off {backoff:.1f}s")
+            bucket.pause(backoff)
+        return result
+
+
+# Module-level singleton (buckets are shared by every run in this process)
+bulk_sender = BulkSender(
+    rate_per_second=config.TEMPLATE_SEND_RATE_PER_SECOND,
+    concurrency=config.TEMPLATE_SEND_CONCURRENCY,
+)
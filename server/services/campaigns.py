@@ -0,0 +1,280 @@
+"""
+Bulk Outbound Campaigns.
+
+A campaign sends one approved template to every lead matching its audience
+(a lead filter, schemas.CampaignAudience). Runs walk the audience in lead id
+order, one batch at a time:
+
+    1. write a "sending" Message per recipient (campaign_id set) and commit
+    2. send the batch through the throttled bulk sender
+    3. mark the messages sent / failed, add to the counters and move the
+       cursor past the batch, all in one commit (the checkpoint)
+
+A run holds the campaign with a lease (claimed FOR UPDATE SKIP LOCKED), so
+only one run sends a campaign at a time. If a run dies, the next one resumes
+from the cursor once the lease has expired: "sending" rows left behind are
+marked failed rather than sent again (at most once per lead), and leads that
+already have a message for the campaign are passed over.
+
+Business-initiated sends count against the number's Meta messaging tier
+(WhatsAppIntegration.messaging_limit per rolling 24h, shared with template
+follow-ups: template_followups.tier_remaining); a campaign that has used up
+the tier waits for a later run.
+"""
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set
+from uuid import UUID
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Query, Session
+
+from server.config import config
+from server.enums import (
+    CampaignStatus, ConversationMode, ConversationStage, IntentLevel, MessageFrom,
+    TemplateStatus, UserSentiment,
+)
+from server.models import (
+    Campaign, Conversation, Lead, Message, Organization, Template, WhatsAppIntegration,
+)
+from server.schemas import CampaignAudience
+from server.services.bulk_sender import bulk_sender
+from server.services.graph_client import OutboundMessage, whatsapp_template_payload
+from server.services.template_followups import render_template, tier_remaining
+
+logger = logging.getLogger(__name__)
+
+
+# ========================================
+# Audience
+# ========================================
+
+def audience_query(db: Session, organization_id: UUID, audience: Dict) -> Query:
+    """Leads of the org matching the campaign's audience filter."""
+    spec = CampaignAudience.model_validate(audience or {})
+    query = db.query(Lead).filter(Lead.organization_id == organization_id)
+    if spec.stages:
+        query = query.filter(Lead.conversation_stage.in_(spec.stages))
+    if spec.intent_levels:
+        query = query.filter(Lead.intent_level.in_(spec.intent_levels))
+    if spec.created_after:
+        query = query.filter(Lead.created_at >= spec.created_after)
+    if spec.created_before:
+        query = query.filter(Lead.created_at < spec.created_before)
+    if spec.lead_ids:
+        query = query.filter(Lead.id.in_(spec.lead_ids))
+    return query
+
+
+def count_audience(db: Session, campaign: Campaign) -> int:
+    return audience_query(db, campaign.organization_id, campaign.audience).count()
+
+
+# ========================================
+# Runs
+# ========================================
+
+def _claim_next_campaign(db: Session, exclude: Set[UUID]) -> Optional[Campaign]:
+    """Lease one running campaign that no other run holds (committed)."""
+    now = datetime.now(timezone.utc)
+    query = db.query(Campaign).filter(
+        Campaign.status == CampaignStatus.RUNNING,
+        or_(Campaign.lease_until.is_(None), Campaign.lease_until < now),
+    )
+    if exclude:
+        query = query.filter(Campaign.id.notin_(exclude))
+    campaign = (
+        query.order_by(Campaign.started_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if campaign is None:
+        return None
+    campaign.lease_until = now + timedelta(seconds=config.CAMPAIGN_LEASE_SECONDS)
+    db.commit()
+    return campaign
+
+
+def _recover_in_flight(db: Session, campaign: Campaign) -> None:
+    """Fail the "sending" rows of a run that died between write-ahead and checkpoint."""
+    stranded = (
+        db.query(Message)
+        .filter(Message.campaign_id == campaign.id, Message.status == "sending")
+        .update({"status": "failed"}, synchronize_session=False)
+    )
+    if stranded:
+        # The Graph call may or may not have gone out; never risk a second copy
+        logger.warning(f"Campaign {campaign.id}: {stranded} in-flight sends from a crashed run marked failed")
+        campaign.failed_count += stranded
+    db.commit()
+
+
+def _conversations_for(db: Session, organization_id: UUID, lead_ids: List[UUID]) -> Dict[UUID, Conversation]:
+    """Latest conversation per lead."""
+    conversations: Dict[UUID, Conversation] = {}
+    for conv in (
+        db.query(Conversation)
+        .filter(Conversation.lead_id.in_(lead_ids))
+        .order_by(Conversation.created_at)
+    ):
+        conversations[conv.lead_id] = conv
+    for lead_id in lead_ids:
+        if lead_id not in conversations:
+            conv = Conversation(
+                organization_id=organization_id,
+                lead_id=lead_id,
+                stage=ConversationStage.GREETING,
+                mode=ConversationMode.BOT,
+                intent_level=IntentLevel.UNKNOWN,
+                user_sentiment=UserSentiment.NEUTRAL,
+                rolling_summary="",
+                followup_count_24h=0,
+                total_nudges=0,
+            )
+            db.add(conv)
+            conversations[lead_id] = conv
+    db.flush()
+    return conversations
+
+
+def _send_batch(db: Session, campaign: Campaign) -> Optional[Dict[str, int]]:
+    """Send the next batch and checkpoint it. None once there is nothing to do this run."""
+    db.refresh(campaign)
+    if campaign.status != CampaignStatus.RUNNING:
+        return None  # Paused from the dashboard
+
+    now = datetime.now(timezone.utc)
+    org = db.get(Organization, campaign.organization_id)
+    template = db.get(Template, campaign.template_id)
+    integration = (
+        db.query(WhatsAppIntegration)
+        .filter(
+            WhatsAppIntegration.organization_id == campaign.organization_id,
+            WhatsAppIntegration.is_connected.is_(True),
+        )
+        .first()
+    )
+    if integration is None or template is None or template.status != TemplateStatus.APPROVED:
+        logger.warning(f"Campaign {campaign.id}: no connected number or approved template, waiting")
+        return None
+
+    limit = min(config.CAMPAIGN_BATCH_SIZE, tier_remaining(db, integration, now))
+    if limit <= 0:
+        logger.info(f"Campaign {campaign.id}: messaging tier used up for the last 24h, waiting")
+        return None
+
+    query = audience_query(db, campaign.organization_id, campaign.audience)
+    if campaign.cursor_lead_id is not None:
+        query = query.filter(Lead.id > campaign.cursor_lead_id)
+    leads = query.order_by(Lead.id).limit(limit).all()
+    if not leads:
+        campaign.status = CampaignStatus.COMPLETED
+        campaign.completed_at = now
+        campaign.lease_until = None
+        db.commit()
+        logger.info(
+            f"Campaign {campaign.id} completed: {campaign.sent_count} sent, "
+            f"{campaign.failed_count} failed, {campaign.skipped_count} skipped"
+        )
+        return None
+
+    lead_ids = [lead.id for lead in leads]
+    # Recipients of a crashed run (already counted when their rows were recovered)
+    already_sent = {
+        lead_id
+        for (lead_id,) in db.query(Message.lead_id).filter(
+            Message.campaign_id == campaign.id, Message.lead_id.in_(lead_ids)
+        )
+    }
+    recipients = [lead for lead in leads if lead.id not in already_sent and (lead.phone or "").strip()]
+    skipped = sum(1 for lead in leads if lead.id not in already_sent and not (lead.phone or "").strip())
+    conversations = _conversations_for(db, campaign.organization_id, [lead.id for lead in recipients])
+
+    # Write-ahead: the rows exist before anything is sent
+    pending = []
+    for lead in recipients:
+        components, text = render_template(template, lead, org)
+        conv = conversations[lead.id]
+        message_id = uuid.uuid4()
+        db.add(Message(
+            id=message_id,
+            organization_id=campaign.organization_id,
+            conversation_id=conv.id,
+            lead_id=lead.id,
+            content=text,
+            message_from=MessageFrom.BOT,
+            status="sending",
+            campaign_id=campaign.id,
+            is_template=True,
+        ))
+        pending.append((message_id, conv.id, text, OutboundMessage(
+            phone_number_id=integration.phone_number_id,
+            access_token=integration.access_token,
+            version=integration.version or "v18.0",
+            payload=whatsapp_template_payload(lead.phone, template.name, template.language or "en_US", components),
+        )))
+    campaign.lease_until = now + timedelta(seconds=config.CAMPAIGN_LEASE_SECONDS)
+    db.commit()
+
+    results = bulk_sender.send_all_from_thread([outbound for _, _, _, outbound in pending])
+
+    # Checkpoint: statuses, counters and cursor move together
+    now = datetime.now(timezone.utc)
+    sent_ids = [message_id for (message_id, _, _, _), result in zip(pending, results) if result.ok]
+    failed_ids = [message_id for (message_id, _, _, _), result in zip(pending, results) if not result.ok]
+    db.bulk_update_mappings(Message, [
+        {
+            "id": message_id,
+            "status": "sent" if result.ok else "failed",
+            "external_message_id": result.external_message_id,
+        }
+        for (message_id, _, _, _), result in zip(pending, results)
+    ])
+    texts = {conv_id: text for (_, conv_id, text, _), result in zip(pending, results) if result.ok}
+    if texts:
+        for conv in db.query(Conversation).filter(Conversation.id.in_(list(texts))):
+            # Inbox preview only: a campaign is not a reply, so last_bot_message_at
+            # (and with it the follow-up ladder) is left alone
+            conv.last_message = texts[conv.id][:500]
+            conv.last_message_at = now
+    campaign.sent_count += len(sent_ids)
+    campaign.failed_count += len(failed_ids)
+    campaign.skipped_count += skipped
+    campaign.cursor_lead_id = leads[-1].id
+    db.commit()
+
+    for (_, conv_id, _, _), result in zip(pending, results):
+        if not result.ok:
+            logger.warning(f"Campaign {campaign.id}: send to {conv_id} failed: {result.status_code} {result.response}")
+    return {"sent": len(sent_ids), "failed": len(failed_ids), "skipped": skipped}
+
+
+def advance_campaigns(db: Session, time_budget_seconds: float) -> Dict[str, int]:
+    """Send running campaigns batch by batch until the time budget is spent."""
+    deadline = time.monotonic() + time_budget_seconds
+    totals = {"campaigns": 0, "sent": 0, "failed": 0, "skipped": 0}
+    seen: Set[UUID] = set()
+    while time.monotonic() < deadline:
+        campaign = _claim_next_campaign(db, seen)
+        if campaign is None:
+            break
+        seen.add(campaign.id)
+        totals["campaigns"] += 1
+        try:
+            _recover_in_flight(db, campaign)
+            while time.monotonic() < deadline:
+                counts = _send_batch(db, campaign)
+                if counts is None:
+                    break
+                for key, value in counts.items():
+                    totals[key] += value
+        finally:
+            db.rollback()
+            campaign.lease_until = None
+            db.commit()
+    if totals["campaigns"]:
+        logger.info(f"Campaign run: {totals}")
+    return totals
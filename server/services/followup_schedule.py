@@ -0,0 +1,128 @@
+"""
+Materialized Follow-up Schedule.
+
+Each conversation stores when its next automatic follow-up is due
+(next_followup_at) and which stage that follow-up moves it to
+(next_followup_stage). Both are recomputed whenever a message is written or
+the conversation state changes, so finding due follow-ups is a single range
+scan over a partial index that only contains scheduled rows.
+
+The first nudge after a reply honours the Brain's timing when it asked for
+one (scheduled_followup_at, from BrainOutput.followup_in_minutes); later
+nudges follow the fixed ladder below, each timed from the previous nudge
+(last_bot_message_at), so a late nudge pushes the rest of the ladder back
+instead of bunching them up.
+
+Nudges are free-form messages and only allowed inside the 24h WhatsApp window
+after the lead's last message. A nudge that would fall outside it is not
+scheduled; reactivation is left to the template sequence
+(server/services/template_followups.py).
+
+Schedulers lease due rows before working on them (followup_lease_until /
+followup_lease_token). Moving the schedule drops the lease, which tells a
+worker still holding the old token that its follow-up is no longer wanted,
+and the pre-generated draft (followup_draft), which was written for it.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from server.enums import ConversationMode, ConversationStage
+from server.models import Conversation
+
+logger = logging.getLogger(__name__)
+
+
+WHATSAPP_WINDOW = timedelta(hours=24)
+
+# (delay, target stage, stages that may move to it). The first rung's delay runs
+# from the lead's last message, every later one from the previous nudge.
+FOLLOWUP_RULES = [
+    (timedelta(minutes=10), ConversationStage.FOLLOWUP_10M, (
+        ConversationStage.GREETING,
+        ConversationStage.QUALIFICATION,
+        ConversationStage.PRICING,
+        ConversationStage.CTA,
+        ConversationStage.FOLLOWUP,
+    )),
+    (timedelta(minutes=170), ConversationStage.FOLLOWUP_3H, (ConversationStage.FOLLOWUP_10M,)),
+    (timedelta(minutes=180), ConversationStage.FOLLOWUP_6H, (ConversationStage.FOLLOWUP_3H,)),
+    # No reply after the last nudge: close out as ghosted (no message sent, so
+    # not bound to the window)
+    (timedelta(minutes=1080), ConversationStage.GHOSTED, (ConversationStage.FOLLOWUP_6H,)),
+]
+
+
+def compute_next_followup(conv: Conversation) -> Tuple[Optional[datetime], Optional[ConversationStage]]:
+    """When the next follow-up is due and its target stage, or (None, None)."""
+    if conv.mode != ConversationMode.BOT or conv.needs_human_attention:
+        return None, None
+    if conv.last_user_message_at is None or conv.last_bot_message_at is None:
+        return None, None
+    # Only nudge once the bot has answered the lead's last message
+    if conv.last_bot_message_at <= conv.last_user_message_at:
+        return None, None
+
+    for delay, target_stage, eligible_stages in FOLLOWUP_RULES:
+        if conv.stage not in eligible_stages:
+            continue
+        if target_stage == ConversationStage.GHOSTED:
+            return conv.last_bot_message_at + delay, target_stage
+
+        if target_stage != ConversationStage.FOLLOWUP_10M:
+            due_at = conv.last_bot_message_at + delay
+        elif _brain_timed(conv):
+            due_at = conv.scheduled_followup_at
+        else:
+            due_at = conv.last_user_message_at + delay
+        if due_at >= conv.last_user_message_at + WHATSAPP_WINDOW:
+            return None, None  # Window closed by then: template follow-ups take over
+        return due_at, target_stage
+    return None, None
+
+
+def _brain_timed(conv: Conversation) -> bool:
+    """True if the Brain picked a follow-up time during the current silence."""
+    return (
+        conv.scheduled_followup_at is not None
+        and conv.scheduled_followup_at > conv.last_user_message_at
+    )
+
+
+def refresh_followup_schedule(conv: Conversation) -> None:
+    """Recompute the conversation's follow-up schedule (caller commits)."""
+    next_at, next_stage = compute_next_followup(conv)
+    if next_at != conv.next_followup_at or next_stage != conv.next_followup_stage:
+        conv.followup_lease_until = None
+        conv.followup_lease_token = None
+        conv.followup_draft = None
+    conv.next_followup_at, conv.next_followup_stage = next_at, next_stage
+
+
+def backfill_followup_schedule(db: Session, batch_size: int = 1000) -> int:
+    """
+    Compute the schedule for existing conversations still inside the 24h
+    window (nothing older can get a nudge). Returns rows updated.
+    """
+    window_start = datetime.now(timezone.utc) - WHATSAPP_WINDOW
+    updated = 0
+    last_id = None
+    while True:
+        query = (
+            db.query(Conversation)
+            .filter(Conversation.last_user_message_at > window_start)
+            .order_by(Conversation.id)
+        )
+        if last_id is not None:
+            query = query.filter(Conversation.id > last_id)
+        batch = query.limit(batch_size).all()
+        if not batch:
+            return updated
+        for conv in batch:
+            refresh_followup_schedule(conv)
+        db.commit()
+        updated += len(batch)
+        last_id = batch[-1].id
+        logger.info(f"Follow-up schedule backfill: {updated} conversations")
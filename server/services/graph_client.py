@@ -0,0 +1,171 @@
+"""
+Meta Graph API Client.
+
+Every call the server makes to graph.facebook.com goes through one shared
+httpx.AsyncClient: connections are kept alive and pooled (HTTP/2 multiplexes
+concurrent sends over a single TLS connection), and each call has explicit
+timeouts. Sends run on the event loop without blocking other requests or
+WebSocket traffic.
+
+Sync code (sync routes and the services they call run in the API's worker
+threads) uses call_from_thread(), which runs the call on the event loop and
+waits for it.
+"""
+import functools
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import anyio
+import httpx
+
+from server.config import config
+
+logger = logging.getLogger(__name__)
+
+GRAPH_BASE_URL = "https://graph.facebook.com"
+# Graph error codes for "too many messages" (per number / per pair of users)
+THROTTLE_ERROR_CODES = {130429, 131056, 80007}
+# Network errors raised before the request left (safe to resend); after any other, Meta may have the message
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+@dataclass
+class OutboundMessage:
+    phone_number_id: str
+    access_token: str
+    version: str
+    payload: Dict[str, Any]  # Graph API message body
+
+
+@dataclass
+class SendResult:
+    ok: bool
+    status_code: int
+    response: Dict[str, Any] = field(default_factory=dict)
+    retry_after: Optional[float] = None  # Seconds, from Meta's Retry-After header
+    unsent: bool = False  # Network error before the request went out (status_code 0)
+
+    @property
+    def external_message_id(self) -> Optional[str]:
+        try:
+            return self.response.get("messages", [{}])[0].get("id")
+        except (AttributeError, IndexError):
+            return None
+
+
+def whatsapp_text_payload(to: str, text: str) -> Dict[str, Any]:
+    return {
+        "messaging_product": "whatsapp",
+        "recipient_type": "individual",
+        "to": to,
+        "type": "text",
+        "text": {"preview_url": False, "body": text},
+    }
+
+
+def whatsapp_template_payload(
+    to: str, template_name: str, language: str, components: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    template: Dict[str, Any] = {"name": template_name, "language": {"code": language}}
+    if components:
+        template["components"] = components
+    return {
+        "messaging_product": "whatsapp",
+        "recipient_type": "individual",
+        "to": to,
+        "type": "template",
+        "template": template,
+    }
+
+
+def is_throttled(result: SendResult) -> bool:
+    """429, or one of Meta's throughput error codes."""
+    if result.status_code == 429:
+        return True
+    error = result.response.get("error") if isinstance(result.response, dict) else None
+    return isinstance(error, dict) and error.get("code") in THROTTLE_ERROR_CODES
+
+
+class GraphClient:
+    def __init__(self, timeout: float, connect_timeout: float, max_connections: int) -> None:
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Created on first use, so it belongs to the app's event loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=GRAPH_BASE_URL,
+                http2=True,
+                timeout=self.timeout,
+                limits=self.limits,
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        access_token: str,
+        *,
+        json: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> httpx.Response:
+        """Graph API call; path is relative to graph.facebook.com and includes the version."""
+        return await self._get_client().request(
+            method,
+            path,
+            json=json,
+            params=params,
+            headers={"Authorization": f"Bearer {access_token}"},
+            timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+        )
+
+    def call_from_thread(self, method: str, path: str, access_token: str, **kwargs) -> httpx.Response:
+        """request() for sync code running in the API's worker threads."""
+        return anyio.from_thread.run(functools.partial(self.request, method, path, access_token, **kwargs))
+
+    async def send_message(self, message: OutboundMessage) -> SendResult:
+        """One WhatsApp send (no retries); network errors come back as status_code 0."""
+        try:
+            resp = await self.request(
+                "POST",
+                f"/{message.version}/{message.phone_number_id}/messages",
+                message.access_token,
+                json=message.payload,
+            )
+        except httpx.HTTPError as e:
+            return SendResult(
+                ok=False,
+                status_code=0,
+                response={"error": str(e) or type(e).__name__},
+                unsent=isinstance(e, UNSENT_ERRORS),
+            )
+
+        try:
+            body = resp.json()
+        except ValueError:
+            body = {"raw": resp.text}
+        retry_after = resp.headers.get("Retry-After")
+        return SendResult(
+            ok=200 <= resp.status_code < 300,
+            status_code=resp.status_code,
+            response=body,
+            retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+        )
+
+
+# Module-level singleton (closed on app shutdown, see server/main.py)
+graph_client = GraphClient(
+    timeout=config.GRAPH_TIMEOUT_SECONDS,
+    connect_timeout=config.GRAPH_CONNECT_TIMEOUT_SECONDS,
+    max_connections=config.GRAPH_MAX_CONNECTIONS,
+)
@@ -0,0 +1,70 @@
+"""
+Message Delivery Statuses.
+
+WhatsApp reports sent / delivered / read / failed for every outbound message
+through status webhooks, matched to our rows on external_message_id (the
+wamid returned by the send). The worker buffers these events and posts them
+in batches; each batch is applied with one UPDATE ... FROM (VALUES ...) per
+chunk instead of a transaction per event.
+
+Webhooks arrive out of order, so a status only ever moves forward
+(STATUS_RANK): a late "delivered" never overwrites "read". A status can also
+beat the send's own commit of the wamid; the ids that matched no message are
+returned so the worker can retry them.
+"""
+import logging
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import Integer, String, case, column, select, update, values
+from sqlalchemy.orm import Session
+
+from server.models import Message
+
+logger = logging.getLogger(__name__)
+
+STATUS_RANK = {"sending": 0, "sent": 1, "failed": 2, "delivered": 3, "read": 4}
+# Rank of statuses outside the ladder (e.g. "received" on inbound messages): never overwritten
+_UNRANKED = len(STATUS_RANK)
+CHUNK_ROWS = 1000
+
+
+def apply_status_updates(db: Session, events: Iterable[Tuple[str, str]]) -> Tuple[int, List[str]]:
+    """Apply (external_message_id, status) events. Returns messages updated and the ids no message has."""
+    latest: Dict[str, str] = {}
+    for external_id, status in events:
+        if status not in STATUS_RANK:
+            continue
+        current = latest.get(external_id)
+        if current is None or STATUS_RANK[status] > STATUS_RANK[current]:
+            latest[external_id] = status
+    if not latest:
+        return 0, []
+
+    rows = [(external_id, status, STATUS_RANK[status]) for external_id, status in latest.items()]
+    current_rank = case(STATUS_RANK, value=Message.status, else_=_UNRANKED)
+    updated = 0
+    unmatched: List[str] = []
+    for start in range(0, len(rows), CHUNK_ROWS):
+        incoming = values(
+            column("external_message_id", String),
+            column("status", String),
+            column("rank", Integer),
+            name="incoming",
+        ).data(rows[start:start + CHUNK_ROWS])
+        result = db.execute(
+            update(Message)
+            .where(
+                Message.external_message_id == incoming.c.external_message_id,
+                current_rank < incoming.c.rank,
+            )
+            .values(status=incoming.c.status)
+            .execution_options(synchronize_session=False)
+        )
+        updated += result.rowcount
+        chunk_ids = [external_id for external_id, _, _ in rows[start:start + CHUNK_ROWS]]
+        known = set(db.scalars(
+            select(Message.external_message_id).where(Message.external_message_id.in_(chunk_ids))
+        ))
+        unmatched.extend(external_id for external_id in chunk_ids if external_id not in known)
+    db.commit()
+    return updated, unmatched
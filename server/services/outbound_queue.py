@@ -0,0 +1,302 @@
+"""
+Outbound Message Queue.
+
+Chat messages (bot replies and human sends) are stored as "sending", handed
+to this queue and returned to the caller straight away; the dispatcher
+delivers them in the background and updates Message.status, pushing the
+change to the inbox over the websocket. Reply latency and Meta's rate limits
+are no longer part of the HTTP request.
+
+    - each phone_number_id has a token bucket (Meta throughput per number),
+      shared by every server process with OUTBOUND_REDIS_URL
+    - 429 / throughput errors, 5xx and network errors are retried with
+      exponential backoff; any other error fails the message at once
+    - a conversation always goes through the same lane, so its messages are
+      delivered in the order they were written
+
+The "sending" chat rows are the outbox. The process that writes a message
+holds it with a lease (Message.send_lease_until) and queues it in memory; every
+process also polls the outbox (claim_outbox, FOR UPDATE SKIP LOCKED) for rows
+nobody holds: ones whose process died or restarted, or that could not be
+queued. Those are rebuilt from the lead's phone and the org's connected number
+and delivered, unless they are older than OUTBOUND_MAX_AGE_SECONDS: a reply
+that late would confuse the lead (or fall outside the 24h window), so it is
+marked failed instead. Delivery is at least once: a process that dies after Meta
+accepted a send but before recording it sends that message again.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import or_
+
+from server.config import config
+from server.database import SessionLocal
+from server.models import Conversation, Lead, Message, WhatsAppIntegration
+from server.schemas import ConversationOut, MessageOut
+from server.services.bulk_sender import SharedTokenBucket, TokenBucket
+from server.services.graph_client import (
+    OutboundMessage, SendResult, graph_client, is_throttled, whatsapp_text_payload,
+)
+from server.services.websocket_events import emit_conversation_updated
+
+logger = logging.getLogger(__name__)
+
+# Jobs a process keeps queued per lane before it stops claiming from the outbox
+CLAIM_PER_LANE = 20
+
+
+@dataclass
+class OutboundJob:
+    message_id: UUID
+    organization_id: UUID
+    conversation_id: UUID
+    message: OutboundMessage
+
+
+def is_transient(result: SendResult) -> bool:
+    """Worth retrying: network error, throttling or a Meta-side failure."""
+    return result.status_code == 0 or result.status_code >= 500 or is_throttled(result)
+
+
+class OutboundDispatcher:
+    def __init__(
+        self,
+        rate_per_second: float,
+        lanes: int,
+        max_attempts: int,
+        backoff_seconds: float,
+        poll_seconds: float,
+        redis_url: Optional[str] = None,
+    ) -> None:
+        self.rate_per_second = rate_per_second
+        self.lanes = lanes
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.poll_seconds = poll_seconds
+        self._redis_url = redis_url
+        self._redis = None
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        """Start the lanes and the outbox poller (on the running event loop)."""
+        if self._tasks:
+            return
+        self._queues = [asyncio.Queue() for _ in range(self.lanes)]
+        self._tasks = [asyncio.create_task(self._run_lane(queue)) for queue in self._queues]
+        self._tasks.append(asyncio.create_task(self._poll_outbox()))
+        logger.info(f"[Outbound] Dispatcher started with {self.lanes} lanes")
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Let queued messages go out (up to timeout), then stop and hand the rest back to the outbox."""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in self._queues)), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"[Outbound] {self.pending} messages still queued at shutdown")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        left = []
+        for queue in self._queues:
+            while not queue.empty():
+                left.append(queue.get_nowait().message_id)
+        if left:
+            await asyncio.to_thread(release_messages, left)
+
+    @property
+    def pending(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+
+    def enqueue(self, job: OutboundJob) -> None:
+        if not self._tasks:
+            raise RuntimeError("Outbound dispatcher is not running")
+        self._queues[job.conversation_id.int % len(self._queues)].put_nowait(job)
+
+    def _redis_client(self):
+        if not self._redis_url:
+            return None
+        if self._redis is None:
+            import redis
+            self._redis = redis.Redis.from_url(self._redis_url, socket_timeout=2)
+        return self._redis
+
+    def _bucket(self, phone_number_id: str) -> TokenBucket:
+        bucket = self._buckets.get(phone_number_id)
+        if bucket is None:
+            redis_client = self._redis_client()
+            if redis_client is not None:
+                bucket = SharedTokenBucket(redis_client, f"outbound:rate:{phone_number_id}", self.rate_per_second)
+            else:
+                bucket = TokenBucket(self.rate_per_second)
+            self._buckets[phone_number_id] = bucket
+        return bucket
+
+    async def _poll_outbox(self) -> None:
+        """Queue outbox rows nobody holds (first pass at startup), without outgrowing the lanes."""
+        while True:
+            room = self.lanes * CLAIM_PER_LANE - self.pending
+            if room > 0:
+                try:
+                    jobs = await asyncio.to_thread(claim_outbox, room)
+                except Exception as e:
+                    logger.error(f"[Outbound] Outbox poll failed: {e}", exc_info=True)
+                    jobs = []
+                for job in jobs:
+                    self.enqueue(job)
+                if jobs:
+                    logger.info(f"[Outbound] Picked up {len(jobs)} messages from the outbox")
+            await asyncio.sleep(self.poll_seconds)
+
+    async def _run_lane(self, queue: asyncio.Queue) -> None:
+        while True:
+            job = await queue.get()
+            try:
+                result = await self._deliver(job)
+                update = await asyncio.to_thread(_record_result, job, result)
+                if update is not None:
+                    await emit_conversation_updated(job.organization_id, *update)
+            except Exception as e:
+                logger.error(f"[Outbound] Message {job.message_id} not recorded: {e}", exc_info=True)
+            finally:
+                queue.task_done()
+
+    async def _deliver(self, job: OutboundJob) -> SendResult:
+        bucket = self._bucket(job.message.phone_number_id)
+        result = SendResult(ok=False, status_code=0)
+        for attempt in range(1, self.max_attempts + 1):
+            await bucket.acquire()
+            result = await graph_client.send_message(job.message)
+            if result.ok or not is_transient(result) or attempt == self.max_attempts:
+                return result
+
+            backoff = result.retry_after or self.backoff_seconds * 2 ** (attempt - 1)
+            if is_throttled(result):
+                bucket.pause(backoff)  # Everything on this number backs off, not just this lane
+            logger.warning(
+                f"[Outbound] Message {job.message_id} attempt {attempt} got {result.status_code}, "
+                f"retrying in {backoff:.1f}s"
+            )
+            await asyncio.sleep(backoff)
+        return result
+
+
+def _record_result(job: OutboundJob, result: SendResult) -> Optional[Tuple[ConversationOut, MessageOut]]:
+    """Store the final status; returns what to push to the inbox."""
+    with SessionLocal() as db:
+        db_message = db.get(Message, job.message_id)
+        if db_message is None:
+            return None
+        db_message.send_lease_until = None
+        if result.ok:
+            db_message.status = "sent"
+            db_message.external_message_id = result.external_message_id
+        else:
+            db_message.status = "failed"
+            logger.warning(
+                f"[Outbound] Message {job.message_id} failed: {result.status_code} {result.response}"
+            )
+        db.commit()
+
+        conv = db.get(Conversation, job.conversation_id)
+        if conv is None:
+            return None
+        return (
+            ConversationOut.model_validate(conv, from_attributes=True),
+            MessageOut.model_validate(db_message, from_attributes=True),
+        )
+
+
+def claim_outbox(limit: int) -> List[OutboundJob]:
+    """Lease up to limit outbox messages no process holds and rebuild their sends (committed)."""
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(seconds=config.OUTBOUND_MAX_AGE_SECONDS)
+    unheld = (
+        Message.status == "sending",
+        Message.campaign_id.is_(None),
+        or_(Message.send_lease_until.is_(None), Message.send_lease_until < now),
+    )
+    with SessionLocal() as db:
+        expired = (
+            db.query(Message)
+            .filter(*unheld, Message.created_at < cutoff)
+            .update({"status": "failed", "send_lease_until": None}, synchronize_session=False)
+        )
+        if expired:
+            db.commit()
+            logger.warning(f"[Outbound] {expired} unsent messages older than the outbox cutoff marked failed")
+        rows = (
+            db.query(Message)
+            .filter(*unheld, Message.created_at >= cutoff)
+            .order_by(Message.created_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        if not rows:
+            return []
+
+        org_ids = {row.organization_id for row in rows}
+        integrations = {
+            integration.organization_id: integration
+            for integration in db.query(WhatsAppIntegration).filter(
+                WhatsAppIntegration.organization_id.in_(org_ids),
+                WhatsAppIntegration.is_connected.is_(True),
+            )
+        }
+        phones = dict(
+            db.query(Lead.id, Lead.phone).filter(Lead.id.in_({row.lead_id for row in rows}))
+        )
+
+        jobs = []
+        for row in rows:
+            integration = integrations.get(row.organization_id)
+            phone = phones.get(row.lead_id)
+            if integration is None or not phone:
+                row.status = "failed"
+                row.send_lease_until = None
+                logger.warning(f"[Outbound] Message {row.id} failed: no connected number or lead phone")
+                continue
+            row.send_lease_until = now + timedelta(seconds=config.OUTBOUND_LEASE_SECONDS)
+            jobs.append(OutboundJob(
+                message_id=row.id,
+                organization_id=row.organization_id,
+                conversation_id=row.conversation_id,
+                message=OutboundMessage(
+                    phone_number_id=integration.phone_number_id,
+                    access_token=integration.access_token,
+                    version=integration.version or "v18.0",
+                    payload=whatsapp_text_payload(phone, row.content),
+                ),
+            ))
+        db.commit()
+        return jobs
+
+
+def release_messages(message_ids: List[UUID]) -> None:
+    """Drop this process's lease on undelivered messages so any process's poller sends them."""
+    with SessionLocal() as db:
+        db.query(Message).filter(
+            Message.id.in_(message_ids), Message.status == "sending"
+        ).update({"send_lease_until": None}, synchronize_session=False)
+        db.commit()
+    logger.info(f"[Outbound] Released {len(message_ids)} undelivered messages back to the outbox")
+
+
+# Module-level singleton (started and stopped with the app, see server/main.py)
+outbound_dispatcher = OutboundDispatcher(
+    rate_per_second=config.OUTBOUND_RATE_PER_SECOND,
+    lanes=config.OUTBOUND_LANES,
+    max_attempts=config.OUTBOUND_MAX_ATTEMPTS,
+    backoff_seconds=config.OUTBOUND_BACKOFF_SECONDS,
+    poll_seconds=config.OUTBOUND_POLL_SECONDS,
+    redis_url=config.OUTBOUND_REDIS_URL,
+)
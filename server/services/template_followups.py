@@ -0,0 +1,315 @@
+"""
+Template Follow-up Sequences.
+
+Once the 24h WhatsApp window has closed, free-form (LLM) messages are no
+longer allowed and only approved templates can reach the lead. Each org's
+active Followup rows form a sequence (by sequence_order):
+
+    step 1 is due delay_hours after the lead's last message (and never
+           before the window closes)
+    step N is due delay_hours after step N-1 was sent
+
+Progress is stored on the conversation (template_followup_order /
+template_followup_sent_at) and only counts while it is newer than the lead's
+last message, so a reply restarts the sequence without any extra write.
+
+A run claims due conversations with FOR UPDATE SKIP LOCKED (advancing their
+progress in the same transaction, so parallel runs never double-send), renders
+the templates, and sends them through the throttled bulk sender. Templates
+cost no LLM call, so runs scale to large reactivation batches.
+
+Template follow-ups and campaigns are both business-initiated and share the
+number's Meta messaging tier (WhatsAppIntegration.messaging_limit per rolling
+24h, see tier_remaining); an org that has used it up gets no follow-ups until
+the window frees up.
+"""
+import logging
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from server.enums import ConversationMode, ConversationStage, MessageFrom, TemplateStatus
+from server.models import (
+    Conversation, Followup, Lead, Message, Organization, Template, WhatsAppIntegration,
+)
+from server.services.bulk_sender import bulk_sender
+from server.services.graph_client import OutboundMessage, whatsapp_template_payload
+from server.services.followup_schedule import refresh_followup_schedule
+
+logger = logging.getLogger(__name__)
+
+WHATSAPP_WINDOW = timedelta(hours=24)
+TIER_WINDOW = timedelta(hours=24)
+# Conversations that are finished never get reactivation templates
+CLOSED_STAGES = (ConversationStage.CLOSED, ConversationStage.LOST)
+
+_PLACEHOLDER_RE = re.compile(r"\{\{(\d+)\}\}")
+# Positional template variables: {{1}} lead first name, {{2}} business name
+TEMPLATE_VARIABLES = 2
+
+
+@dataclass
+class TemplateSend:
+    conversation_id: UUID
+    organization_id: UUID
+    lead_id: UUID
+    sequence_order: int
+    text: str  # Rendered body, as shown in the inbox
+    message: OutboundMessage
+
+
+# ========================================
+# Messaging tier
+# ========================================
+
+def tier_remaining(db: Session, integration: WhatsAppIntegration, now: datetime) -> int:
+    """Template sends the org's number may still make in the rolling 24h window."""
+    used = (
+        db.query(func.count(Message.id))
+        .filter(
+            Message.organization_id == integration.organization_id,
+            Message.is_template.is_(True),
+            Message.status != "failed",
+            Message.created_at >= now - TIER_WINDOW,
+        )
+        .scalar()
+    )
+    return max((integration.messaging_limit or 0) - (used or 0), 0)
+
+
+# ========================================
+# Rendering
+# ========================================
+
+def _template_text_components(template: Template) -> Optional[List[Tuple[str, str]]]:
+    """(type, text) of the header/body, or None if the template needs parameters we cannot fill."""
+    parts = []
+    for component in template.components or []:
+        ctype = (component.get("type") or "").upper()
+        if ctype == "HEADER" and (component.get("format") or "TEXT").upper() != "TEXT":
+            return None  # Media headers need a media parameter
+        if ctype not in ("HEADER", "BODY"):
+            continue  # Footer and static buttons take no parameters
+        text = component.get("text") or ""
+        if any(int(i) > TEMPLATE_VARIABLES for i in _PLACEHOLDER_RE.findall(text)):
+            return None
+        parts.append((ctype, text))
+    return parts
+
+
+def is_renderable(template: Template) -> bool:
+    """True if every parameter of the template can be filled from TEMPLATE_VARIABLES."""
+    return _template_text_components(template) is not None
+
+
+def render_template(template: Template, lead: Lead, org: Organization) -> Tuple[List[Dict], str]:
+    """Graph API template components and the rendered body text (template must be renderable)."""
+    first_name = (lead.name or "").split()[0] if (lead.name or "").strip() else "there"
+    values = [first_name, org.business_name or org.name]
+
+    components: List[Dict] = []
+    body_text = ""
+    for ctype, text in _template_text_components(template) or []:
+        indexes = sorted({int(i) for i in _PLACEHOLDER_RE.findall(text)})
+        if indexes:
+            components.append({
+                "type": ctype.lower(),
+                "parameters": [{"type": "text", "text": values[i - 1]} for i in indexes],
+            })
+        if ctype == "BODY":
+            body_text = _PLACEHOLDER_RE.sub(lambda m: values[int(m.group(1)) - 1], text)
+    return components, body_text or f"[template: {template.name}]"
+
+
+# ========================================
+# Sequences
+# ========================================
+
+def load_sequences(db: Session) -> Dict[UUID, List[Tuple[Followup, Template]]]:
+    """Active, renderable steps with an approved template, per org, in sequence order."""
+    rows = (
+        db.query(Followup, Template)
+        .join(Template, Followup.template_id == Template.id)
+        .filter(
+            Followup.is_active.is_(True),
+            Template.status == TemplateStatus.APPROVED,
+        )
+        .order_by(Followup.organization_id, Followup.sequence_order)
+        .all()
+    )
+    sequences: Dict[UUID, List[Tuple[Followup, Template]]] = {}
+    for followup, template in rows:
+        if not is_renderable(template):
+            logger.warning(f"Template {template.name} ({template.id}) has parameters we cannot fill; step skipped")
+            continue
+        sequences.setdefault(followup.organization_id, []).append((followup, template))
+    return sequences
+
+
+def _progress_valid():
+    """SQL: the stored progress belongs to the current silence (newer than the lead's last message)."""
+    return and_(
+        Conversation.template_followup_order.isnot(None),
+        Conversation.template_followup_sent_at >= Conversation.last_user_message_at,
+    )
+
+
+def _due_condition(steps: List[Tuple[Followup, Template]], now: datetime):
+    """SQL: some step of the sequence is due for the conversation."""
+    first, _ = steps[0]
+    clauses = [and_(
+        or_(
+            Conversation.template_followup_order.is_(None),
+            Conversation.template_followup_sent_at.is_(None),
+            Conversation.template_followup_sent_at < Conversation.last_user_message_at,
+        ),
+        Conversation.last_user_message_at <= now - max(timedelta(hours=first.delay_hours), WHATSAPP_WINDOW),
+    )]
+    for (previous, _), (step, _) in zip(steps, steps[1:]):
+        clauses.append(and_(
+            _progress_valid(),
+            Conversation.template_followup_order >= previous.sequence_order,
+            Conversation.template_followup_order < step.sequence_order,
+            Conversation.template_followup_sent_at <= now - timedelta(hours=step.delay_hours),
+        ))
+    return or_(*clauses)
+
+
+def next_step(conv: Conversation, steps: List[Tuple[Followup, Template]]) -> Optional[Tuple[Followup, Template]]:
+    """The step after the conversation's progress (the first one if it has none for this silence)."""
+    if (
+        conv.template_followup_order is None
+        or conv.template_followup_sent_at is None
+        or conv.template_followup_sent_at < conv.last_user_message_at
+    ):
+        return steps[0]
+    for followup, template in steps:
+        if followup.sequence_order > conv.template_followup_order:
+            return followup, template
+    return None
+
+
+def claim_template_followups(db: Session, limit: int, per_org_limit: int) -> List[TemplateSend]:
+    """Claim due template steps (progress advanced and committed) and render them."""
+    now = datetime.now(timezone.utc)
+    sequences = load_sequences(db)
+    if not sequences:
+        return []
+
+    orgs = {
+        org.id: (org, integration)
+        for org, integration in (
+            db.query(Organization, WhatsAppIntegration)
+            .join(WhatsAppIntegration, Organization.id == WhatsAppIntegration.organization_id)
+            .filter(
+                Organization.id.in_(list(sequences)),
+                WhatsAppIntegration.is_connected.is_(True),
+            )
+            .all()
+        )
+    }
+
+    sends: List[TemplateSend] = []
+    for org_id, steps in sequences.items():
+        if len(sends) >= limit:
+            break
+        if org_id not in orgs:
+            continue
+        org, integration = orgs[org_id]
+        tier = tier_remaining(db, integration, now)
+        if tier <= 0:
+            logger.info(f"Template follow-ups for org {org_id}: messaging tier used up for the last 24h")
+            continue
+
+        due = (
+            db.query(Conversation, Lead)
+            .join(Lead, Conversation.lead_id == Lead.id)
+            .filter(
+                Conversation.organization_id == org_id,
+                Conversation.mode == ConversationMode.BOT,
+                Conversation.needs_human_attention.isnot(True),
+                Conversation.stage.notin_(CLOSED_STAGES),
+                Conversation.last_user_message_at.isnot(None),
+                _due_condition(steps, now),
+            )
+            # Most recently active leads first: they are the likeliest to re-engage
+            .order_by(Conversation.last_user_message_at.desc())
+            .limit(min(per_org_limit, limit - len(sends), tier))
+            .with_for_update(skip_locked=True, of=Conversation)
+            .all()
+        )
+        for conv, lead in due:
+            step = next_step(conv, steps)
+            if step is None:
+                continue
+            followup, template = step
+            components, text = render_template(template, lead, org)
+            conv.template_followup_order = followup.sequence_order
+            conv.template_followup_sent_at = now
+            sends.append(TemplateSend(
+                conversation_id=conv.id,
+                organization_id=org_id,
+                lead_id=lead.id,
+                sequence_order=followup.sequence_order,
+                text=text,
+                message=OutboundMessage(
+                    phone_number_id=integration.phone_number_id,
+                    access_token=integration.access_token,
+                    version=integration.version or "v18.0",
+                    payload=whatsapp_template_payload(
+                        lead.phone, template.name, template.language or "en_US", components
+                    ),
+                ),
+            ))
+        # Claimed progress is committed before anything is sent (at most once per step)
+        db.commit()
+    return sends
+
+
+def run_template_followups(db: Session, limit: int, per_org_limit: int) -> Dict[str, int]:
+    """Claim, send (throttled) and record one batch of template follow-ups."""
+    sends = claim_template_followups(db, limit, per_org_limit)
+    if not sends:
+        return {"claimed": 0, "sent": 0, "failed": 0}
+
+    results = bulk_sender.send_all_from_thread([send.message for send in sends])
+
+    now = datetime.now(timezone.utc)
+    conversations = {
+        conv.id: conv
+        for conv in db.query(Conversation).filter(Conversation.id.in_([s.conversation_id for s in sends]))
+    }
+    sent = 0
+    for send, result in zip(sends, results):
+        db.add(Message(
+            organization_id=send.organization_id,
+            conversation_id=send.conversation_id,
+            lead_id=send.lead_id,
+            content=send.text,
+            message_from=MessageFrom.BOT,
+            status="sent" if result.ok else "failed",
+            is_template=True,
+            external_message_id=result.external_message_id,
+        ))
+        if not result.ok:
+            logger.warning(
+                f"Template follow-up {send.sequence_order} failed for {send.conversation_id}: "
+                f"{result.status_code} {result.response}"
+            )
+            continue
+        sent += 1
+        conv = conversations.get(send.conversation_id)
+        if conv is not None:
+            conv.last_message = send.text[:500]
+            conv.last_message_at = now
+            conv.last_bot_message_at = now
+            refresh_followup_schedule(conv)
+    db.commit()
+
+    logger.info(f"Template follow-ups: {len(sends)} claimed, {sent} sent, {len(sends) - sent} failed")
+    return {"claimed": len(sends), "sent": sent, "failed": len(sends) - sent}
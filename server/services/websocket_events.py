@@ -15,6 +15,7 @@ from server.schemas import (
 from server.enums import WSEvents, ConversationMode
 from server.database import SessionLocal
 from server.models import Conversation, User
+from server.services.followup_schedule import refresh_followup_schedule
 
 # In-memory last seen for active users (for heartbeat)
 last_seen: Dict[UUID, float] = {}
@@ -45,6 +46,7 @@ async def handle_takeover_started(user_id: UUID, payload: Dict[str, Any]):
 
         # Update mode to HUMAN
         conversation.mode = ConversationMode.HUMAN
+        refresh_followup_schedule(conversation)
         db.commit()
         db.refresh(conversation)
 
@@ -77,6 +79,7 @@ async def handle_takeover_ended(user_id: UUID, payload: Dict[str, Any]):
 
         # Update mode back to BOT
         conversation.mode = ConversationMode.BOT
+        refresh_followup_schedule(conversation)
         db.commit()
         db.refresh(conversation)
 
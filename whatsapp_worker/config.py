@@ -26,5 +26,52 @@ class WhatsAppSendConfig:
 
         self.CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL")
         self.CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND") 
+        self.REDIS_URL = os.getenv("REDIS_URL") or self.CELERY_BROKER_URL
+
+        # Deferred Memory: wait this long for more turns before summarizing
+        self.MEMORY_DEBOUNCE_SECONDS = int(os.getenv("MEMORY_DEBOUNCE_SECONDS", "30"))
+
+        # Follow-up fan-out: due items claimed per beat tick (in total and per org);
+        # the rest wait for the next tick. The lease must outlive queueing plus a pipeline run.
+        self.FOLLOWUP_MAX_PER_TICK = int(os.getenv("FOLLOWUP_MAX_PER_TICK", "500"))
+        self.FOLLOWUP_MAX_PER_ORG_PER_TICK = int(os.getenv("FOLLOWUP_MAX_PER_ORG_PER_TICK", "50"))
+        self.FOLLOWUP_LEASE_SECONDS = int(os.getenv("FOLLOWUP_LEASE_SECONDS", "900"))
+        # Follow-ups run as ETA tasks scheduled with each bot reply; the beat sweep only
+        # catches ones whose task was lost. An ETA is never further out than
+        # FOLLOWUP_MAX_ETA_SECONDS (longer delays re-arm), which must stay under the
+        # broker's visibility timeout (1h by default) or the task is redelivered early.
+        self.FOLLOWUP_SWEEP_INTERVAL_SECONDS = float(os.getenv("FOLLOWUP_SWEEP_INTERVAL_SECONDS", "300"))
+        self.FOLLOWUP_MAX_ETA_SECONDS = int(os.getenv("FOLLOWUP_MAX_ETA_SECONDS", "3000"))
+        # Follow-up drafts are generated on their own queue, so a small dedicated worker
+        # (or spare capacity) absorbs them without delaying due sends
+        self.FOLLOWUP_DRAFTS_ENABLED = os.getenv("FOLLOWUP_DRAFTS_ENABLED", "true").lower() == "true"
+        self.FOLLOWUP_DRAFT_QUEUE = os.getenv("FOLLOWUP_DRAFT_QUEUE", "followup_drafts")
+        # Drafts are made this long before the follow-up is due (most leads reply sooner)
+        self.FOLLOWUP_DRAFT_LEAD_SECONDS = int(os.getenv("FOLLOWUP_DRAFT_LEAD_SECONDS", "120"))
+        # Template follow-ups for leads outside the 24h window (no LLM; sent by the server)
+        self.TEMPLATE_FOLLOWUP_INTERVAL_SECONDS = float(os.getenv("TEMPLATE_FOLLOWUP_INTERVAL_SECONDS", "300"))
+        self.TEMPLATE_FOLLOWUP_BATCH_SIZE = int(os.getenv("TEMPLATE_FOLLOWUP_BATCH_SIZE", "200"))
+        self.TEMPLATE_FOLLOWUP_MAX_PER_ORG = int(os.getenv("TEMPLATE_FOLLOWUP_MAX_PER_ORG", "100"))
+        # Campaigns: how often to advance running campaigns, and for how long per run
+        self.CAMPAIGN_INTERVAL_SECONDS = float(os.getenv("CAMPAIGN_INTERVAL_SECONDS", "60"))
+        self.CAMPAIGN_TIME_BUDGET_SECONDS = int(os.getenv("CAMPAIGN_TIME_BUDGET_SECONDS", "50"))
+
+        # Status webhooks (see whatsapp_worker/status_buffer.py): events per bulk
+        # update, the longest an event waits in the buffer, and how many more
+        # flushes a status for a not-yet-stored wamid is retried before it is dropped
+        self.STATUS_BATCH_SIZE = int(os.getenv("STATUS_BATCH_SIZE", "500"))
+        self.STATUS_FLUSH_SECONDS = float(os.getenv("STATUS_FLUSH_SECONDS", "2"))
+        self.STATUS_UNMATCHED_RETRIES = int(os.getenv("STATUS_UNMATCHED_RETRIES", "3"))
+
+        # Load shedding (see whatsapp_worker/load_shedding.py): switch to the degraded
+        # pipeline profile when the oldest queued message is older than the ENTER
+        # threshold; switch back once it is under the EXIT threshold.
+        self.LOAD_SHEDDING_ENABLED = os.getenv("LOAD_SHEDDING_ENABLED", "true").lower() == "true"
+        self.LOAD_SHED_ENTER_QUEUE_AGE_SECONDS = float(os.getenv("LOAD_SHED_ENTER_QUEUE_AGE_SECONDS", "60"))
+        self.LOAD_SHED_EXIT_QUEUE_AGE_SECONDS = float(os.getenv("LOAD_SHED_EXIT_QUEUE_AGE_SECONDS", "15"))
+        # Minimum time in a mode before switching again (prevents flapping)
+        self.LOAD_SHED_MIN_DWELL_SECONDS = float(os.getenv("LOAD_SHED_MIN_DWELL_SECONDS", "60"))
+        # Memory debounce while degraded (summaries wait until the spike is over)
+        self.MEMORY_DEGRADED_DEBOUNCE_SECONDS = int(os.getenv("MEMORY_DEGRADED_DEBOUNCE_SECONDS", "600"))
 
 config = WhatsAppSendConfig()
\ No newline at end of file
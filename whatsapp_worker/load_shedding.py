@@ -0,0 +1,133 @@
+"""
+Backlog-driven Load Shedding.
+
+The only backlog signal is queue age: how long the oldest message of the
+latest SQS batch waited (SentTimestamp); 0 when a poll comes back empty.
+A per-process in-flight count says nothing here: the worker receives at most
+one SQS batch (MaxNumberOfMessages=10) and handles it serially, so a growing
+backlog only ever shows up as older messages.
+
+When queue age passes the ENTER threshold the worker switches to the degraded
+pipeline profile (fused Eyes+Brain, LLM_DEGRADED_MODEL, Memory deferred by
+MEMORY_DEGRADED_DEBOUNCE_SECONDS). It switches back once it is under the EXIT
+threshold. The gap between the thresholds plus a minimum dwell time keeps the
+mode from flapping around a single value.
+
+Only the SQS workers see the queue, so while degraded they also keep a short-
+lived flag in Redis (DEGRADED_FLAG_KEY); Celery tasks read it through
+shared_degraded() to put optional LLM work (follow-up drafts) on hold.
+"""
+import logging
+import threading
+import time
+from typing import Iterable, Mapping, Optional
+
+from llm.metrics import metrics
+from whatsapp_worker.config import config
+from whatsapp_worker.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+MODE_FULL = "full"
+MODE_DEGRADED = "degraded"
+
+DEGRADED_FLAG_KEY = "worker:load_shedding:degraded"
+# Refreshed on every SQS poll (at most 20s apart); lapses once no worker is degraded
+DEGRADED_FLAG_TTL_SECONDS = 60
+
+
+def oldest_message_age(messages: Iterable[Mapping], now: Optional[float] = None) -> float:
+    """Seconds the oldest SQS message in a batch spent in the queue (needs SentTimestamp)."""
+    now = time.time() if now is None else now
+    sent = [
+        int(m["Attributes"]["SentTimestamp"]) / 1000
+        for m in messages
+        if (m.get("Attributes") or {}).get("SentTimestamp")
+    ]
+    return max(now - min(sent), 0.0) if sent else 0.0
+
+
+class LoadShedder:
+    """Tracks backlog and decides the pipeline profile, with hysteresis."""
+
+    def __init__(
+        self,
+        enter_queue_age: float,
+        exit_queue_age: float,
+        min_dwell_seconds: float,
+        enabled: bool = True,
+    ) -> None:
+        self.enter_queue_age = enter_queue_age
+        self.exit_queue_age = exit_queue_age
+        self.min_dwell_seconds = min_dwell_seconds
+        self.enabled = enabled
+
+        self.mode = MODE_FULL
+        self.queue_age = 0.0
+        self._switched_at = float("-inf")  # First switch is never held back by the dwell time
+        self._lock = threading.Lock()
+
+    @property
+    def degraded(self) -> bool:
+        return self.mode == MODE_DEGRADED
+
+    # ---------- signals ----------
+
+    def observe_queue_age(self, age_seconds: float) -> None:
+        with self._lock:
+            self.queue_age = age_seconds
+            self._evaluate()
+        metrics.observe("worker.queue_age_ms", age_seconds * 1000)
+        if self.degraded:
+            try:
+                get_redis().set(DEGRADED_FLAG_KEY, "1", ex=DEGRADED_FLAG_TTL_SECONDS)
+            except Exception as e:
+                logger.warning(f"Could not publish load-shedding mode: {e}")
+
+    def shared_degraded(self) -> bool:
+        """Degraded here or in any SQS worker (for processes that do not poll the queue)."""
+        if not self.enabled:
+            return False
+        if self.degraded:
+            return True
+        try:
+            return bool(get_redis().exists(DEGRADED_FLAG_KEY))
+        except Exception:
+            return False
+
+    # ---------- mode ----------
+
+    def _evaluate(self) -> None:
+        """Switch modes if the thresholds say so (caller holds the lock)."""
+        if not self.enabled:
+            return
+        if time.monotonic() - self._switched_at < self.min_dwell_seconds:
+            return
+
+        if self.mode == MODE_FULL:
+            if self.queue_age >= self.enter_queue_age:
+                self._switch(MODE_DEGRADED)
+        elif self.queue_age <= self.exit_queue_age:
+            self._switch(MODE_FULL)
+
+    def _switch(self, mode: str) -> None:
+        now = time.monotonic()
+        held_for = now - self._switched_at
+        self.mode = mode
+        self._switched_at = now
+        metrics.incr("worker.load_shedding.mode_switch", mode=mode)
+
+        backlog = f"queue_age={self.queue_age:.1f}s"
+        if mode == MODE_DEGRADED:
+            logger.warning(f"Load shedding ON: switching to degraded pipeline ({backlog})")
+        else:
+            logger.info(f"Load shedding OFF: backlog drained after {held_for:.0f}s, full pipeline ({backlog})")
+
+
+# Module-level singleton
+load_shedder = LoadShedder(
+    enter_queue_age=config.LOAD_SHED_ENTER_QUEUE_AGE_SECONDS,
+    exit_queue_age=config.LOAD_SHED_EXIT_QUEUE_AGE_SECONDS,
+    min_dwell_seconds=config.LOAD_SHED_MIN_DWELL_SECONDS,
+    enabled=config.LOAD_SHEDDING_ENABLED,
+)
@@ -4,6 +4,7 @@ Long-polls SQS for incoming WhatsApp messages and processes them through HTL pip
 """
 import logging
 import json
+import signal
 import time
 import base64
 from typing import Mapping, Tuple, Optional
@@ -16,7 +17,11 @@ from whatsapp_worker.processors.context import build_pipeline_context
 from whatsapp_worker.processors.actions import handle_pipeline_result
 from whatsapp_worker.processors.api_client import api_client
 from whatsapp_worker.security import validate_signature
+from whatsapp_worker.tasks import enqueue_memory_update, schedule_followup
+from whatsapp_worker.load_shedding import load_shedder, oldest_message_age
+from whatsapp_worker.status_buffer import status_buffer
 from llm.pipeline import run_pipeline
+from llm.metrics import metrics
 from server.enums import ConversationMode
 from logging_config import setup_logging
 
@@ -40,23 +45,40 @@ _buffer_lock = Lock()
 DEBOUNCE_SECONDS = 5  # Wait 5 seconds for additional messages
 
 
+def _handle_sigterm(signum, frame):
+    # Unwind the poll loop so start_worker's finally flushes buffered statuses
+    raise SystemExit(0)
+
+
 def start_worker():
     """
     Infinite loop to pull messages from SQS and process them through HTL pipeline.
     """
     logger.info(f"HTL Worker started. Listening on: {config.QUEUE_URL}")
+    signal.signal(signal.SIGTERM, _handle_sigterm)
+    status_buffer.start()
+    try:
+        _poll_forever()
+    finally:
+        logger.info("HTL Worker stopping, flushing buffered statuses")
+        status_buffer.stop()
+
 
+def _poll_forever():
     while True:
+        metrics.maybe_log_snapshot()
         try:
             # Long Polling: Wait up to 20 seconds for a message
             response = sqs.receive_message(
                 QueueUrl=config.QUEUE_URL,
                 MaxNumberOfMessages=10,  # Process batch for efficiency
                 WaitTimeSeconds=20,
-                VisibilityTimeout=60  # Give more time for pipeline processing
+                VisibilityTimeout=60,  # Give more time for pipeline processing
+                MessageSystemAttributeNames=['SentTimestamp'],  # Queue age for load shedding
             )
 
             messages = response.get('Messages', [])
+            load_shedder.observe_queue_age(oldest_message_age(messages))
             if not messages:
                 continue
 
@@ -124,8 +146,9 @@ def handle_webhook(body: Mapping) -> Tuple[Mapping, int]:
         # Parse webhook payload
         value = body.get("entry", [{}])[0].get("changes", [{}])[0].get("value", {})
         
-        # Skip status updates (delivered, read, etc.)
+        # Status updates (sent, delivered, read, failed): buffered and applied in bulk
         if value.get("statuses"):
+            status_buffer.add(value["statuses"])
             return {"status": "ok", "type": "status_update"}, 200
 
         # Get messages
@@ -221,19 +244,19 @@ def process_message(
         # Step 3: Run Pipeline (Brain + Mouth)
         # ========================================
         
-        pipeline_context = build_pipeline_context(
-            {
-                "organization_id": str(organization_id),
-                "organization_name": org_result["organization_name"],
-                "business_name": org_result.get("business_name"),
-                "business_description": org_result.get("business_description"),
-                "flow_prompt": org_result.get("flow_prompt"),
-            }, 
-            conversation, 
-            lead
-        )
+        org_config = {
+            "organization_id": str(organization_id),
+            "organization_name": org_result["organization_name"],
+            "business_name": org_result.get("business_name"),
+            "business_description": org_result.get("business_description"),
+            "flow_prompt": org_result.get("flow_prompt"),
+            "llm_settings": org_result.get("llm_settings"),
+        }
+        pipeline_context = build_pipeline_context(org_config, conversation, lead)
         
-        pipeline_result = run_pipeline(pipeline_context, message_text)
+        # Cheaper profile while the queue is backed up (see load_shedding.py)
+        degraded = load_shedder.degraded
+        pipeline_result = run_pipeline(pipeline_context, message_text, degraded=degraded)
         
         # ========================================
         # Step 4: Immediate Action (Send Message)
@@ -263,27 +286,19 @@ def process_message(
 
         # Update Conversation State (Stage, Intent, etc.)
         handle_pipeline_result(conversation, lead_id, pipeline_result)
+
+        # Follow-up timer (and its background draft) starts with the committed reply;
+        # the lead's next message cancels both
+        if response_text:
+            schedule_followup(conversation, org_config, lead)
         
-        # Background Summary (The Memory)
+        # Background Summary (The Memory) - deferred and coalesced per conversation
         if pipeline_result.needs_background_summary:
-            from llm.steps.memory import run_memory
-            
-            # Run summary generation
-            new_summary = run_memory(
-                context=pipeline_context, 
-                user_message=message_text,
-                mouth_output=pipeline_result.mouth,
-                brain_output=pipeline_result.brain
+            enqueue_memory_update(
+                str(conversation_id),
+                org_result.get("llm_settings"),
+                countdown=config.MEMORY_DEGRADED_DEBOUNCE_SECONDS if degraded else None,
             )
-            
-            # Update DB with new summary if generated
-            if new_summary:
-                try:
-                    # We only update the summary here. Other fields handled by handle_pipeline_result.
-                    api_client.update_conversation(conversation_id, rolling_summary=new_summary)
-                    logger.info(f"Updated rolling summary for {conversation_id}")
-                except Exception as e:
-                    logger.error(f"Failed to save summary to DB: {e}")
 
         return {
             "status": "ok",
@@ -3,7 +3,7 @@ Actions Handler for HTL Pipeline Results.
 Processes pipeline results and executes the appropriate actions via API.
 """
 import logging
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from typing import Dict, Optional
 from uuid import UUID
 from llm.schemas import PipelineResult
@@ -75,6 +75,11 @@ def handle_pipeline_result(
     if result.should_send_message and result.response:
         message_to_send = result.response.message_text
         updates["stage"] = classification.new_stage.value
+        # Brain's timing for the first nudge if the lead goes quiet (server falls back to the ladder)
+        if classification.followup_in_minutes:
+            updates["scheduled_followup_at"] = (
+                datetime.now(timezone.utc) + timedelta(minutes=classification.followup_in_minutes)
+            )
         
     # Update rolling summary
     if result.summary and result.summary.updated_rolling_summary:
@@ -85,7 +90,10 @@ def handle_pipeline_result(
     # ========================================
     if updates:
         try:
-            api_client.update_conversation(conversation_id, **updates)
+            updated = api_client.update_conversation(conversation_id, **updates)
+            # Keep the caller's snapshot current (stage, next_followup_at)
+            if updated:
+                conversation.update(updated)
             
             # Sync relevant fields to Lead model
             lead_updates = {}
@@ -159,9 +167,12 @@ def log_pipeline_event(
     return api_client.log_pipeline_event(
         conversation_id=conversation_id,
         event_type="pipeline_run",
-        pipeline_step="complete",
+        pipeline_step="fast_path" if result.fast_path else "complete",
         input_summary=f"stage={result.classification.new_stage.value}, conf={result.classification.confidence:.2f}",
-        output_summary=f"action={result.classification.action.value}, send={result.should_send_message}",
+        output_summary=(
+            f"action={result.classification.action.value}, send={result.should_send_message}, "
+            f"models={result.step_models}"
+        ),
         latency_ms=result.pipeline_latency_ms,
         tokens_used=result.total_tokens_used,
     )
@@ -301,6 +301,11 @@ class InternalsAPIClient:
         )
         return self._handle_response(response)
 
+    def update_message_statuses(self, statuses: List[Dict]) -> Dict:
+        """Apply a batch of WhatsApp status events ({external_message_id, status})."""
+        response = self.client.post("/internals/messages/statuses", json={"statuses": statuses})
+        return self._handle_response(response)
+
     def send_bot_message(
         self,
         organization_id: UUID,
@@ -333,10 +338,88 @@ class InternalsAPIClient:
     # Scheduled Action Methods
     # ========================================
     
-    def get_due_followups(self) -> List[Dict]:
-        """Fetch conversations due for follow-ups from the real-time endpoint."""
-        response = self.client.get("/internals/conversations/due-followups")
+    def get_due_followups(self, limit: int = 500, per_org_limit: Optional[int] = None) -> List[Dict]:
+        """
+        Fetch conversations due for follow-ups.
+
+        The endpoint groups them by org (org/WhatsApp config sent once per
+        group); this flattens them back to one self-contained dict per follow-up.
+        """
+        params = {"limit": limit}
+        if per_org_limit:
+            params["per_org_limit"] = per_org_limit
+        response = self.client.get("/internals/conversations/due-followups", params=params)
+        return self._flatten_followup_groups(self._handle_response(response) or [])
+
+    def claim_due_followups(
+        self,
+        limit: int = 500,
+        per_org_limit: Optional[int] = None,
+        lease_seconds: int = 900,
+    ) -> List[Dict]:
+        """
+        Lease due follow-ups to this caller, flattened like get_due_followups.
+
+        Each item carries a lease_token; concurrent claimers never receive the
+        same conversation while its lease is live.
+        """
+        payload = {"limit": limit, "lease_seconds": lease_seconds}
+        if per_org_limit:
+            payload["per_org_limit"] = per_org_limit
+        response = self.client.post("/internals/conversations/due-followups/claim", json=payload)
+        return self._flatten_followup_groups(self._handle_response(response) or [])
+
+    def claim_conversation_followup(self, conversation_id: UUID, lease_seconds: int = 900) -> Optional[Dict]:
+        """Lease one conversation's follow-up; None if it is not due (or already claimed)."""
+        response = self.client.post(
+            f"/internals/conversations/{conversation_id}/followup/claim",
+            json={"lease_seconds": lease_seconds},
+        )
+        group = self._handle_response(response)
+        if not group:
+            return None
+        return self._flatten_followup_groups([group])[0]
+
+    def store_followup_draft(self, conversation_id: UUID, next_followup_at: str, draft: Dict) -> bool:
+        """Store a pre-generated follow-up; False if the schedule moved while drafting."""
+        response = self.client.put(
+            f"/internals/conversations/{conversation_id}/followup-draft",
+            json={"next_followup_at": next_followup_at, "draft": draft},
+        )
+        try:
+            self._handle_response(response)
+        except InternalsAPIError as e:
+            if e.status_code == 409:
+                return False
+            raise
+        return True
+
+    def run_template_followups(self, limit: int = 200, per_org_limit: int = 100) -> Dict:
+        """Send one batch of template follow-ups (throttled server-side, so allow a long timeout)."""
+        response = self.client.post(
+            "/internals/template-followups/run",
+            json={"limit": limit, "per_org_limit": per_org_limit},
+            timeout=max(self.timeout, 300.0),
+        )
         return self._handle_response(response)
+
+    def advance_campaigns(self, time_budget_seconds: int = 50) -> Dict:
+        """Send running campaigns for up to time_budget_seconds (plus the batch in flight)."""
+        response = self.client.post(
+            "/internals/campaigns/advance",
+            json={"time_budget_seconds": time_budget_seconds},
+            timeout=max(self.timeout, time_budget_seconds + 120.0),
+        )
+        return self._handle_response(response)
+
+    @staticmethod
+    def _flatten_followup_groups(groups: List[Dict]) -> List[Dict]:
+        due = []
+        for group in groups:
+            followups = group.pop("followups", [])
+            for item in followups:
+                due.append({**group, **item})
+        return due
     
     # ========================================
     # Pipeline Event Methods
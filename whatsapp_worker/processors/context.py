@@ -14,6 +14,7 @@ from server.enums import (
     ConversationStage, ConversationMode, IntentLevel, UserSentiment
 )
 from whatsapp_worker.processors.api_client import api_client
+from llm.memory_segments import render_memory_view
 
 logger = logging.getLogger(__name__)
 
@@ -72,10 +73,12 @@ def build_pipeline_context(
     
     Args:
         org_config: Dict with organization config including:
+            - organization_id: str
             - organization_name: str
             - business_name: Optional[str]
             - business_description: Optional[str]
             - flow_prompt: Optional[str]
+            - llm_settings: Optional[Dict] (per-step LLM overrides)
         conversation: Conversation data from API
         lead: Lead data from API
     """
@@ -130,15 +133,24 @@ def build_pipeline_context(
     # Build pipeline input
     context = PipelineInput(
         # Business context (from organization config)
+        organization_id=org_config.get("organization_id"),
+        conversation_id=str(conversation["id"]) if conversation.get("id") else None,
         business_name=business_name,
         business_description=business_description,
         flow_prompt=flow_prompt,
         
+        # Lead
+        lead_name=lead.get("name") or "",
+        lead_phone=lead.get("phone") or "",
+        
         # CTAs
         available_ctas=available_ctas,
         
         # Conversation context  
-        rolling_summary=conversation.get("rolling_summary", ""),
+        rolling_summary=render_memory_view(
+            conversation.get("memory_segments"),
+            conversation.get("rolling_summary") or "",
+        ),
         last_messages=last_messages,
         
         # Current state
@@ -156,6 +168,9 @@ def build_pipeline_context(
         max_words=80,
         questions_per_message=1,
         language_pref="en",
+        
+        # Per-org LLM routing
+        llm_overrides=org_config.get("llm_settings") or {},
     )
     
     return context
\ No newline at end of file
@@ -0,0 +1,69 @@
+"""
+Follow-up Drafts.
+The next follow-up is generated in the background right after the bot replies
+(low-priority Celery queue) and stored on the conversation with a fingerprint
+of the state it was based on. When the follow-up falls due the draft is sent
+as-is if the fingerprint still matches, so no LLM call sits on the send path.
+"""
+import hashlib
+import json
+import logging
+from typing import Dict, Optional
+
+from llm.metrics import metrics
+from llm.schemas import PipelineResult
+
+logger = logging.getLogger(__name__)
+
+# Conversation fields a follow-up depends on. Memory updates (rolling_summary,
+# memory_segments) only restate the same messages, so they do not invalidate a draft.
+FINGERPRINT_FIELDS = (
+    "id",
+    "stage",
+    "mode",
+    "needs_human_attention",
+    "last_message_at",
+    "last_user_message_at",
+    "last_bot_message_at",
+    "next_followup_at",
+    "next_followup_stage",
+    "followup_count_24h",
+    "cta_id",
+)
+
+
+def draft_fingerprint(conversation: Dict, followup_type: str) -> str:
+    """Hash of the state a follow-up draft is valid for (conversation as returned by the API)."""
+    state = {field: conversation.get(field) for field in FINGERPRINT_FIELDS}
+    state["followup_type"] = followup_type
+    return hashlib.sha256(json.dumps(state, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def build_draft(conversation: Dict, followup_type: str, result: PipelineResult) -> Dict:
+    return {
+        "followup_type": followup_type,
+        "fingerprint": draft_fingerprint(conversation, followup_type),
+        "result": result.model_dump(mode="json"),
+    }
+
+
+def usable_draft(conversation: Dict, followup_type: str) -> Optional[PipelineResult]:
+    """The stored draft's pipeline result, or None if missing or the state has moved on."""
+    draft = conversation.get("followup_draft")
+    if not draft:
+        metrics.incr("followup.draft", outcome="missing")
+        return None
+    if (
+        draft.get("followup_type") != followup_type
+        or draft.get("fingerprint") != draft_fingerprint(conversation, followup_type)
+    ):
+        metrics.incr("followup.draft", outcome="stale")
+        return None
+    try:
+        result = PipelineResult.model_validate(draft["result"])
+    except Exception as e:
+        logger.warning(f"Discarding unreadable follow-up draft for {conversation.get('id')}: {e}")
+        metrics.incr("followup.draft", outcome="invalid")
+        return None
+    metrics.incr("followup.draft", outcome="hit")
+    return result
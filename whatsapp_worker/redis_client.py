@@ -0,0 +1,26 @@
+"""
+Shared Redis connection for worker-side coordination
+(memory coalescing, follow-up scheduling, rate limiting).
+"""
+import logging
+from typing import Optional
+
+import redis
+
+from whatsapp_worker.config import config
+
+logger = logging.getLogger(__name__)
+
+_redis: Optional[redis.Redis] = None
+
+
+def get_redis() -> redis.Redis:
+    """Lazy-initialize the Redis client (defaults to the Celery broker)."""
+    global _redis
+    if _redis is None:
+        _redis = redis.Redis.from_url(
+            config.REDIS_URL,
+            decode_responses=True,
+            socket_timeout=5,
+        )
+    return _redis
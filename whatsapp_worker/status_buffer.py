@@ -0,0 +1,152 @@
+"""
+Buffered WhatsApp Status Webhooks.
+
+Meta sends a sent / delivered / read (or failed) webhook for every outbound
+message, several times the volume of inbound messages. The worker does not
+forward them one by one: events are collected here and posted to the server
+in batches (/internals/messages/statuses), which applies each batch as a
+single bulk UPDATE.
+
+A batch is flushed once it holds STATUS_BATCH_SIZE events or its oldest event
+has waited STATUS_FLUSH_SECONDS (checked by a background thread, see start()).
+Events are acknowledged to SQS when buffered, so the worker flushes what is
+left when it stops (SIGTERM included); a hard kill loses at most one unflushed
+batch of ticks, and a failed flush is retried with the next one.
+
+A status can arrive before the send has stored its wamid. Events the server
+reports as unmatched go back into the buffer for up to STATUS_UNMATCHED_RETRIES
+more flushes, then are dropped and counted (webhook.status outcome=unmatched).
+"""
+import logging
+import threading
+import time
+from typing import Dict, List, Mapping, Optional
+
+from llm.metrics import metrics
+from whatsapp_worker.config import config
+from whatsapp_worker.processors.api_client import api_client
+
+logger = logging.getLogger(__name__)
+
+# Keep at most this many events while the server is unreachable
+MAX_BUFFERED = 50_000
+
+
+class StatusBuffer:
+    def __init__(self, batch_size: int, flush_seconds: float, unmatched_retries: int) -> None:
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.unmatched_retries = unmatched_retries
+        self._events: List[Dict] = []
+        self._oldest: Optional[float] = None
+        self._retries: Dict[str, int] = {}  # Unmatched external_message_id -> flushes so far
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Flush on a timer in the background, independent of SQS polls."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="status-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the timer and flush whatever is still buffered."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_seconds + 5)
+            self._thread = None
+        self.flush()
+
+    def _run(self) -> None:
+        interval = min(self.flush_seconds, 1.0)
+        while not self._stop.wait(interval):
+            try:
+                self.maybe_flush()
+            except Exception as e:
+                logger.error(f"Status flush error: {e}", exc_info=True)
+
+    def add(self, statuses: List[Mapping]) -> int:
+        """Buffer the "statuses" of a webhook value; returns events kept."""
+        events = [
+            {"external_message_id": status["id"], "status": status["status"]}
+            for status in statuses
+            if status.get("id") and status.get("status") in ("sent", "delivered", "read", "failed")
+        ]
+        for status in statuses:
+            if status.get("status") == "failed":
+                logger.warning(f"WhatsApp reported send failure for {status.get('id')}: {status.get('errors')}")
+        self._extend(events)
+        return len(events)
+
+    def _extend(self, events: List[Dict]) -> None:
+        with self._lock:
+            if events and self._oldest is None:
+                self._oldest = time.monotonic()
+            self._events.extend(events)
+            overflow = len(self._events) - MAX_BUFFERED
+            if overflow > 0:
+                del self._events[:overflow]
+                metrics.incr("webhook.status", overflow, outcome="dropped")
+
+    def maybe_flush(self) -> None:
+        with self._lock:
+            due = len(self._events) >= self.batch_size or (
+                self._oldest is not None and time.monotonic() - self._oldest >= self.flush_seconds
+            )
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        """Post everything buffered, batch_size events per request."""
+        with self._flush_lock:
+            with self._lock:
+                events, self._events, self._oldest = self._events, [], None
+            retry: List[Dict] = []
+            for start in range(0, len(events), self.batch_size):
+                batch = events[start:start + self.batch_size]
+                try:
+                    result = api_client.update_message_statuses(batch)
+                except Exception as e:
+                    logger.error(f"Status flush failed, keeping {len(events) - start} events: {e}")
+                    with self._lock:
+                        self._events[:0] = events[start:]
+                        self._oldest = self._oldest or time.monotonic()
+                    break
+                metrics.incr("webhook.status", len(batch), outcome="flushed")
+                metrics.incr("webhook.status", result.get("updated", 0), outcome="applied")
+                retry.extend(self._unmatched(batch, set(result.get("unmatched") or ())))
+            # Back in the buffer, so the next flush (flush_seconds on) tries them again
+            self._extend(retry)
+
+    def _unmatched(self, batch: List[Dict], unmatched: set) -> List[Dict]:
+        """Events of the batch to retry; gives up on ids unmatched too many times."""
+        by_id: Dict[str, List[Dict]] = {}
+        for event in batch:
+            by_id.setdefault(event["external_message_id"], []).append(event)
+        retry = []
+        for external_id, events in by_id.items():
+            if external_id not in unmatched:
+                self._retries.pop(external_id, None)
+                continue
+            attempts = self._retries.pop(external_id, 0) + 1
+            if attempts > self.unmatched_retries:
+                metrics.incr("webhook.status", len(events), outcome="unmatched")
+                logger.info(f"No message for WhatsApp status of {external_id}, dropped after {attempts} tries")
+                continue
+            if len(self._retries) < MAX_BUFFERED:
+                self._retries[external_id] = attempts
+            metrics.incr("webhook.status", len(events), outcome="retried")
+            retry.extend(events)
+        return retry
+
+
+# Global instance (started and stopped by the worker, see whatsapp_worker/main.py)
+status_buffer = StatusBuffer(
+    batch_size=config.STATUS_BATCH_SIZE,
+    flush_seconds=config.STATUS_FLUSH_SECONDS,
+    unmatched_retries=config.STATUS_UNMATCHED_RETRIES,
+)
@@ -1,14 +1,39 @@
 """
 Celery Tasks for HTL Pipeline.
 Handles scheduled follow-ups and periodic maintenance via API calls.
+
+Follow-ups are event-driven: whenever a bot reply (or a nudge) is committed the
+server returns the conversation's next_followup_at, and schedule_followup()
+queues an ETA task for that moment. When it fires it claims the follow-up,
+which fails if the lead replied in the meantime, so no explicit cancel is
+needed. The beat sweep is only a safety net for tasks lost in an outage.
+
+ETAs are capped at FOLLOWUP_MAX_ETA_SECONDS, inside the broker's default
+visibility timeout (an unacked ETA task held longer is redelivered). A longer
+delay is covered by hops: each one checks the schedule is unchanged and
+re-arms for the rest.
 """
 import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
 from uuid import UUID
 from celery import Celery
 from whatsapp_worker.processors.api_client import api_client
 from whatsapp_worker.processors.context import build_pipeline_context
 from whatsapp_worker.processors.actions import handle_pipeline_result
+from whatsapp_worker.processors.followup_drafts import build_draft, usable_draft
+from whatsapp_worker.redis_client import get_redis
+from whatsapp_worker.load_shedding import load_shedder
 from llm.pipeline import run_followup_pipeline
+from llm.schemas import MessageContext
+from llm.steps.memory import run_memory_segment, run_memory_compaction
+from llm.memory_segments import (
+    append_segment, apply_compaction, plan_compaction, render_memory_view,
+    seed_segments, summarized_through,
+)
+from llm.metrics import metrics
+from llm.tracing import trace_scope
 from server.enums import ConversationStage
 from whatsapp_worker.config import config
 from logging_config import setup_logging
@@ -32,50 +57,285 @@ celery_app = Celery(
 celery_app.conf.beat_schedule = {
     "process-due-followups": {
         "task": "whatsapp_worker.tasks.process_due_followups",
-        "schedule": 60.0,  # Every 60 seconds
+        "schedule": config.FOLLOWUP_SWEEP_INTERVAL_SECONDS,  # Safety net; ETA tasks do the real work
+    },
+    "process-template-followups": {
+        "task": "whatsapp_worker.tasks.process_template_followups",
+        "schedule": config.TEMPLATE_FOLLOWUP_INTERVAL_SECONDS,
+    },
+    "advance-campaigns": {
+        "task": "whatsapp_worker.tasks.advance_campaigns",
+        "schedule": config.CAMPAIGN_INTERVAL_SECONDS,
     },
 }
 
 celery_app.conf.timezone = "UTC"
+# Workers take one task at a time, so follow-ups dispatched in fair order also run in it
+celery_app.conf.worker_prefetch_multiplier = 1
+
+
+# ========================================
+# Follow-up Scheduling (ETA tasks)
+# ========================================
+
+# Fire slightly after the due time so a worker clock running ahead of the DB still finds it due
+FOLLOWUP_ETA_GRACE_SECONDS = 5
+
+
+def schedule_followup(
+    conversation: Optional[Dict],
+    org_config: Optional[Dict] = None,
+    lead: Optional[Dict] = None,
+) -> None:
+    """
+    Queue an ETA task for the conversation's next follow-up, if it has one.
+    Given org_config and lead, the chain also drafts that follow-up
+    FOLLOWUP_DRAFT_LEAD_SECONDS before it is due.
+    """
+    due_at = (conversation or {}).get("next_followup_at")
+    if not due_at:
+        return
+    draft = None
+    if org_config and lead and _wants_draft(conversation):
+        draft = {"org_config": org_config, "lead": lead}
+    try:
+        _arm_followup(str(conversation["id"]), due_at if isinstance(due_at, str) else due_at.isoformat(), draft)
+        logger.info(f"SCHEDULE: {conversation.get('next_followup_stage')} for {conversation['id']} at {due_at}")
+    except Exception as e:
+        # The beat sweep still finds it once due
+        logger.warning(f"SCHEDULE: could not queue follow-up for {conversation['id']}: {e}")
+
+
+def _arm_followup(conversation_id: str, due_at: str, draft: Optional[Dict] = None) -> None:
+    """
+    Queue the next hop towards due_at: the due time itself, FOLLOWUP_MAX_ETA_SECONDS
+    from now, or the draft time if a draft is still to be made (made now once it is close).
+    """
+    now = datetime.now(timezone.utc)
+    due = _parse_ts(due_at)
+    eta = min(
+        due + timedelta(seconds=FOLLOWUP_ETA_GRACE_SECONDS),
+        now + timedelta(seconds=config.FOLLOWUP_MAX_ETA_SECONDS),
+    )
+    if draft is not None:
+        draft_at = due - timedelta(seconds=config.FOLLOWUP_DRAFT_LEAD_SECONDS)
+        if draft_at <= now:
+            _enqueue_followup_draft(conversation_id, draft["org_config"], draft["lead"])
+            draft = None
+        else:
+            eta = min(eta, draft_at)
+    process_scheduled_followup.apply_async(args=[conversation_id, due_at], kwargs={"draft": draft}, eta=eta)
+
+
+@celery_app.task(name="whatsapp_worker.tasks.process_scheduled_followup", ignore_result=True)
+def process_scheduled_followup(conversation_id: str, due_at: Optional[str] = None, draft: Optional[Dict] = None):
+    """ETA task: claim the follow-up if it is still due, then run it (or re-arm if not due yet)."""
+    due = _parse_ts(due_at)
+    if due is not None and due > datetime.now(timezone.utc):
+        _rearm_followup(conversation_id, due_at, due, draft)
+        return
+    try:
+        context = api_client.claim_conversation_followup(
+            UUID(conversation_id), lease_seconds=config.FOLLOWUP_LEASE_SECONDS
+        )
+    except Exception as e:
+        logger.error(f"SCHEDULE: claim failed for {conversation_id}, leaving it to the sweep: {e}")
+        return
+    if not context:
+        # Lead replied, human took over or another claimer has it
+        metrics.incr("followup.processed", outcome="cancelled")
+        return
+    _run_followup(context)
+
+
+def _rearm_followup(conversation_id: str, due_at: str, due: datetime, draft: Optional[Dict]) -> None:
+    """Intermediate hop: carry on only if the conversation is still scheduled for due."""
+    try:
+        conversation = api_client.get_conversation(UUID(conversation_id))
+        if _parse_ts(conversation.get("next_followup_at")) != due:
+            metrics.incr("followup.processed", outcome="cancelled")
+            return
+        _arm_followup(conversation_id, due_at, draft)
+    except Exception as e:
+        logger.error(f"SCHEDULE: could not re-arm follow-up for {conversation_id}, leaving it to the sweep: {e}")
+
+
+# ========================================
+# Follow-up Drafts (low priority)
+# ========================================
+
+# Routed to its own queue: run a small worker with -Q followup_drafts (or add it to an existing worker's -Q)
+celery_app.conf.task_routes = {
+    "whatsapp_worker.tasks.draft_followup": {"queue": config.FOLLOWUP_DRAFT_QUEUE},
+}
+
+
+def _wants_draft(conversation: Dict) -> bool:
+    if not config.FOLLOWUP_DRAFTS_ENABLED:
+        return False
+    # Ghosted closes the conversation without a message
+    return conversation.get("next_followup_stage") != ConversationStage.GHOSTED.value
+
+
+def _enqueue_followup_draft(conversation_id: str, org_config: Dict, lead: Dict) -> None:
+    if load_shedder.shared_degraded():
+        # Drafts are optional LLM work; the follow-up is generated at due time instead
+        metrics.incr("followup.draft_generated", outcome="skipped_degraded")
+        return
+    try:
+        draft_followup.delay(conversation_id, org_config, lead)
+    except Exception as e:
+        logger.warning(f"Could not queue follow-up draft for {conversation_id}: {e}")
+
+
+@celery_app.task(name="whatsapp_worker.tasks.draft_followup", ignore_result=True)
+def draft_followup(conversation_id: str, org_config: dict, lead: dict):
+    """
+    Generate the conversation's next follow-up ahead of time and store it with
+    a fingerprint of the state it was based on (see processors/followup_drafts.py).
+    """
+    if load_shedder.shared_degraded():
+        metrics.incr("followup.draft_generated", outcome="skipped_degraded")
+        return
+    try:
+        conversation = api_client.get_conversation(UUID(conversation_id))
+        followup_type = conversation.get("next_followup_stage")
+        if not followup_type or followup_type == ConversationStage.GHOSTED.value:
+            return
+
+        # Same generation as at due time: prompt registry keyed on the follow-up stage
+        pipeline_context = build_pipeline_context(org_config, {**conversation, "stage": followup_type}, lead)
+        result = run_followup_pipeline(pipeline_context)
+
+        draft = build_draft(conversation, followup_type, result)
+        if api_client.store_followup_draft(UUID(conversation_id), conversation["next_followup_at"], draft):
+            metrics.incr("followup.draft_generated", outcome="stored")
+        else:
+            metrics.incr("followup.draft_generated", outcome="superseded")
+    except Exception as e:
+        metrics.incr("followup.draft_generated", outcome="error")
+        logger.error(f"Failed to draft follow-up for {conversation_id}: {e}", exc_info=True)
+
+
+# ========================================
+# Follow-up Sweep (safety net)
+# ========================================
+
+def _fair_order(due_followups: List[Dict], per_org_cap: int) -> List[Dict]:
+    """
+    Round-robin across orgs (each org's items stay oldest-first), at most
+    per_org_cap per org, so one org's burst cannot starve the others.
+    """
+    by_org: Dict[str, List[Dict]] = {}
+    for context in due_followups:
+        by_org.setdefault(str(context["organization_id"]), []).append(context)
+
+    ordered = []
+    for round_index in range(per_org_cap):
+        added = False
+        for items in by_org.values():
+            if round_index < len(items):
+                ordered.append(items[round_index])
+                added = True
+        if not added:
+            break
+    return ordered
 
 
 @celery_app.task(name="whatsapp_worker.tasks.process_due_followups")
 def process_due_followups():
     """
-    Process all due real-time follow-ups.
+    Dispatch overdue follow-ups, one task per conversation.
     
-    This task runs every minute via Celery beat.
+    Runs every FOLLOWUP_SWEEP_INTERVAL_SECONDS via Celery beat and normally
+    finds nothing: it picks up follow-ups whose ETA task was lost (worker or
+    broker outage) or never queued. It only claims and fans out; claims are
+    leased rows, so several beat instances (or an ETA task firing at the same
+    time) never dispatch the same follow-up twice.
     """
     logger.info("SCHEDULE: Starting process_due_followups check")
     try:
-        # Get all conversations currently in a followup window
-        due_followups = api_client.get_due_followups()
+        due_followups = api_client.claim_due_followups(
+            limit=config.FOLLOWUP_MAX_PER_TICK,
+            per_org_limit=config.FOLLOWUP_MAX_PER_ORG_PER_TICK,
+            lease_seconds=config.FOLLOWUP_LEASE_SECONDS,
+        )
         
         if not due_followups:
             logger.info("SCHEDULE: No due follow-ups found")
-            return {"processed": 0}
-            
-        logger.info(f"SCHEDULE: Found {due_followups} due follow-ups")
-        
-        processed = 0
-        errors = 0
-        
-        for context in due_followups:
-            try:
-                process_realtime_followup(context)
-                processed += 1
-            except Exception as e:
-                logger.error(f"Error processing realtime followup: {e}", exc_info=True)
-                errors += 1
-        
-        logger.info(f"SCHEDULE: Completed. Processed: {processed}, Errors: {errors}")
-        return {"processed": processed, "errors": errors}
+            return {"dispatched": 0}
+
+        # The claim already capped each org; everything claimed is dispatched now
+        ordered = _fair_order(due_followups, config.FOLLOWUP_MAX_PER_ORG_PER_TICK)
+        for context in ordered:
+            process_followup.delay(context)
+
+        metrics.incr("followup.dispatched", len(ordered))
+        logger.info(f"SCHEDULE: claimed and dispatched {len(ordered)} due follow-ups")
+        return {"dispatched": len(ordered)}
         
     except Exception as e:
         logger.error(f"SCHEDULE: Critical error in process_due_followups: {e}", exc_info=True)
         return {"error": str(e)}
 
 
+def _lease_still_held(context: Dict) -> bool:
+    """
+    Re-read the conversation before acting on a claimed follow-up. False if the
+    lease was dropped (the lead replied, a human took over, the schedule moved)
+    or expired and went to another claimer. Refreshes the conversation snapshot.
+    """
+    lease_token = context.get("lease_token")
+    if not lease_token:
+        return True  # Not claimed (e.g. from the read-only due-followups view)
+    conversation = context["conversation"]
+    current = api_client.get_conversation(UUID(conversation["id"]))
+    if str(current.get("followup_lease_token")) != str(lease_token):
+        return False
+    conversation.update(current)
+    return True
+
+
+@celery_app.task(name="whatsapp_worker.tasks.process_followup", ignore_result=True)
+def process_followup(context: dict):
+    """Run one claimed follow-up from the sweep."""
+    try:
+        if not _lease_still_held(context):
+            metrics.incr("followup.processed", outcome="superseded")
+            logger.info(f"Skipping followup for {context['conversation']['id']}: lease no longer held")
+            return
+    except Exception as e:
+        metrics.incr("followup.processed", outcome="error")
+        logger.error(f"Could not verify followup lease for {context['conversation']['id']}: {e}")
+        return
+    _run_followup(context)
+
+
+def _run_followup(context: dict) -> None:
+    """Failures are isolated to this conversation."""
+    try:
+        process_realtime_followup(context)
+        metrics.incr("followup.processed", outcome="ok")
+    except Exception as e:
+        metrics.incr("followup.processed", outcome="error")
+        logger.error(
+            f"Error processing realtime followup for {context['conversation']['id']}: {e}",
+            exc_info=True,
+        )
+
+
+def followup_org_config(context: Dict) -> Dict:
+    """Org config dict (as build_pipeline_context expects) from a due-followup context."""
+    return {
+        "organization_id": str(context["organization_id"]),
+        "organization_name": context["organization_name"],
+        "business_name": context.get("business_name"),
+        "business_description": context.get("business_description"),
+        "flow_prompt": context.get("flow_prompt"),
+        "llm_settings": context.get("llm_settings"),
+    }
+
+
 def process_realtime_followup(context: dict):
     """
     Process a single real-time follow-up via API.
@@ -98,27 +358,25 @@ def process_realtime_followup(context: dict):
             logger.error(f"Failed to mark conversation as GHOSTED: {e}")
         return
 
+    # Pre-generated draft, if nothing has changed since it was written (checked on the real stage)
+    pipeline_result = usable_draft(conversation, followup_type)
+
     # Override the stage for the prompt registry to pick the correct warmup
     # We don't save this stage change to DB yet, it's just for generation
     conversation["stage"] = followup_type
     
-    # Build org config dict from context
-    org_config = {
-        "organization_name": context["organization_name"],
-        "business_name": context.get("business_name"),
-        "business_description": context.get("business_description"),
-        "flow_prompt": context.get("flow_prompt"),
-    }
-    
-    # Build pipeline context
-    pipeline_context = build_pipeline_context(
-        org_config,
-        conversation,
-        lead
-    )
+    org_config = followup_org_config(context)
     
-    # Run followup pipeline
-    pipeline_result = run_followup_pipeline(pipeline_context)
+    if pipeline_result is None:
+        # Build pipeline context
+        pipeline_context = build_pipeline_context(
+            org_config,
+            conversation,
+            lead
+        )
+        
+        # Run followup pipeline
+        pipeline_result = run_followup_pipeline(pipeline_context)
     
     # Handle result
     response_message = handle_pipeline_result(
@@ -139,11 +397,267 @@ def process_realtime_followup(context: dict):
             )
             # Update conversation tracking state
             current_count = conversation.get("followup_count_24h", 0)
-            api_client.update_conversation(
+            updated = api_client.update_conversation(
                 UUID(conversation["id"]),
                 stage=followup_type,
                 followup_count_24h=current_count + 1
             )
+            schedule_followup(updated, org_config, lead)
             logger.info(f"Sent {followup_type} to {lead['phone']}")
+            enqueue_memory_update(conversation["id"], context.get("llm_settings"))
         except Exception as e:
             logger.error(f"Failed to send followup message via API: {e}")
+    elif pipeline_result.classification.new_stage not in (
+        ConversationStage.CLOSED, ConversationStage.LOST, ConversationStage.GHOSTED,
+    ):
+        # The slot is used up even without a message; otherwise the materialized
+        # schedule keeps it due and every tick would re-run the pipeline.
+        try:
+            schedule_followup(
+                api_client.update_conversation(UUID(conversation["id"]), stage=followup_type), org_config, lead
+            )
+        except Exception as e:
+            logger.error(f"Failed to advance followup stage for {conversation['id']}: {e}")
+
+
+# ========================================
+# Template Follow-ups (outside the 24h window)
+# ========================================
+
+@celery_app.task(name="whatsapp_worker.tasks.process_template_followups")
+def process_template_followups():
+    """
+    Send due template-sequence steps to leads whose WhatsApp window has closed.
+
+    The server walks each org's Followup sequence, renders the approved
+    templates and sends them throttled per phone number; no LLM is involved.
+    Claims advance progress atomically, so overlapping runs never double-send.
+    """
+    try:
+        result = api_client.run_template_followups(
+            limit=config.TEMPLATE_FOLLOWUP_BATCH_SIZE,
+            per_org_limit=config.TEMPLATE_FOLLOWUP_MAX_PER_ORG,
+        )
+        metrics.incr("followup.template", result.get("sent", 0), outcome="sent")
+        metrics.incr("followup.template", result.get("failed", 0), outcome="failed")
+        logger.info(f"SCHEDULE: template follow-ups {result}")
+        return result
+    except Exception as e:
+        logger.error(f"SCHEDULE: template follow-up run failed: {e}", exc_info=True)
+        return {"error": str(e)}
+
+
+# ========================================
+# Campaigns
+# ========================================
+
+@celery_app.task(name="whatsapp_worker.tasks.advance_campaigns")
+def advance_campaigns():
+    """
+    Let the server send running campaigns for one time budget.
+
+    Campaigns are leased and checkpointed per batch server-side, so runs that
+    overlap or die never send a lead the same campaign twice.
+    """
+    try:
+        result = api_client.advance_campaigns(time_budget_seconds=config.CAMPAIGN_TIME_BUDGET_SECONDS)
+        metrics.incr("campaign.send", result.get("sent", 0), outcome="sent")
+        metrics.incr("campaign.send", result.get("failed", 0), outcome="failed")
+        metrics.incr("campaign.send", result.get("skipped", 0), outcome="skipped")
+        if result.get("campaigns"):
+            logger.info(f"SCHEDULE: campaigns {result}")
+        return result
+    except Exception as e:
+        logger.error(f"SCHEDULE: campaign run failed: {e}", exc_info=True)
+        return {"error": str(e)}
+
+
+# ========================================
+# Deferred Memory (hierarchical rolling summary)
+# ========================================
+
+MEMORY_LATEST_KEY = "memory:latest:{conversation_id}"
+MEMORY_COMPACT_KEY = "memory:compact:{conversation_id}"
+MEMORY_COMPACT_FORCE_KEY = "memory:compact:force:{conversation_id}"
+MEMORY_LOCK_KEY = "memory:lock:{conversation_id}"
+MEMORY_KEY_TTL_SECONDS = 7 * 24 * 3600
+MEMORY_MAX_MESSAGES = 20
+MEMORY_COMPACTION_DELAY_SECONDS = 300
+
+
+def enqueue_memory_update(
+    conversation_id: str,
+    llm_settings: Optional[Dict] = None,
+    countdown: Optional[int] = None,
+) -> None:
+    """
+    Schedule a deferred memory update for a conversation.
+
+    Coalesced per conversation: each call replaces the "latest" token, so when
+    several turns arrive within MEMORY_DEBOUNCE_SECONDS only the last task runs
+    and it summarizes all of them in a single LLM call. countdown overrides the
+    debounce (the load shedder defers Memory further while degraded).
+    """
+    token = uuid.uuid4().hex
+    try:
+        get_redis().set(
+            MEMORY_LATEST_KEY.format(conversation_id=conversation_id),
+            token,
+            ex=MEMORY_KEY_TTL_SECONDS,
+        )
+        summarize_conversation.apply_async(
+            args=[str(conversation_id), token, llm_settings or {}],
+            countdown=config.MEMORY_DEBOUNCE_SECONDS if countdown is None else countdown,
+        )
+    except Exception as e:
+        # Not fatal: the next turn's segment covers everything since the last one
+        logger.error(f"Failed to enqueue memory update for {conversation_id}: {e}")
+
+
+def _enqueue_memory_compaction(conversation_id: str, llm_settings: Optional[Dict], force: bool = False) -> None:
+    """
+    Schedule a compaction pass (coalesced: at most one pending per conversation).
+    force compacts even under the size threshold (the model asked for a recursive summary).
+    """
+    redis_client = get_redis()
+    token = uuid.uuid4().hex
+    key = MEMORY_COMPACT_KEY.format(conversation_id=conversation_id)
+    if not redis_client.set(key, token, ex=MEMORY_COMPACTION_DELAY_SECONDS * 4, nx=True):
+        if force:
+            # Already scheduled: make the pending pass a forced one
+            redis_client.set(
+                MEMORY_COMPACT_FORCE_KEY.format(conversation_id=conversation_id),
+                "1",
+                ex=MEMORY_COMPACTION_DELAY_SECONDS * 4,
+            )
+        return
+    compact_conversation_memory.apply_async(
+        args=[str(conversation_id), token, llm_settings or {}, force],
+        countdown=MEMORY_COMPACTION_DELAY_SECONDS,
+    )
+
+
+def _parse_ts(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def _save_segments(conversation_id: str, segments: list, fallback_summary: str) -> None:
+    """Persist segments plus the rendered view (kept in rolling_summary for the UI)."""
+    api_client.update_conversation(
+        UUID(conversation_id),
+        memory_segments=segments,
+        rolling_summary=render_memory_view(segments, fallback_summary),
+    )
+
+
+@celery_app.task(name="whatsapp_worker.tasks.summarize_conversation")
+def summarize_conversation(conversation_id: str, token: str, llm_settings: Optional[Dict] = None):
+    """
+    Append a memory segment covering every message since the last segment.
+    Skips superseded requests and conversations whose memory is already fresh.
+    """
+    redis_client = get_redis()
+    if redis_client.get(MEMORY_LATEST_KEY.format(conversation_id=conversation_id)) != token:
+        metrics.incr("memory.skipped", reason="superseded")
+        return {"status": "superseded"}
+
+    with redis_client.lock(MEMORY_LOCK_KEY.format(conversation_id=conversation_id), timeout=120):
+        conversation = api_client.get_conversation(UUID(conversation_id))
+        rolling_summary = conversation.get("rolling_summary") or ""
+        segments = conversation.get("memory_segments") or seed_segments(rolling_summary)
+
+        through = _parse_ts(summarized_through(segments))
+        last_message_at = _parse_ts(conversation.get("last_message_at"))
+        if through and last_message_at and last_message_at <= through:
+            metrics.incr("memory.skipped", reason="fresh")
+            return {"status": "fresh"}
+
+        raw_messages = api_client.get_conversation_messages(
+            UUID(conversation_id), limit=MEMORY_MAX_MESSAGES
+        )
+        new_messages = [
+            MessageContext(sender=msg["sender"], text=msg["text"], timestamp=msg["timestamp"])
+            for msg in raw_messages
+            if not through or (_parse_ts(msg["timestamp"]) or through) > through
+        ]
+        if not new_messages:
+            metrics.incr("memory.skipped", reason="fresh")
+            return {"status": "fresh"}
+
+        with trace_scope(conversation_id):
+            result = run_memory_segment(
+                memory_view=render_memory_view(segments, rolling_summary),
+                new_messages=new_messages,
+                conversation_stage=conversation.get("stage", ""),
+                llm_overrides=llm_settings,
+            )
+        if not result:
+            metrics.incr("memory.skipped", reason="empty")
+            return {"status": "empty"}
+
+        segment_summary, needs_recursive_summary = result
+        segments = append_segment(
+            segments, segment_summary, until=new_messages[-1].timestamp, messages=len(new_messages)
+        )
+        _save_segments(conversation_id, segments, rolling_summary)
+
+    metrics.incr("memory.summarized")
+    logger.info(f"Appended memory segment for {conversation_id} ({len(new_messages)} new messages)")
+
+    # Compaction is deferred and only runs once the size threshold is crossed
+    if plan_compaction(segments, force=needs_recursive_summary):
+        _enqueue_memory_compaction(conversation_id, llm_settings, force=needs_recursive_summary)
+
+    return {"status": "ok", "messages": len(new_messages), "segments": len(segments)}
+
+
+@celery_app.task(name="whatsapp_worker.tasks.compact_conversation_memory")
+def compact_conversation_memory(
+    conversation_id: str, token: str, llm_settings: Optional[Dict] = None, force: bool = False
+):
+    """
+    Merge old memory segments into higher-level summaries until the memory
+    is back under the size threshold. A forced run merges on its first pass
+    even when the memory is under the threshold.
+    """
+    redis_client = get_redis()
+    compact_key = MEMORY_COMPACT_KEY.format(conversation_id=conversation_id)
+    force_key = MEMORY_COMPACT_FORCE_KEY.format(conversation_id=conversation_id)
+    if redis_client.get(compact_key) != token:
+        return {"status": "superseded"}
+    if redis_client.get(force_key):
+        force = True
+
+    passes = 0
+    try:
+        with redis_client.lock(MEMORY_LOCK_KEY.format(conversation_id=conversation_id), timeout=300):
+            conversation = api_client.get_conversation(UUID(conversation_id))
+            rolling_summary = conversation.get("rolling_summary") or ""
+            segments = conversation.get("memory_segments") or []
+
+            # Each pass merges one range; at most one per level
+            with trace_scope(conversation_id):
+                while passes < 2:
+                    plan = plan_compaction(segments, force=force and passes == 0)
+                    if not plan:
+                        break
+                    start, end, level = plan
+                    merged_summary = run_memory_compaction(segments[start:end], llm_settings)
+                    if not merged_summary:
+                        break
+                    segments = apply_compaction(segments, start, end, level, merged_summary)
+                    passes += 1
+
+            if passes:
+                _save_segments(conversation_id, segments, rolling_summary)
+    finally:
+        redis_client.delete(compact_key, force_key)
+
+    metrics.incr("memory.compactions", passes)
+    logger.info(f"Compacted memory for {conversation_id}: {passes} passes, {len(segments)} segments")
+    return {"status": "ok", "passes": passes, "segments": len(segments)}